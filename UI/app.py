@@ -1,14 +1,28 @@
+import json
+import os
+
 import streamlit as st
 import pandas as pd
-import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-from datetime import datetime, timedelta
-from prophet import Prophet
+from plotly.subplots import make_subplots
+from datetime import timedelta
+from urllib.parse import urlencode
 import folium
-from streamlit_folium import folium_static
-import requests
-import xml.etree.ElementTree as ET
+from streamlit_folium import folium_static, st_folium
+
+from envirotrack.alerts import get_alert_status
+from envirotrack.cache import MB, BoundedCache, cache_stats, process_memory
+from envirotrack.downsample import downsample_wide
+from envirotrack.export import EXPORT_FORMATS, SORTABLE_COLUMNS, iter_export, query_page
+from envirotrack.forecast import MAX_FORECAST_DAYS
+from envirotrack.history import SEVERITY_LEVELS
+from envirotrack.data import NEARBY_RADIUS_KM, DatasetHolder
+from envirotrack.interpolation import INDIA_BOUNDS, heatmap_image
+from envirotrack.maps import MAP_CENTER, MAP_ZOOM, add_cluster_markers, add_station_markers, base_map
+from envirotrack.rollups import ROLLUP_METRICS, SEVERITIES
+from envirotrack.scheduler import RefreshScheduler
+from envirotrack.sources import source_from_env
 
 
 # ============================================================
@@ -215,484 +229,139 @@ st.markdown(
 # ============================================================
 # Data Loading
 # ============================================================
-@st.cache_data(show_spinner=False)
-def load_sample_data():
-    # Generate data for last 60 days from today
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=60)
-    dates = pd.date_range(start=start_date, end=end_date, freq='D')
-    locations = [
-        # Jammu & Kashmir (including PoK - Muzaffarabad as integral part)
-        {'name': 'Srinagar (Jammu & Kashmir)', 'lat': 34.0837, 'lon': 74.7973},
-        {'name': 'Jammu (Jammu & Kashmir)', 'lat': 32.7266, 'lon': 74.8570},
-        {'name': 'Anantnag (Jammu & Kashmir)', 'lat': 33.7310, 'lon': 75.1484},
-        {'name': 'Muzaffarabad (Jammu & Kashmir - PoK)', 'lat': 34.3700, 'lon': 73.4711},
-        
-        # Ladakh (including Aksai Chin areas)
-        {'name': 'Leh (Ladakh)', 'lat': 34.1526, 'lon': 77.5771},
-        {'name': 'Kargil (Ladakh)', 'lat': 34.5539, 'lon': 76.1313},
-        {'name': 'Aksai Chin Region (Ladakh)', 'lat': 35.3000, 'lon': 79.0000},
-        
-        # Himachal Pradesh
-        {'name': 'Shimla (Himachal Pradesh)', 'lat': 31.1048, 'lon': 77.1734},
-        {'name': 'Dharamshala (Himachal Pradesh)', 'lat': 32.2190, 'lon': 76.3234},
-        {'name': 'Manali (Himachal Pradesh)', 'lat': 32.2396, 'lon': 77.1887},
-        
-        # Punjab
-        {'name': 'Chandigarh (Punjab & Haryana)', 'lat': 30.7333, 'lon': 76.7794},
-        {'name': 'Amritsar (Punjab)', 'lat': 31.6340, 'lon': 74.8723},
-        {'name': 'Ludhiana (Punjab)', 'lat': 30.9010, 'lon': 75.8573},
-        {'name': 'Patiala (Punjab)', 'lat': 30.3398, 'lon': 76.3869},
-        
-        # Haryana
-        {'name': 'Gurugram (Haryana)', 'lat': 28.4595, 'lon': 77.0266},
-        {'name': 'Faridabad (Haryana)', 'lat': 28.4089, 'lon': 77.3178},
-        {'name': 'Panipat (Haryana)', 'lat': 29.3909, 'lon': 76.9635},
-        
-        # Delhi
-        {'name': 'New Delhi (Delhi)', 'lat': 28.6139, 'lon': 77.2090},
-        {'name': 'Dwarka (Delhi)', 'lat': 28.5921, 'lon': 77.0460},
-        {'name': 'Rohini (Delhi)', 'lat': 28.7499, 'lon': 77.0672},
-        
-        # Uttarakhand
-        {'name': 'Dehradun (Uttarakhand)', 'lat': 30.3165, 'lon': 78.0322},
-        {'name': 'Haridwar (Uttarakhand)', 'lat': 29.9457, 'lon': 78.1642},
-        {'name': 'Nainital (Uttarakhand)', 'lat': 29.3803, 'lon': 79.4636},
-        
-        # Uttar Pradesh
-        {'name': 'Lucknow (Uttar Pradesh)', 'lat': 26.8467, 'lon': 80.9462},
-        {'name': 'Agra (Uttar Pradesh)', 'lat': 27.1767, 'lon': 78.0081},
-        {'name': 'Varanasi (Uttar Pradesh)', 'lat': 25.3176, 'lon': 82.9739},
-        {'name': 'Kanpur (Uttar Pradesh)', 'lat': 26.4499, 'lon': 80.3319},
-        
-        # Rajasthan
-        {'name': 'Jaipur (Rajasthan)', 'lat': 26.9124, 'lon': 75.7873},
-        {'name': 'Jodhpur (Rajasthan)', 'lat': 26.2389, 'lon': 73.0243},
-        {'name': 'Udaipur (Rajasthan)', 'lat': 24.5854, 'lon': 73.7125},
-        {'name': 'Jaisalmer (Rajasthan)', 'lat': 26.9157, 'lon': 70.9083},
-        
-        # Gujarat
-        {'name': 'Gandhinagar (Gujarat)', 'lat': 23.2156, 'lon': 72.6369},
-        {'name': 'Ahmedabad (Gujarat)', 'lat': 23.0225, 'lon': 72.5714},
-        {'name': 'Surat (Gujarat)', 'lat': 21.1702, 'lon': 72.8311},
-        {'name': 'Vadodara (Gujarat)', 'lat': 22.3072, 'lon': 73.1812},
-        
-        # Madhya Pradesh
-        {'name': 'Bhopal (Madhya Pradesh)', 'lat': 23.2599, 'lon': 77.4126},
-        {'name': 'Indore (Madhya Pradesh)', 'lat': 22.7196, 'lon': 75.8577},
-        {'name': 'Gwalior (Madhya Pradesh)', 'lat': 26.2183, 'lon': 78.1828},
-        {'name': 'Ujjain (Madhya Pradesh)', 'lat': 23.1765, 'lon': 75.7885},
-        
-        # Chhattisgarh
-        {'name': 'Raipur (Chhattisgarh)', 'lat': 21.2514, 'lon': 81.6296},
-        {'name': 'Bhilai (Chhattisgarh)', 'lat': 21.2167, 'lon': 81.3833},
-        {'name': 'Bilaspur (Chhattisgarh)', 'lat': 22.0797, 'lon': 82.1409},
-        
-        # Maharashtra
-        {'name': 'Mumbai (Maharashtra)', 'lat': 19.0760, 'lon': 72.8777},
-        {'name': 'Pune (Maharashtra)', 'lat': 18.5204, 'lon': 73.8567},
-        {'name': 'Nagpur (Maharashtra)', 'lat': 21.1458, 'lon': 79.0882},
-        {'name': 'Nashik (Maharashtra)', 'lat': 19.9975, 'lon': 73.7898},
-        
-        # Goa
-        {'name': 'Panaji (Goa)', 'lat': 15.4909, 'lon': 73.8278},
-        {'name': 'Vasco da Gama (Goa)', 'lat': 15.3989, 'lon': 73.8150},
-        {'name': 'Margao (Goa)', 'lat': 15.2708, 'lon': 73.9528},
-        
-        # Karnataka
-        {'name': 'Bengaluru (Karnataka)', 'lat': 12.9716, 'lon': 77.5946},
-        {'name': 'Mysuru (Karnataka)', 'lat': 12.2958, 'lon': 76.6394},
-        {'name': 'Mangaluru (Karnataka)', 'lat': 12.9141, 'lon': 74.8560},
-        {'name': 'Hubballi (Karnataka)', 'lat': 15.3647, 'lon': 75.1240},
-        
-        # Telangana
-        {'name': 'Hyderabad (Telangana)', 'lat': 17.3850, 'lon': 78.4867},
-        {'name': 'Warangal (Telangana)', 'lat': 17.9689, 'lon': 79.5941},
-        {'name': 'Nizamabad (Telangana)', 'lat': 18.6725, 'lon': 78.0941},
-        
-        # Andhra Pradesh
-        {'name': 'Amaravati (Andhra Pradesh)', 'lat': 16.5113, 'lon': 80.5154},
-        {'name': 'Visakhapatnam (Andhra Pradesh)', 'lat': 17.6868, 'lon': 83.2185},
-        {'name': 'Vijayawada (Andhra Pradesh)', 'lat': 16.5062, 'lon': 80.6480},
-        {'name': 'Tirupati (Andhra Pradesh)', 'lat': 13.6288, 'lon': 79.4192},
-        
-        # Tamil Nadu
-        {'name': 'Chennai (Tamil Nadu)', 'lat': 13.0827, 'lon': 80.2707},
-        {'name': 'Coimbatore (Tamil Nadu)', 'lat': 11.0168, 'lon': 76.9558},
-        {'name': 'Madurai (Tamil Nadu)', 'lat': 9.9252, 'lon': 78.1198},
-        {'name': 'Tiruchirappalli (Tamil Nadu)', 'lat': 10.7905, 'lon': 78.7047},
-        
-        # Kerala
-        {'name': 'Thiruvananthapuram (Kerala)', 'lat': 8.5241, 'lon': 76.9366},
-        {'name': 'Kochi (Kerala)', 'lat': 9.9312, 'lon': 76.2673},
-        {'name': 'Kozhikode (Kerala)', 'lat': 11.2588, 'lon': 75.7804},
-        {'name': 'Thrissur (Kerala)', 'lat': 10.5276, 'lon': 76.2144},
-        
-        # Bihar
-        {'name': 'Patna (Bihar)', 'lat': 25.5941, 'lon': 85.1376},
-        {'name': 'Gaya (Bihar)', 'lat': 24.7955, 'lon': 84.9994},
-        {'name': 'Bhagalpur (Bihar)', 'lat': 25.2425, 'lon': 86.9842},
-        
-        # Jharkhand
-        {'name': 'Ranchi (Jharkhand)', 'lat': 23.3441, 'lon': 85.3096},
-        {'name': 'Jamshedpur (Jharkhand)', 'lat': 22.8046, 'lon': 86.2029},
-        {'name': 'Dhanbad (Jharkhand)', 'lat': 23.7957, 'lon': 86.4304},
-        
-        # Odisha
-        {'name': 'Bhubaneswar (Odisha)', 'lat': 20.2961, 'lon': 85.8245},
-        {'name': 'Cuttack (Odisha)', 'lat': 20.4625, 'lon': 85.8830},
-        {'name': 'Puri (Odisha)', 'lat': 19.8135, 'lon': 85.8312},
-        
-        # West Bengal
-        {'name': 'Kolkata (West Bengal)', 'lat': 22.5726, 'lon': 88.3639},
-        {'name': 'Howrah (West Bengal)', 'lat': 22.5958, 'lon': 88.2636},
-        {'name': 'Siliguri (West Bengal)', 'lat': 26.7271, 'lon': 88.3953},
-        {'name': 'Darjeeling (West Bengal)', 'lat': 27.0360, 'lon': 88.2627},
-        
-        # Sikkim
-        {'name': 'Gangtok (Sikkim)', 'lat': 27.3389, 'lon': 88.6065},
-        {'name': 'Namchi (Sikkim)', 'lat': 27.1667, 'lon': 88.3667},
-        {'name': 'Pelling (Sikkim)', 'lat': 27.2871, 'lon': 88.2150},
-        
-        # Assam
-        {'name': 'Dispur (Assam)', 'lat': 26.1433, 'lon': 91.7898},
-        {'name': 'Guwahati (Assam)', 'lat': 26.1445, 'lon': 91.7362},
-        {'name': 'Silchar (Assam)', 'lat': 24.8333, 'lon': 92.7789},
-        
-        # Arunachal Pradesh
-        {'name': 'Itanagar (Arunachal Pradesh)', 'lat': 27.0844, 'lon': 93.6053},
-        {'name': 'Tawang (Arunachal Pradesh)', 'lat': 27.5860, 'lon': 91.8590},
-        {'name': 'Ziro (Arunachal Pradesh)', 'lat': 27.5450, 'lon': 93.8317},
-        
-        # Nagaland
-        {'name': 'Kohima (Nagaland)', 'lat': 25.6751, 'lon': 94.1086},
-        {'name': 'Dimapur (Nagaland)', 'lat': 25.9040, 'lon': 93.7267},
-        {'name': 'Mokokchung (Nagaland)', 'lat': 26.3217, 'lon': 94.5203},
-        
-        # Manipur
-        {'name': 'Imphal (Manipur)', 'lat': 24.8170, 'lon': 93.9368},
-        {'name': 'Thoubal (Manipur)', 'lat': 24.6333, 'lon': 93.9833},
-        {'name': 'Bishnupur (Manipur)', 'lat': 24.6000, 'lon': 93.7667},
-        
-        # Mizoram
-        {'name': 'Aizawl (Mizoram)', 'lat': 23.7307, 'lon': 92.7173},
-        {'name': 'Lunglei (Mizoram)', 'lat': 22.8900, 'lon': 92.7347},
-        {'name': 'Champhai (Mizoram)', 'lat': 23.4697, 'lon': 93.3269},
-        
-        # Tripura
-        {'name': 'Agartala (Tripura)', 'lat': 23.8315, 'lon': 91.2868},
-        {'name': 'Udaipur (Tripura)', 'lat': 23.5333, 'lon': 91.4833},
-        {'name': 'Dharmanagar (Tripura)', 'lat': 24.3667, 'lon': 92.1667},
-        
-        # Meghalaya
-        {'name': 'Shillong (Meghalaya)', 'lat': 25.5788, 'lon': 91.8933},
-        {'name': 'Tura (Meghalaya)', 'lat': 25.5138, 'lon': 90.2034},
-        {'name': 'Cherrapunji (Meghalaya)', 'lat': 25.2697, 'lon': 91.7320},
-        
-        # Andaman & Nicobar
-        {'name': 'Port Blair (Andaman & Nicobar)', 'lat': 11.6234, 'lon': 92.7265},
-        {'name': 'Diglipur (Andaman & Nicobar)', 'lat': 13.2667, 'lon': 93.0000},
-        {'name': 'Car Nicobar (Andaman & Nicobar)', 'lat': 9.1528, 'lon': 92.8194},
-        
-        # Puducherry
-        {'name': 'Puducherry (Puducherry)', 'lat': 11.9416, 'lon': 79.8083},
-        {'name': 'Karaikal (Puducherry)', 'lat': 10.9254, 'lon': 79.8380},
-        {'name': 'Mahe (Puducherry)', 'lat': 11.7009, 'lon': 75.5340},
-        
-        # Lakshadweep
-        {'name': 'Kavaratti (Lakshadweep)', 'lat': 10.5593, 'lon': 72.6358},
-        {'name': 'Agatti (Lakshadweep)', 'lat': 10.8482, 'lon': 72.1920},
-        {'name': 'Minicoy (Lakshadweep)', 'lat': 8.2833, 'lon': 73.0500},
-        
-        # Daman & Diu
-        {'name': 'Daman (Daman & Diu)', 'lat': 20.3974, 'lon': 72.8328},
-        {'name': 'Diu (Daman & Diu)', 'lat': 20.7144, 'lon': 70.9882},
-        
-        # Dadra & Nagar Haveli
-        {'name': 'Silvassa (Dadra & Nagar Haveli)', 'lat': 20.2766, 'lon': 73.0081},
-        {'name': 'Dadra (Dadra & Nagar Haveli)', 'lat': 20.2700, 'lon': 73.0150}
-    ]
-    
-    data = []
-    for location in locations:
-        lat = location["lat"]
-        for date in dates:
-            base_temp = 30 - (lat - 20) * 0.5
-
-            if date.month in [5, 6]:  # Summer
-                temp = np.random.normal(base_temp + 5, 3)
-            elif date.month in [12, 1]:  # Winter
-                temp = np.random.normal(base_temp - 10, 3)
-            else:
-                temp = np.random.normal(base_temp, 4)
-
-            if lat > 25 and date.month in [11, 12, 1, 2]:
-                aqi = np.random.normal(200, 50)
-            else:
-                aqi = np.random.normal(100, 30)
-
-            if date.month in [6, 7, 8, 9]:  # Monsoon
-                if 8 < lat < 20:
-                    rainfall = np.random.exponential(20)
-                else:
-                    rainfall = np.random.exponential(15)
-            else:
-                rainfall = np.random.exponential(2)
-
-            data.append({
-                'date': date,
-                'location': location['name'],
-                'lat': location['lat'],
-                'lon': location['lon'],
-                'temperature': round(max(0, min(50, temp)), 2),
-                'air_quality': round(max(0, min(500, aqi)), 2),
-                'rainfall': round(rainfall, 2)
-            })
-    
-    df = pd.DataFrame(data)
-    return df
-
-# ------------------------------------------------------------
-# Severity Assessment Function
-# ------------------------------------------------------------
-def assess_severity(temp, rain, aqi):
-    """Returns 'normal', 'warning', or 'severe'"""
-    if temp >= 42 or rain >= 80 or aqi >= 300:
-        return 'severe'
-    elif temp >= 38 or temp <= 5 or rain >= 30 or aqi >= 200:
-        return 'warning'
-    else:
-        return 'normal'
-
-def get_marker_color(severity):
-    """Returns color code for map markers"""
-    if severity == 'severe':
-        return 'red'
-    elif severity == 'warning':
-        return 'orange'
-    else:
-        return 'green'
+# Core logic lives in the envirotrack package (importable without
+# Streamlit); this script only adds caching and rendering on top.
+@st.cache_resource(show_spinner=False)
+def get_source():
+    # Sample data unless ENVIROTRACK_DATA_SOURCE names real observations
+    return source_from_env()
+
+@st.cache_resource(show_spinner=False)
+def get_dataset_holder():
+    holder = DatasetHolder()
+    holder.publish(get_source().load())
+    return holder
+
+def get_dataset():
+    """Current shared Dataset. Read once per rerun so a run sees a single version."""
+    return get_dataset_holder().current()
 
 # ------------------------------------------------------------
-# Forecast Helper
+# Background refresh (news, alert table, forecasts, new readings)
 # ------------------------------------------------------------
-@st.cache_data(show_spinner=False)
-def create_forecast(df, parameter, days=30):
-    tmp = df[['date', parameter]].rename(columns={'date': 'ds', parameter: 'y'})
-    model = Prophet(yearly_seasonality=True, weekly_seasonality=True)
-    model.fit(tmp)
-    future = model.make_future_dataframe(periods=days)
-    forecast = model.predict(future)
-    return forecast
+# Network fetches and Prophet fits run on the scheduler's worker pool;
+# reruns only read its cache and show a placeholder until a result lands.
+REFRESH_POLL_SECONDS = 2
+PENDING_NEWS = {"articles": [], "error": None, "pending": True}
+FORECAST_MODE_LABELS = {
+    'full': "Full sampling",
+    'fast': "Fast (analytic)",
+}
+
+@st.cache_resource(show_spinner=False)
+def get_scheduler():
+    return RefreshScheduler.from_env(get_dataset_holder(), source=get_source()).start()
+
+def get_news(location):
+    """Cached headlines for location's city (a pending placeholder until the first fetch)."""
+    return get_scheduler().news(location) or PENDING_NEWS
+
+@st.fragment(run_every=REFRESH_POLL_SECONDS)
+def wait_for_refresh(ready, message):
+    """Placeholder polled while a background job runs; reruns the app once ready() is true."""
+    if ready():
+        st.rerun()
+    st.info(message)
+
+HEATMAP_METRICS = {
+    'temperature': 'Temperature (°C)',
+    'air_quality': 'Air Quality (AQI)',
+    'rainfall': 'Rainfall (mm)',
+}
+
+HEATMAP_CACHE_MB = 128
+
+@st.cache_resource(show_spinner=False)
+def get_heatmap_cache():
+    return BoundedCache("heatmap layers", max_entries=48, max_bytes=HEATMAP_CACHE_MB * MB)
+
+def get_heatmap_layer(version, metric, day):
+    """IDW image for one (data version, metric, day); shared read-only across sessions."""
+    cache = get_heatmap_cache()
+    layer = cache.get((version, metric, day))
+    if layer is None:
+        with st.spinner("Interpolating heatmap..."):
+            readings = get_dataset().readings_on(day)
+            image, value_range = heatmap_image(readings['lat'], readings['lon'], readings[metric], metric)
+        image.flags.writeable = False
+        layer = cache.put((version, metric, day), (image, value_range))
+    return layer
+
+# Optional state boundaries for the choropleth: a GeoJSON file whose
+# features carry the state name at STATES_GEOJSON_KEY. Without it the
+# States view falls back to bubbles at the station centroids.
+STATES_GEOJSON_PATH = os.environ.get("ENVIROTRACK_STATES_GEOJSON")
+STATES_GEOJSON_KEY = os.environ.get("ENVIROTRACK_STATES_GEOJSON_KEY", "properties.ST_NM")
+
+@st.cache_resource(show_spinner=False)
+def get_states_geojson(path):
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
 
 # ------------------------------------------------------------
-# Helper: Extract city name for news queries
+# Debug panel (?debug=1 or ENVIROTRACK_DEBUG=1)
 # ------------------------------------------------------------
-def extract_city_keyword(location_name: str) -> str:
-    if "(" in location_name:
-        return location_name.split("(")[0].strip()
-    return location_name.strip()
+DEBUG_PANEL = bool(os.environ.get("ENVIROTRACK_DEBUG"))
+
+def render_debug_panel():
+    """Cache budgets, hit rates and evictions, process memory and background jobs."""
+    with st.sidebar.expander("🛠️ Caches & Memory"):
+        memory = process_memory()
+        st.metric("Process RSS (MB)", memory["rss_mb"], help=f"Peak: {memory['peak_rss_mb']} MB")
+        st.dataframe(pd.DataFrame(cache_stats()), hide_index=True, use_container_width=True)
+        jobs = get_scheduler().status()
+        st.caption(f"{len(jobs)} background job(s)")
+        if jobs:
+            st.dataframe(pd.DataFrame(jobs), hide_index=True, use_container_width=True)
 
 # ------------------------------------------------------------
-# Weather News API integration
+# Station picker
 # ------------------------------------------------------------
-@st.cache_data(ttl=1800, show_spinner=False)
-def fetch_weather_news(city_keyword: str):
-    """Fetch latest weather-related news using Google News RSS."""
-    query = f"{city_keyword} weather OR rainfall OR storm OR cyclone OR heatwave"
-    url = f"https://news.google.com/rss/search?q={query.replace(' ', '+')}"
-
-    try:
-        response = requests.get(url, timeout=10)
-        if response.status_code != 200:
-            return {"articles": [], "error": f"RSS error: {response.status_code}"}
-
-        root = ET.fromstring(response.content)
-
-        articles = []
-        for item in root.findall(".//item"):
-            title_text = item.find("title").text if item.find("title") is not None else ""
-            desc_text = item.find("description").text if item.find("description") is not None else ""
-            url_text = item.find("link").text if item.find("link") is not None else ""
-            pub_date = item.find("pubDate").text if item.find("pubDate") is not None else ""
-            
-            articles.append({
-                "title": title_text,
-                "description": desc_text,
-                "url": url_text,
-                "published_at": pub_date,
-                "source": "Google News",
-                "pub_timestamp": pd.to_datetime(pub_date, errors='coerce')
-            })
-
-        # Sort by publication date (most recent first)
-        articles_df = pd.DataFrame(articles)
-        if not articles_df.empty and 'pub_timestamp' in articles_df.columns:
-            articles_df = articles_df.sort_values('pub_timestamp', ascending=False)
-            articles = articles_df.to_dict('records')
-
-        return {"articles": articles[:15], "error": None}  # Return top 15 most recent
-
-    except Exception as e:
-        return {"articles": [], "error": f"Exception: {e}"}
-
-# ------------------------------------------------------------
-# Alert / Warning Logic (Past Week Only)
-# ------------------------------------------------------------
-def get_alert_status(current_row, location_data_week, news_articles=None):
+# Searches the per-version station registry (city, state and aliases such
+# as "Bombay" or "UP"); the picker then lists only the matches, so its
+# size does not grow with the network
+STATION_SEARCH_LIMIT = 25
+MAX_STATION_OPTIONS = 200
+
+def select_top_match():
+    """When the search text changes, select its best match."""
+    matches = get_dataset().stations.search(st.session_state.station_query, limit=1)
+    if matches:
+        st.session_state.selected_location = matches[0].name
+
+def station_options(registry, query, selected):
     """
-    Decide alert severity + text based on:
-    - Current metrics
-    - Past week's weather patterns
-    - Recent news (last 7 days only)
+    Search matches for query (else the first MAX_STATION_OPTIONS stations),
+    keeping the current selection (one name or a list of names).
     """
-    temp = current_row["temperature"]
-    rain = current_row["rainfall"]
-    aqi = current_row["air_quality"]
-
-    messages = []
-    severity = "normal"
-    icon = "🟢"
-    sev_order = ["normal", "medium", "high"]
-
-    def bump_severity(current, new_level):
-        return max(current, new_level, key=lambda s: sev_order.index(s))
-
-    # Analyze past week patterns
-    week_avg_temp = location_data_week['temperature'].mean()
-    week_max_temp = location_data_week['temperature'].max()
-    week_total_rain = location_data_week['rainfall'].sum()
-    week_avg_aqi = location_data_week['air_quality'].mean()
-    
-    # Current Temperature conditions
-    if temp >= 42:
-        messages.append(f"🔥 Heatwave conditions detected (Current: {temp}°C, Week Avg: {week_avg_temp:.1f}°C).")
-        severity = "high"
-        icon = "🔥"
-    elif temp >= 38:
-        messages.append(f"☀️ High temperature alert (Current: {temp}°C).")
-        severity = bump_severity(severity, "medium")
-        if icon == "🟢":
-            icon = "☀️"
-    elif temp <= 5:
-        messages.append(f"❄️ Very low temperature alert (Current: {temp}°C).")
-        severity = bump_severity(severity, "medium")
-        if icon == "🟢":
-            icon = "❄️"
-    
-    # Check for unusual temperature changes in past week
-    if week_max_temp - temp > 10:
-        messages.append(f"⚠️ Significant temperature drop from week's peak ({week_max_temp:.1f}°C to {temp:.1f}°C).")
-        severity = bump_severity(severity, "medium")
-
-    # Current Rainfall / storm conditions
-    if rain >= 80:
-        messages.append(f"🌀 Extreme rainfall – cyclone-like / severe storm risk (Current: {rain} mm, Week Total: {week_total_rain:.1f} mm).")
-        severity = "high"
-        icon = "🌀"
-    elif rain >= 30:
-        messages.append(f"⛈️ Heavy rainfall – storm / flooding risk (Current: {rain} mm).")
-        severity = bump_severity(severity, "medium")
-        if icon == "🟢":
-            icon = "⛈️"
-    
-    # Check weekly rainfall accumulation
-    if week_total_rain >= 200:
-        messages.append(f"💧 Very high weekly rainfall accumulation ({week_total_rain:.1f} mm) - flood risk remains elevated.")
-        severity = bump_severity(severity, "medium")
-
-    # Current AQI conditions
-    if aqi >= 300:
-        messages.append(f"☠️ Hazardous air quality (Current AQI: {aqi}, Week Avg: {week_avg_aqi:.0f}). Limit outdoor activity.")
-        severity = "high"
-        if icon == "🟢":
-            icon = "☠️"
-    elif aqi >= 200:
-        messages.append(f"😷 Very poor air quality (Current AQI: {aqi}). Wear masks outdoors.")
-        severity = bump_severity(severity, "medium")
-        if icon == "🟢":
-            icon = "😷"
-
-    # News-driven alerts (ONLY from past 7 days)
-    if news_articles:
-        from datetime import datetime, timezone
-        import dateutil.parser
-        
-        # Filter news from past 7 days only
-        recent_articles = []
-        cutoff_date = datetime.now(timezone.utc) - timedelta(days=7)
-        
-        for art in news_articles:
-            try:
-                pub_timestamp = art.get('pub_timestamp')
-                if pub_timestamp and pd.notna(pub_timestamp):
-                    # Make timestamp timezone-aware if it isn't
-                    if pub_timestamp.tzinfo is None:
-                        pub_timestamp = pub_timestamp.tz_localize('UTC')
-                    
-                    if pub_timestamp >= cutoff_date:
-                        recent_articles.append(art)
-            except:
-                # If parsing fails, skip this article
-                continue
-        
-        # Only check recent articles (past week)
-        severe_keywords_high = ["cyclone", "landslide", "red alert", "severe storm", "emergency", "disaster"]
-        severe_keywords_med = ["flood", "flooding", "heatwave", "cold wave", "heavy rain", "orange alert", "yellow alert"]
-        flagged_article = None
-        flagged_level = None
-
-        for art in recent_articles:
-            title_clean = art.get("title", "")
-            desc_clean = art.get("description", "")
-            text = (title_clean + " " + desc_clean).lower()
-            
-            if any(k in text for k in severe_keywords_high):
-                flagged_article = art
-                flagged_level = "high"
-                break
-            elif any(k in text for k in severe_keywords_med) and flagged_level is None:
-                flagged_article = art
-                flagged_level = "medium"
-
-        if flagged_article:
-            import re
-            import html
-            
-            # Clean the title
-            title_clean = html.unescape(re.sub('<[^<]+?>', '', flagged_article.get('title', '')))
-            
-            if flagged_level == "high":
-                severity = "high"
-                messages.append(f"🚨 RECENT NEWS ALERT: {title_clean}")
-            else:
-                severity = bump_severity(severity, "medium")
-                messages.append(f"📰 Recent weather advisory: {title_clean}")
-
-            if icon == "🟢":
-                icon = "📰"
-
-    # If no issues at all
-    if not messages:
-        messages = [f"✅ Conditions look stable. No major alerts in the past week. (Avg Temp: {week_avg_temp:.1f}°C, Total Rain: {week_total_rain:.1f}mm, Avg AQI: {week_avg_aqi:.0f})"]
-        severity = "normal"
-        icon = "🟢"
-
-    # Decide alert bar color
-    if severity == "high":
-        bg = "#7f1d1d"
-        border = "#fecaca"
-    elif severity == "medium":
-        bg = "#78350f"
-        border = "#fed7aa"
+    if query:
+        names = [station.name for station in registry.search(query, limit=STATION_SEARCH_LIMIT)]
     else:
-        bg = "#022c22"
-        border = "#bbf7d0"
+        names = registry.names[:MAX_STATION_OPTIONS]
+    selected = [selected] if isinstance(selected, str) else list(selected or [])
+    kept = [name for name in selected if name in registry and name not in names]
+    return kept + names or registry.names[:MAX_STATION_OPTIONS]
 
-    return icon, messages, bg, border, severity
-
-def render_alert_bar(current_row, location_name, location_data_week, news_articles=None):
-    icon, messages, bg, border, severity = get_alert_status(current_row, location_data_week, news_articles=news_articles)
+# ------------------------------------------------------------
+# Alert Bar
+# ------------------------------------------------------------
+def render_alert_bar(current_row, location_name, location_data_week, news_articles=None, nearby=None,
+                     anomalies=None):
+    icon, messages, bg, border, severity = get_alert_status(
+        current_row, location_data_week, news_articles=news_articles, nearby=nearby, anomalies=anomalies
+    )
     msg_html = "<br>".join(messages)
     
     severity_class = "high-severity" if severity == "high" else ""
@@ -791,153 +460,168 @@ def render_map_legend():
         unsafe_allow_html=True
     )
 
-# ============================================================
-# Main App
-# ============================================================
-data = load_sample_data()
-
-# Sidebar Controls
-st.sidebar.title("⚙️ Controls")
-
-selected_location = st.sidebar.selectbox(
-    "Select Location",
-    sorted(data['location'].unique())
-)
-
-selected_parameter = st.sidebar.selectbox(
-    "Select Parameter",
-    ['temperature', 'air_quality', 'rainfall']
-)
-
-# Set default date range to last 60 days
-data_end = data['date'].max()
-data_start = data['date'].min()
-
-date_range = st.sidebar.date_input(
-    "Select Date Range",
-    [data_start.date(), data_end.date()],
-    min_value=data_start.date(),
-    max_value=data_end.date()
-)
-
-forecast_days = st.sidebar.slider(
-    "Forecast Horizon (days)",
-    min_value=7,
-    max_value=60,
-    value=30,
-    step=7
-)
-
-st.sidebar.markdown("---")
-render_map_legend()
-
-st.sidebar.markdown(
-    """
-    ---
-    **Tip:** The alert bar combines live metrics  
-    + latest weather-related news headlines for the selected city.
-    """
-)
-
-# Title & Subtitle
-st.title("🌍 Environmental Monitoring Dashboard – Indian State Capitals")
-st.markdown(
-    "Real-time style insights (simulated data) for temperature, air quality, "
-    "rainfall, and weather-related news across Indian state capitals and key union territories."
-)
-
-# Prep location-specific data
-loc_data_all = data[data["location"] == selected_location].sort_values("date")
-current_data = loc_data_all.iloc[-1]
-prev_row = loc_data_all.iloc[-2]
-
-# Get past week data for alert analysis
-week_ago = loc_data_all['date'].max() - timedelta(days=7)
-loc_data_week = loc_data_all[loc_data_all['date'] >= week_ago]
-
-# Fetch news for selected city
-city_keyword = extract_city_keyword(selected_location)
-news_data = fetch_weather_news(city_keyword)
-weather_news = news_data["articles"]
-news_error = news_data["error"]
-
-# ============================================================
-# ALERT BAR (Top) – now uses past week data + recent news only
-# ============================================================
-render_alert_bar(current_data, selected_location, loc_data_week, news_articles=weather_news)
-
-# ============================================================
-# Layout Tabs
-# ============================================================
-tab_overview, tab_trend, tab_data, tab_news = st.tabs(
-    ["🌐 Overview", "📈 Trends & Forecast", "📊 Raw Data", "📰 Weather News"]
-)
+# ------------------------------------------------------------
+# Map Helpers
+# ------------------------------------------------------------
+MAX_MAP_MARKERS = 300  # payload cap for the interactive (viewport) map
+
+def parse_map_view(state):
+    """(bounds, zoom, center) from st_folium's return value, or None."""
+    if not state or not state.get("bounds") or not state["bounds"].get("_southWest"):
+        return None
+    sw, ne = state["bounds"]["_southWest"], state["bounds"]["_northEast"]
+    bounds = tuple(round(v, 4) for v in (sw["lat"], sw["lng"], ne["lat"], ne["lng"]))
+    center = state.get("center") or {}
+    center = (center.get("lat", MAP_CENTER[0]), center.get("lng", MAP_CENTER[1]))
+    return bounds, state.get("zoom") or MAP_ZOOM, center
+
+def store_map_view():
+    """st_folium on_change: remember the viewport the user panned/zoomed to."""
+    new_view = parse_map_view(st.session_state.get("overview_map"))
+    if new_view:
+        st.session_state["map_view"] = new_view
 
 # ------------------------------------------------------------
-# OVERVIEW TAB
+# Panels
 # ------------------------------------------------------------
-with tab_overview:
+# Each panel is a fragment: interacting with a widget inside a panel
+# reruns only that panel, not the sidebar, the alert bar or the news fetch.
+VIEWS = ["🌐 Overview", "🗺️ States & Regions", "📈 Trends & Forecast", "📊 Raw Data", "🕒 Alert History",
+         "📰 Weather News"]
+
+@st.fragment
+def render_overview_panel(dataset, selected_location, current_data, prev_row, nearby_radius_km):
     col_map, col_stats = st.columns([2.2, 1])
 
     with col_map:
         st.subheader("Geographic Visualization")
         
         # Map type selector
-        map_type = st.radio(
+        col_style, col_mode = st.columns(2)
+        map_type = col_style.radio(
             "Map Style",
             ["Satellite", "Street View"],
             horizontal=True,
             key="map_type_selector"
         )
-        
+        map_mode = col_mode.radio(
+            "Map Mode",
+            ["Static", "Interactive"],
+            horizontal=True,
+            key="map_mode",
+            help="Interactive mode sends only the stations (or clusters) in the current view."
+        )
+        interactive = map_mode == "Interactive"
+        colour_by = st.radio(
+            "Colour Stations By",
+            ["severity", "anomaly_level"],
+            format_func={"severity": "Fixed thresholds", "anomaly_level": "Anomaly vs. seasonal norm"}.get,
+            horizontal=True,
+            key="map_colour_by",
+            help="Anomaly compares each station with its own day-of-year baseline (z-score and its EWMA)."
+        )
+        view = st.session_state.get("map_view") if interactive else None
+        center, zoom = (view[2], view[1]) if view else (MAP_CENTER, MAP_ZOOM)
+
+        col_layer, col_day = st.columns(2)
+        heatmap_metric = col_layer.selectbox(
+            "Heatmap Layer",
+            ["none"] + list(HEATMAP_METRICS),
+            format_func=lambda m: HEATMAP_METRICS.get(m, "None"),
+            key="heatmap_metric"
+        )
+        heatmap_day = dataset.days[-1]
+        if heatmap_metric != "none":
+            heatmap_day = col_day.select_slider(
+                "Heatmap Date",
+                options=dataset.days,
+                value=dataset.days[-1],
+                format_func=lambda d: d.strftime("%d %b %Y"),
+                key="heatmap_day"
+            )
+
         st.markdown("<div class='card'>", unsafe_allow_html=True)
 
-        # Create map based on selection
-        if map_type == "Satellite":
-            # Satellite view using ESRI World Imagery
-            m = folium.Map(
-                location=[20.5937, 78.9629],
-                zoom_start=4,
-                tiles="https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}",
-                attr="Esri World Imagery"
-            )
+        # Create map based on selection. The base map never moves: in
+        # interactive mode the viewport is passed to st_folium separately so
+        # the component is updated in place rather than remounted.
+        # Satellite (ESRI World Imagery) or light street view
+        m = base_map(map_type)
+
+        # Interpolated surface as a single image overlay (not thousands of polygons)
+        if heatmap_metric != "none":
+            image, (vmin, vmax) = get_heatmap_layer(dataset.version, heatmap_metric, heatmap_day)
+            lat_min, lon_min, lat_max, lon_max = INDIA_BOUNDS
+            folium.raster_layers.ImageOverlay(
+                image=image,
+                bounds=[[lat_min, lon_min], [lat_max, lon_max]],
+                opacity=0.6,
+                mercator_project=True,
+                name=HEATMAP_METRICS[heatmap_metric]
+            ).add_to(m)
+
+        # Stations near the selected one, from the spatial index
+        nearby = dataset.nearby(selected_location, nearby_radius_km) if nearby_radius_km > 0 else []
+        highlighted = {name for name, _, _ in nearby} | {selected_location}
+        if nearby_radius_km > 0:
+            folium.Circle(
+                location=list(dataset.stations.position(selected_location)),
+                radius=nearby_radius_km * 1000,
+                color="#3b82f6",
+                fill=False,
+                weight=2,
+                dash_array="6"
+            ).add_to(m)
+
+        # Severity and anomaly level are precomputed once per data version in dataset.latest
+        latest = dataset.latest
+        if not interactive:
+            add_station_markers(m, latest, highlighted, colour_by)
+            folium_static(m, width=700, height=400)
         else:
-            # Light street view
-            m = folium.Map(
-                location=[20.5937, 78.9629],
-                zoom_start=4,
-                tiles="OpenStreetMap"
+            # Only the stations/clusters inside the last reported viewport are
+            # shipped, as a feature group updated without re-rendering the map
+            bounds = view[0] if view else INDIA_BOUNDS
+            station_idx, clusters = dataset.viewport.query(
+                bounds, zoom, max_markers=MAX_MAP_MARKERS, severities=latest[colour_by].to_numpy()
             )
-
-        latest_per_loc = data.sort_values("date").groupby("location").tail(1)
-        for _, row in latest_per_loc.iterrows():
-            # Assess severity for color coding
-            severity = assess_severity(row['temperature'], row['rainfall'], row['air_quality'])
-            marker_color = get_marker_color(severity)
-            
-            popup_text = (
-                f"<b>{row['location']}</b><br>"
-                f"Status: <b style='color:{marker_color}'>{severity.upper()}</b><br>"
-                f"Temp: {row['temperature']}°C<br>"
-                f"AQI: {row['air_quality']}<br>"
-                f"Rainfall: {row['rainfall']} mm"
+            markers = folium.FeatureGroup(name="Stations")
+            add_station_markers(markers, latest.iloc[station_idx], highlighted, colour_by)
+            add_cluster_markers(markers, clusters)
+
+            # Panning/zooming reruns this fragment with the new viewport
+            st_folium(
+                m,
+                key="overview_map",
+                width=700,
+                height=400,
+                center=center,
+                zoom=zoom,
+                feature_group_to_add=markers,
+                returned_objects=["bounds", "zoom", "center"],
+                on_change=store_map_view
             )
-            
-            folium.CircleMarker(
-                location=[row['lat'], row['lon']],
-                radius=8,
-                popup=popup_text,
-                tooltip=row['location'],
-                color=marker_color,
-                fill=True,
-                fillColor=marker_color,
-                fillOpacity=0.7,
-                weight=2
-            ).add_to(m)
 
-        folium_static(m, width=700, height=400)
+            st.caption(
+                f"🔎 Zoom {zoom}: {len(station_idx)} station(s) and {len(clusters['count'])} cluster(s) "
+                f"in view, of {len(dataset.locations)} stations."
+            )
         st.markdown("</div>", unsafe_allow_html=True)
 
+        if heatmap_metric != "none":
+            st.caption(
+                f"🌡️ {HEATMAP_METRICS[heatmap_metric]} interpolated by inverse-distance weighting "
+                f"on {heatmap_day.strftime('%d %b %Y')} (range {vmin:.1f} – {vmax:.1f}; "
+                f"cells more than 400 km from any station are left blank)."
+            )
+
+        if nearby_radius_km > 0:
+            if nearby:
+                listed = " · ".join(f"{name} – {sev} ({km:.0f} km)" for name, sev, km in nearby)
+                st.caption(f"📍 Within {nearby_radius_km} km of {selected_location}: {listed}")
+            else:
+                st.caption(f"📍 No other stations within {nearby_radius_km} km of {selected_location}.")
+
     with col_stats:
         st.subheader("Current Snapshot")
         st.markdown("<div class='card'>", unsafe_allow_html=True)
@@ -978,15 +662,148 @@ with tab_overview:
         )
 
         st.markdown("</div>", unsafe_allow_html=True)
-        
+
+        render_network_alerts()
+
         # Add legends
         render_aqi_legend()
         render_temp_legend()
 
-# ------------------------------------------------------------
-# TREND & FORECAST TAB
-# ------------------------------------------------------------
-with tab_trend:
+def render_network_alerts():
+    """Stations currently on alert, from the scheduler's precomputed alert table."""
+    table = get_scheduler().alert_table()
+    if table is None:
+        st.caption("🚨 Network alert summary is being computed in the background...")
+        return
+    flagged = table[table["severity"].isin(["high", "medium"])]
+    counts = flagged["severity"].value_counts()
+    with st.expander(
+        f"🚨 Network alerts: {counts.get('high', 0)} high · {counts.get('medium', 0)} medium "
+        f"of {len(table)} stations"
+    ):
+        if flagged.empty:
+            st.write("No stations are on alert.")
+        else:
+            order = flagged["severity"].map({"high": 0, "medium": 1}).sort_values(kind="stable").index
+            for row in flagged.loc[order].itertuples():
+                st.markdown(f"{row.icon} **{row.location}** – {row.messages[0] if row.messages else ''}")
+
+def render_similar_stations(dataset, selected_location, selected_parameter):
+    """Most-correlated stations (at their best lag) from the per-version similarity index."""
+    st.markdown("### Most Similar Stations")
+    max_lag = st.slider(
+        "Max lag (days)",
+        min_value=0,
+        max_value=7,
+        value=3,
+        key="similarity_max_lag",
+        help="Also compare each station with others shifted by up to this many days."
+    )
+    index = dataset.similarity(selected_parameter, max_lag=max_lag)
+    similar = index.similar(selected_location)
+    if not similar:
+        st.info("Not enough stations to compare.")
+        return
+
+    table = pd.DataFrame({
+        "Station": [name for name, _, _ in similar],
+        "Correlation": [round(c, 3) for _, c, _ in similar],
+        "Lag (days)": [lag for _, _, lag in similar],
+        "Distance (km)": [round(dataset.stations.distance_km(selected_location, name)) for name, _, _ in similar],
+    })
+    st.dataframe(table, use_container_width=True, hide_index=True)
+    st.caption(
+        f"Daily {selected_parameter.replace('_', ' ')} correlation with {selected_location}. "
+        "A positive lag means the other station follows this one by that many days; "
+        "a negative lag means it leads."
+    )
+
+MAX_COMPARE_STATIONS = 8
+MAX_CHART_POINTS = 500  # per series, after min/max downsampling
+
+def add_top_compare_match():
+    """When the comparison search text changes, add its best match to the compared stations."""
+    matches = get_dataset().stations.search(st.session_state.compare_query, limit=1)
+    stations = st.session_state.get("compare_stations", [])
+    if matches and matches[0].name not in stations and len(stations) < MAX_COMPARE_STATIONS:
+        st.session_state.compare_stations = stations + [matches[0].name]
+
+def render_comparison(dataset, selected_location, date_range):
+    """Several stations x all metrics, sliced from the per-version wide pivots."""
+    st.subheader("Station Comparison")
+    # Picks from an older data version may have left the network
+    picked = st.session_state.get("compare_stations", [selected_location])
+    st.session_state.compare_stations = [name for name in picked if name in dataset.stations]
+    col_stations, col_metrics = st.columns([2, 1])
+    # Same search as the sidebar picker: only matches (plus the current picks) are listed
+    compare_query = col_stations.text_input(
+        "Add stations",
+        key="compare_query",
+        placeholder="City, state or alias (e.g. Bombay, UP)",
+        on_change=add_top_compare_match
+    )
+    stations = col_stations.multiselect(
+        "Stations",
+        station_options(dataset.stations, compare_query, st.session_state.compare_stations),
+        max_selections=MAX_COMPARE_STATIONS,
+        key="compare_stations"
+    )
+    metrics = col_metrics.multiselect(
+        "Metrics",
+        list(HEATMAP_METRICS),
+        default=list(HEATMAP_METRICS),
+        format_func=HEATMAP_METRICS.get,
+        key="compare_metrics"
+    )
+    if not stations or not metrics:
+        st.info("Select at least one station and one metric to compare.")
+        return
+
+    if isinstance(date_range, (list, tuple)) and len(date_range) == 2:
+        start_date, end_date = pd.Timestamp(date_range[0]), pd.Timestamp(date_range[1])
+    else:
+        start_date, end_date = dataset.days[0], dataset.days[-1]
+
+    fig = make_subplots(
+        rows=len(metrics), cols=1, shared_xaxes=True, vertical_spacing=0.06,
+        subplot_titles=[HEATMAP_METRICS[m] for m in metrics]
+    )
+    palette = px.colors.qualitative.Plotly
+    n_days = 0
+    for row, metric in enumerate(metrics, start=1):
+        # Adding a station is a column slice of the cached pivot, not a filter of the frame
+        wide = dataset.wide(metric).loc[start_date:end_date, stations]
+        n_days = len(wide)
+        for i, (name, series) in enumerate(downsample_wide(wide, MAX_CHART_POINTS).items()):
+            fig.add_trace(go.Scatter(
+                x=series.index,
+                y=series.to_numpy(),
+                name=name,
+                legendgroup=name,
+                showlegend=row == 1,
+                mode='lines',
+                line=dict(width=2, color=palette[i % len(palette)])
+            ), row=row, col=1)
+
+    fig.update_layout(
+        height=240 * len(metrics) + 80,
+        margin=dict(l=10, r=10, t=40, b=10),
+        template='plotly_dark',
+        hovermode='x unified'
+    )
+    st.plotly_chart(fig, use_container_width=True)
+    st.caption(
+        f"{n_days} day(s) per series; long ranges are drawn with at most {MAX_CHART_POINTS} points "
+        "per series, keeping each bucket's minimum and maximum."
+    )
+
+@st.fragment
+def render_trend_panel(dataset, loc_data_all, selected_location, selected_parameter, date_range, forecast_days):
+    if st.toggle("Compare stations", key="trend_compare",
+                 help=f"Overlay up to {MAX_COMPARE_STATIONS} stations across all metrics."):
+        render_comparison(dataset, selected_location, date_range)
+        return
+
     st.subheader(f"{selected_parameter.title()} – Trend & Forecast for {selected_location}")
     st.markdown("<div class='card'>", unsafe_allow_html=True)
 
@@ -996,13 +813,12 @@ with tab_trend:
         end_date = pd.Timestamp(date_range[1])
     else:
         # Fallback to all data if date_range is invalid
-        start_date = data['date'].min()
-        end_date = data['date'].max()
+        start_date = loc_data_all['date'].min()
+        end_date = loc_data_all['date'].max()
 
-    filtered_data = data[
-        (data['location'] == selected_location) &
-        (data['date'] >= start_date) &
-        (data['date'] <= end_date)
+    filtered_data = loc_data_all[
+        (loc_data_all['date'] >= start_date) &
+        (loc_data_all['date'] <= end_date)
     ]
 
     if filtered_data.empty:
@@ -1023,87 +839,381 @@ with tab_trend:
         fig.update_traces(line=dict(width=3))
         st.plotly_chart(fig, use_container_width=True)
 
+    render_similar_stations(dataset, selected_location, selected_parameter)
+
     st.markdown("### Forecast")
     st.write(
         f"Generate a {forecast_days}-day forecast using Prophet based on the full history of "
         f"{selected_parameter.replace('_', ' ').title()} for **{selected_location}**."
     )
 
-    if st.button("🔮 Generate Forecast"):
-        with st.spinner("Training Prophet model and generating forecast..."):
-            forecast = create_forecast(loc_data_all, selected_parameter, days=forecast_days)
+    forecast_mode = st.radio(
+        "Uncertainty intervals",
+        list(FORECAST_MODE_LABELS),
+        format_func=FORECAST_MODE_LABELS.get,
+        horizontal=True,
+        key="forecast_mode"
+    )
 
-            fig_fc = go.Figure()
+    # Queued on the scheduler's worker pool; the chart shows once the fit lands.
+    # Each series is fitted once at MAX_FORECAST_DAYS, so the horizon slider only slices it.
+    scheduler = get_scheduler()
+    if st.button("🔮 Generate Forecast", key="generate_forecast"):
+        # A failed fit is retried now rather than after its backoff
+        scheduler.retry(('forecast', selected_location, selected_parameter, forecast_mode))
+        scheduler.forecast(selected_location, selected_parameter, forecast_days, mode=forecast_mode)
+    forecast = scheduler.forecast(selected_location, selected_parameter, forecast_days, request=False,
+                                  mode=forecast_mode)
+    forecast_error = scheduler.forecast_error(selected_location, selected_parameter, forecast_mode)
+
+    if forecast is None and forecast_error:
+        st.error(f"❌ The forecast could not be fitted: {forecast_error}. It is retried automatically; "
+                 f"press Generate Forecast to retry now.")
+    elif forecast is None and scheduler.forecast_pending(selected_location, selected_parameter, forecast_mode):
+        wait_for_refresh(
+            lambda: scheduler.forecast_pending(selected_location, selected_parameter, forecast_mode) is False,
+            "⏳ Training the Prophet model in the background; the forecast appears here when it is ready."
+        )
+    elif forecast is not None:
+        fig_fc = go.Figure()
+
+        fig_fc.add_trace(go.Scatter(
+            x=loc_data_all['date'],
+            y=loc_data_all[selected_parameter],
+            name='Actual',
+            mode='lines',
+            line=dict(width=3, color='#3b82f6')
+        ))
+
+        fig_fc.add_trace(go.Scatter(
+            x=forecast['ds'],
+            y=forecast['yhat'],
+            name='Forecast',
+            mode='lines',
+            line=dict(dash='dash', width=3, color='#10b981')
+        ))
+
+        fig_fc.add_trace(go.Scatter(
+            x=forecast['ds'],
+            y=forecast['yhat_upper'],
+            name='Upper Bound',
+            mode='lines',
+            line=dict(width=0),
+            showlegend=False,
+            hoverinfo='skip'
+        ))
+
+        fig_fc.add_trace(go.Scatter(
+            x=forecast['ds'],
+            y=forecast['yhat_lower'],
+            name='Confidence Interval',
+            mode='lines',
+            fill='tonexty',
+            fillcolor='rgba(16, 185, 129, 0.2)',
+            line=dict(width=0),
+            showlegend=True
+        ))
+
+        fig_fc.update_layout(
+            title=f"{selected_parameter.title()} Forecast – {selected_location}",
+            xaxis_title="Date",
+            yaxis_title=selected_parameter.title(),
+            margin=dict(l=10, r=10, t=40, b=10),
+            template='plotly_dark',
+            hovermode='x unified'
+        )
 
-            fig_fc.add_trace(go.Scatter(
-                x=loc_data_all['date'],
-                y=loc_data_all[selected_parameter],
-                name='Actual',
-                mode='lines',
-                line=dict(width=3, color='#3b82f6')
-            ))
+        st.plotly_chart(fig_fc, use_container_width=True)
 
-            fig_fc.add_trace(go.Scatter(
-                x=forecast['ds'],
-                y=forecast['yhat'],
-                name='Forecast',
-                mode='lines',
-                line=dict(dash='dash', width=3, color='#10b981')
-            ))
+    st.markdown("</div>", unsafe_allow_html=True)
 
-            fig_fc.add_trace(go.Scatter(
-                x=forecast['ds'],
-                y=forecast['yhat_upper'],
-                name='Upper Bound',
-                mode='lines',
-                line=dict(width=0),
-                showlegend=False,
-                hoverinfo='skip'
-            ))
-
-            fig_fc.add_trace(go.Scatter(
-                x=forecast['ds'],
-                y=forecast['yhat_lower'],
-                name='Confidence Interval',
-                mode='lines',
-                fill='tonexty',
-                fillcolor='rgba(16, 185, 129, 0.2)',
-                line=dict(width=0),
-                showlegend=True
-            ))
-
-            fig_fc.update_layout(
-                title=f"{selected_parameter.title()} Forecast – {selected_location}",
-                xaxis_title="Date",
-                yaxis_title=selected_parameter.title(),
-                margin=dict(l=10, r=10, t=40, b=10),
-                template='plotly_dark',
-                hovermode='x unified'
-            )
+@st.fragment
+def render_states_panel(dataset, selected_location):
+    """State choropleth and state/region comparisons, read from the precomputed rollups."""
+    rollups = dataset.rollups
+    st.subheader("States & Regions")
+
+    col_metric, col_day = st.columns([1, 2])
+    metric = col_metric.selectbox(
+        "Metric",
+        list(ROLLUP_METRICS),
+        format_func=ROLLUP_METRICS.get,
+        key="rollup_metric"
+    )
+    day = col_day.select_slider(
+        "Day",
+        options=list(rollups.days),
+        value=rollups.days[-1],
+        format_func=lambda d: d.strftime("%d %b %Y"),
+        key="rollup_day"
+    )
+    label = ROLLUP_METRICS[metric]
+    scale = "Blues" if metric == "rainfall_total" else "YlOrRd"
+    states_today = rollups.on(day)
+
+    geojson = get_states_geojson(STATES_GEOJSON_PATH)
+    if geojson is not None:
+        fig_map = px.choropleth(
+            states_today,
+            geojson=geojson,
+            locations="state",
+            featureidkey=STATES_GEOJSON_KEY,
+            color=metric,
+            color_continuous_scale=scale,
+            hover_data=["region", "readings", *SEVERITIES],
+            labels={metric: label}
+        )
+        fig_map.update_geos(fitbounds="locations", visible=False)
+    else:
+        bubbles = states_today.join(dataset.state_centroids, on="state")
+        fig_map = px.scatter_geo(
+            bubbles,
+            lat="lat",
+            lon="lon",
+            color=metric,
+            size="readings",
+            hover_name="state",
+            hover_data=["region", *SEVERITIES],
+            color_continuous_scale=scale,
+            labels={metric: label}
+        )
+        fig_map.update_geos(fitbounds="locations", showcountries=True, showland=True, landcolor="#1e293b")
+    fig_map.update_layout(
+        title=f"{label} by State – {day:%d %b %Y}",
+        margin=dict(l=10, r=10, t=40, b=10),
+        template='plotly_dark',
+        height=520
+    )
+    st.plotly_chart(fig_map, use_container_width=True)
+
+    col_regions, col_severity = st.columns(2)
+    with col_regions:
+        fig_regions = px.bar(
+            rollups.on(day, level="region"),
+            x="region",
+            y=metric,
+            color="region",
+            labels={metric: label, "region": "Region"},
+            title=f"{label} by Region"
+        )
+        fig_regions.update_layout(margin=dict(l=10, r=10, t=40, b=10), template='plotly_dark', showlegend=False)
+        st.plotly_chart(fig_regions, use_container_width=True)
+
+    with col_severity:
+        ranked = states_today.sort_values(["severe", "warning"], ascending=False).head(12)
+        fig_severity = px.bar(
+            ranked,
+            x="state",
+            y=list(SEVERITIES),
+            color_discrete_map={"normal": "#10b981", "warning": "#f59e0b", "severe": "#ef4444"},
+            labels={"value": "Readings", "state": "State", "variable": "Severity"},
+            title="Readings per Severity (most affected states)"
+        )
+        fig_severity.update_layout(margin=dict(l=10, r=10, t=40, b=10), template='plotly_dark')
+        st.plotly_chart(fig_severity, use_container_width=True)
+
+    all_states = sorted(states_today["state"])
+    home_state = dataset.stations.station(selected_location).state
+    compare = st.multiselect(
+        "Compare States",
+        all_states,
+        default=[home_state] if home_state in all_states else all_states[:1],
+        key="rollup_compare_states"
+    )
+    if compare:
+        fig_compare = px.line(
+            rollups.series(compare, metric),
+            labels={"value": label, "day": "Date", "state": "State"},
+            title=f"{label} – State Comparison"
+        )
+        fig_compare.update_layout(margin=dict(l=10, r=10, t=40, b=10), template='plotly_dark', hovermode='x unified')
+        st.plotly_chart(fig_compare, use_container_width=True)
 
-            st.plotly_chart(fig_fc, use_container_width=True)
+RAW_PAGE_SIZES = [25, 50, 100, 250]
+RAW_DEFAULT_COLUMNS = ["date", "temperature", "air_quality", "rainfall"]
+# In-app downloads are built in memory; larger exports are streamed by the JSON API
+RAW_EXPORT_MAX_ROWS = 200_000
+API_URL = os.environ.get("ENVIROTRACK_API_URL", "").rstrip("/")
 
-    st.markdown("</div>", unsafe_allow_html=True)
+def date_range_bounds(date_range):
+    """(start, end) timestamps covering whole days of the sidebar range, or (None, None)."""
+    if isinstance(date_range, (list, tuple)) and len(date_range) == 2:
+        return pd.Timestamp(date_range[0]), pd.Timestamp(date_range[1]) + pd.Timedelta(days=1) - pd.Timedelta(1, "ns")
+    return None, None
 
-# ------------------------------------------------------------
-# RAW DATA TAB
-# ------------------------------------------------------------
-with tab_data:
+@st.fragment
+def render_raw_data_panel(dataset, selected_location, date_range):
     st.subheader(f"Raw Data – {selected_location}")
     st.markdown("<div class='card'>", unsafe_allow_html=True)
 
-    st.dataframe(
-        loc_data_all.sort_values("date", ascending=False),
-        use_container_width=True,
-        height=400
+    # Filtering, sorting and paging run against the shared frame's row
+    # ranges; only the visible page is sent to the browser
+    col_columns, col_sort, col_order, col_severity = st.columns([2, 1, 1, 1.2])
+    all_columns = list(dataset.frame.columns)
+    columns = col_columns.multiselect("Columns", all_columns, default=RAW_DEFAULT_COLUMNS, key="raw_columns")
+    sort_by = col_sort.selectbox("Sort By", SORTABLE_COLUMNS, key="raw_sort_by")
+    descending = col_order.radio("Order", ["Descending", "Ascending"], key="raw_order") == "Descending"
+    severities = col_severity.multiselect("Severity", ["normal", "warning", "severe"], key="raw_severity")
+
+    start, end = date_range_bounds(date_range)
+    col_size, col_page, col_info = st.columns([1, 1, 2])
+    page_size = col_size.selectbox("Rows per Page", RAW_PAGE_SIZES, index=1, key="raw_page_size")
+    page = col_page.number_input("Page", min_value=1, value=1, step=1, key="raw_page")
+
+    rows, total = query_page(
+        dataset, selected_location, start=start, end=end, columns=columns or RAW_DEFAULT_COLUMNS,
+        sort_by=sort_by, descending=descending, severities=severities, page=page, page_size=page_size
     )
+    pages = max(1, -(-total // page_size))
+    if page > pages:
+        rows, _ = query_page(
+            dataset, selected_location, start=start, end=end, columns=columns or RAW_DEFAULT_COLUMNS,
+            sort_by=sort_by, descending=descending, severities=severities, page=pages, page_size=page_size
+        )
+        page = pages
+    first = (page - 1) * page_size
+    col_info.markdown(
+        f"<div style='padding-top: 2rem;'>Rows {min(first + 1, total)}–{first + len(rows)} of {total} "
+        f"· page {page} of {pages}</div>",
+        unsafe_allow_html=True
+    )
+
+    st.dataframe(rows, use_container_width=True, height=400, hide_index=True)
+
+    # Export: built in chunks only when the button is clicked. All-station
+    # exports always carry location and date (see export.iter_chunks)
+    col_scope, col_format, col_download = st.columns([1.5, 1, 1])
+    scope = col_scope.radio("Export", ["This station", "All stations"], horizontal=True, key="raw_export_scope")
+    fmt = col_format.radio("Format", list(EXPORT_FORMATS), horizontal=True, format_func=str.upper, key="raw_export_format")
+    locations = [selected_location] if scope == "This station" else None
+    export_columns = columns or None
+    export_rows = sum(stop - first for first, stop in dataset.row_ranges(locations, start, end))
+
+    def build_export():
+        return b"".join(iter_export(dataset, fmt, locations=locations, start=start, end=end, columns=export_columns))
+
+    city = dataset.stations.station(selected_location).city.lower().replace(" ", "_")
+    if export_rows <= RAW_EXPORT_MAX_ROWS:
+        col_download.download_button(
+            "⬇️ Download",
+            data=build_export,
+            file_name=f"envirotrack_{city if locations else 'all'}.{EXPORT_FORMATS[fmt][1]}",
+            mime=EXPORT_FORMATS[fmt][0],
+            on_click="ignore",
+            key="raw_download"
+        )
+    elif API_URL:
+        api_query = {"format": fmt}
+        if locations:
+            api_query["location"] = selected_location
+        if start is not None:
+            api_query.update(start=start.isoformat(), end=end.isoformat())
+        if export_columns:
+            api_query["columns"] = ",".join(export_columns)
+        col_download.link_button("⬇️ Download via API", f"{API_URL}/export?{urlencode(api_query)}")
+    else:
+        col_download.button("⬇️ Download", disabled=True, key="raw_download")
+
+    if export_rows > RAW_EXPORT_MAX_ROWS:
+        st.caption(
+            f"This export has {export_rows:,} rows; downloads built in the app are limited to "
+            f"{RAW_EXPORT_MAX_ROWS:,}. " + (
+                "The link streams it from the JSON API." if API_URL else
+                "Narrow the date range, or stream it from the JSON API (`python -m envirotrack serve`, "
+                "`/export?format=csv|parquet`) and set `ENVIROTRACK_API_URL` to link to it here."
+            )
+        )
+    else:
+        st.caption("Exports cover the sidebar date range.")
 
     st.markdown("</div>", unsafe_allow_html=True)
 
-# ------------------------------------------------------------
-# WEATHER NEWS TAB
-# ------------------------------------------------------------
-with tab_news:
+HISTORY_RECENT_DAYS = 7
+HISTORY_RECENT_ROWS = 50
+
+@st.fragment
+def render_history_panel(selected_location, date_range):
+    """Severity transitions read back from the alert history; past windows are never recomputed."""
+    st.subheader(f"Alert History – {selected_location}")
+    history = get_scheduler().history
+    if history is None:
+        st.info(
+            "Alert history is not being recorded. Set `ENVIROTRACK_ALERT_HISTORY` to a SQLite file "
+            "path and restart the dashboard to log every station's severity changes."
+        )
+        return
+
+    start, end = date_range_bounds(date_range)
+    events = history.events(selected_location, start=start, end=end)
+    before = history.severity_at(selected_location, start) if start is not None else None
+    current = history.current()
+    state = current[current["location"] == selected_location]
+
+    col_now, col_changes, col_first = st.columns(3)
+    if not state.empty:
+        col_now.metric("Current Severity", state["severity"].iloc[0].title(),
+                       help=f"Since {state['since'].iloc[0]:%Y-%m-%d %H:%M}")
+    col_changes.metric("Changes in Range", int(events["previous"].notna().sum()))
+    if not events.empty:
+        week = events[events["observed_at"] >= events["observed_at"].max() - pd.Timedelta(days=HISTORY_RECENT_DAYS)]
+        high = week[week["severity"] == "high"]
+        col_first.metric("First High This Week",
+                         f"{high['observed_at'].iloc[0]:%b %d %H:%M}" if not high.empty else "–")
+
+    if events.empty and before is None:
+        st.caption("No severity changes recorded for this station in the selected range.")
+    else:
+        # Step line: the level before the range, then one step per transition
+        times = ([start] if before is not None else []) + list(events["observed_at"])
+        levels = ([before] if before is not None else []) + list(events["severity"])
+        times.append(max(end.floor("s") if end is not None else times[-1], times[-1]))
+        levels.append(levels[-1])
+        fig = go.Figure(go.Scatter(
+            x=times, y=[SEVERITY_LEVELS[level] for level in levels], mode="lines+markers",
+            line=dict(shape="hv", width=3), text=levels, hovertemplate="%{x}<br>%{text}<extra></extra>",
+        ))
+        fig.update_layout(
+            yaxis=dict(tickvals=list(SEVERITY_LEVELS.values()), ticktext=[s.title() for s in SEVERITY_LEVELS],
+                       range=[-0.3, max(SEVERITY_LEVELS.values()) + 0.3]),
+            xaxis_title="Observed", margin=dict(l=10, r=10, t=30, b=10), height=260, template="plotly_dark",
+        )
+        st.plotly_chart(fig, use_container_width=True)
+        if not events.empty:
+            st.dataframe(
+                pd.DataFrame({
+                    "Observed": events["observed_at"],
+                    "From": events["previous"].fillna("–").str.title(),
+                    "To": events["icon"] + " " + events["severity"].str.title(),
+                    "Reason": [messages[0] if messages else "" for messages in events["messages"]],
+                }).iloc[::-1],
+                use_container_width=True, hide_index=True,
+            )
+
+    st.markdown(f"##### Network changes, last {HISTORY_RECENT_DAYS} days")
+    latest = history.stats()["last"]
+    recent = history.events(start=pd.Timestamp(latest) - pd.Timedelta(days=HISTORY_RECENT_DAYS)) \
+        if latest else events.iloc[:0]
+    recent = recent[recent["previous"].notna()].tail(HISTORY_RECENT_ROWS).iloc[::-1]
+    if recent.empty:
+        st.caption("No stations changed severity.")
+    else:
+        st.dataframe(
+            pd.DataFrame({
+                "Observed": recent["observed_at"],
+                "Station": recent["location"],
+                "Change": recent["previous"].str.title() + " → " + recent["severity"].str.title(),
+                "Reason": [messages[0] if messages else "" for messages in recent["messages"]],
+            }),
+            use_container_width=True, hide_index=True,
+        )
+
+@st.fragment
+def render_news_panel(selected_location, city_keyword):
+    # Served from the scheduler's cache (the alert bar already requested it)
+    news_data = get_news(selected_location)
+    weather_news = news_data["articles"]
+    news_error = news_data["error"]
+
     st.subheader(f"Latest Weather News – {city_keyword}")
     st.markdown(
         """
@@ -1115,7 +1225,12 @@ with tab_news:
     )
     st.markdown("<div class='card'>", unsafe_allow_html=True)
 
-    if news_error:
+    if news_data.get("pending"):
+        wait_for_refresh(
+            lambda: get_scheduler().news(selected_location) is not None,
+            f"⏳ Fetching the latest headlines for {city_keyword} in the background..."
+        )
+    elif news_error:
         st.warning(f"⚠️ {news_error}")
     elif not weather_news:
         st.info(f"🔍 No recent weather-related news articles found for {city_keyword}.")
@@ -1178,6 +1293,144 @@ with tab_news:
 
     st.markdown("</div>", unsafe_allow_html=True)
 
+@st.fragment
+def render_active_view(dataset, loc_data_all, current_data, prev_row, selected_location,
+                       selected_parameter, date_range, forecast_days, city_keyword, nearby_radius_km):
+    """View selector + the single visible panel. Only the active panel is executed."""
+    active_view = st.radio(
+        "View",
+        VIEWS,
+        horizontal=True,
+        key="active_view",
+        label_visibility="collapsed"
+    )
+
+    if active_view == VIEWS[0]:
+        render_overview_panel(dataset, selected_location, current_data, prev_row, nearby_radius_km)
+    elif active_view == VIEWS[1]:
+        render_states_panel(dataset, selected_location)
+    elif active_view == VIEWS[2]:
+        render_trend_panel(dataset, loc_data_all, selected_location, selected_parameter, date_range, forecast_days)
+    elif active_view == VIEWS[3]:
+        render_raw_data_panel(dataset, selected_location, date_range)
+    elif active_view == VIEWS[4]:
+        render_history_panel(selected_location, date_range)
+    else:
+        render_news_panel(selected_location, city_keyword)
+
+# ============================================================
+# Main App
+# ============================================================
+dataset = get_dataset()
+data = dataset.frame
+
+# Sidebar Controls
+st.sidebar.title("⚙️ Controls")
+
+station_query = st.sidebar.text_input(
+    "Find a Station",
+    key="station_query",
+    placeholder="City, state or alias (e.g. Bombay, UP)",
+    on_change=select_top_match
+)
+
+selected_location = st.sidebar.selectbox(
+    "Select Location",
+    station_options(dataset.stations, station_query, st.session_state.get("selected_location")),
+    key="selected_location"
+)
+if station_query and not dataset.stations.search(station_query, limit=1):
+    st.sidebar.caption(f"No stations match “{station_query}”.")
+
+selected_parameter = st.sidebar.selectbox(
+    "Select Parameter",
+    ['temperature', 'air_quality', 'rainfall'],
+    key="selected_parameter"
+)
+
+# Set default date range to last 60 days
+data_end = data['date'].max()
+data_start = data['date'].min()
+
+date_range = st.sidebar.date_input(
+    "Select Date Range",
+    [data_start.date(), data_end.date()],
+    min_value=data_start.date(),
+    max_value=data_end.date(),
+    key="date_range"
+)
+
+forecast_days = st.sidebar.slider(
+    "Forecast Horizon (days)",
+    min_value=7,
+    max_value=MAX_FORECAST_DAYS,
+    value=30,
+    step=7,
+    key="forecast_days"
+)
+
+nearby_radius_km = st.sidebar.slider(
+    "Nearby Stations Radius (km)",
+    min_value=0,
+    max_value=300,
+    value=NEARBY_RADIUS_KM,
+    step=10,
+    key="nearby_radius_km",
+    help="Stations within this distance are highlighted on the map and included in the alert bar."
+)
+
+st.sidebar.markdown("---")
+render_map_legend()
+
+st.sidebar.markdown(
+    """
+    ---
+    **Tip:** The alert bar combines live metrics  
+    + latest weather-related news headlines for the selected city.
+    """
+)
+
+if DEBUG_PANEL or st.query_params.get("debug") == "1":
+    render_debug_panel()
+
+# Title & Subtitle
+st.title("🌍 Environmental Monitoring Dashboard – Indian State Capitals")
+st.markdown(
+    "Real-time style insights (simulated data) for temperature, air quality, "
+    "rainfall, and weather-related news across Indian state capitals and key union territories."
+)
+
+# Prep location-specific data
+loc_data_all = dataset.location_slice(selected_location)
+current_data = loc_data_all.iloc[-1]
+prev_row = loc_data_all.iloc[-2] if len(loc_data_all) > 1 else current_data
+
+# Get past week data for alert analysis
+week_ago = loc_data_all['date'].max() - timedelta(days=7)
+loc_data_week = loc_data_all[loc_data_all['date'] >= week_ago]
+
+# Fetch news for selected city
+city_keyword = dataset.stations.station(selected_location).city
+news_data = get_news(selected_location)
+weather_news = news_data["articles"]
+
+# ============================================================
+# ALERT BAR (Top) – now uses past week data + recent news only
+# ============================================================
+nearby = dataset.nearby(selected_location, nearby_radius_km) if nearby_radius_km > 0 else None
+render_alert_bar(
+    current_data, selected_location, loc_data_week, news_articles=weather_news, nearby=nearby,
+    anomalies=dataset.anomaly(selected_location)
+)
+
+# ============================================================
+# Active View (replaces st.tabs, which executed every tab body)
+# ============================================================
+render_active_view(
+    dataset, loc_data_all, current_data, prev_row, selected_location,
+    selected_parameter, date_range, forecast_days, city_keyword, nearby_radius_km
+)
+
 # ============================================================
 # FOOTER
 # ============================================================
@@ -0,0 +1,20 @@
+"""
+EnviroTrack core: data, severity/alert logic and batch jobs, importable
+without Streamlit. The dashboard (app.py) and the CLI
+(``python -m envirotrack``) are both built on this package.
+"""
+from .alerts import assess_severity, assess_severity_array, get_alert_status, get_marker_color
+from .data import STATIONS, Dataset, DatasetHolder, extract_city_keyword, extract_state, load_sample_data
+
+__all__ = [
+    "STATIONS",
+    "Dataset",
+    "DatasetHolder",
+    "assess_severity",
+    "assess_severity_array",
+    "extract_city_keyword",
+    "extract_state",
+    "get_alert_status",
+    "get_marker_color",
+    "load_sample_data",
+]
@@ -0,0 +1,216 @@
+"""
+Severity classification and alert evaluation for a single station.
+"""
+import html
+import re
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+from .anomalies import ANOMALY_SEVERE, ANOMALY_WARNING
+
+# ------------------------------------------------------------
+# Severity Assessment Function
+# ------------------------------------------------------------
+def assess_severity(temp, rain, aqi):
+    """Returns 'normal', 'warning', or 'severe'"""
+    if temp >= 42 or rain >= 80 or aqi >= 300:
+        return 'severe'
+    elif temp >= 38 or temp <= 5 or rain >= 30 or aqi >= 200:
+        return 'warning'
+    else:
+        return 'normal'
+
+def assess_severity_array(temp, rain, aqi):
+    """Vectorized assess_severity over equal-length arrays/Series."""
+    temp, rain, aqi = np.asarray(temp), np.asarray(rain), np.asarray(aqi)
+    severe = (temp >= 42) | (rain >= 80) | (aqi >= 300)
+    warning = (temp >= 38) | (temp <= 5) | (rain >= 30) | (aqi >= 200)
+    return np.select([severe, warning], ['severe', 'warning'], default='normal')
+
+def get_marker_color(severity):
+    """Returns color code for map markers"""
+    if severity == 'severe':
+        return 'red'
+    elif severity == 'warning':
+        return 'orange'
+    else:
+        return 'green'
+
+# ------------------------------------------------------------
+# Alert / Warning Logic (Past Week Only)
+# ------------------------------------------------------------
+def get_alert_status(current_row, location_data_week, news_articles=None, nearby=None, anomalies=None):
+    """
+    Decide alert severity + text based on:
+    - Current metrics
+    - Past week's weather patterns
+    - Recent news (last 7 days only)
+    - Nearby stations, given as [(name, severity, distance_km)]
+    - Anomalies against the station's seasonal baseline, given as {metric: score}
+    """
+    temp = current_row["temperature"]
+    rain = current_row["rainfall"]
+    aqi = current_row["air_quality"]
+
+    messages = []
+    severity = "normal"
+    icon = "🟢"
+    sev_order = ["normal", "medium", "high"]
+
+    def bump_severity(current, new_level):
+        return max(current, new_level, key=lambda s: sev_order.index(s))
+
+    # Analyze past week patterns
+    week_avg_temp = location_data_week['temperature'].mean()
+    week_max_temp = location_data_week['temperature'].max()
+    week_total_rain = location_data_week['rainfall'].sum()
+    week_avg_aqi = location_data_week['air_quality'].mean()
+
+    # Current Temperature conditions
+    if temp >= 42:
+        messages.append(f"🔥 Heatwave conditions detected (Current: {temp}°C, Week Avg: {week_avg_temp:.1f}°C).")
+        severity = "high"
+        icon = "🔥"
+    elif temp >= 38:
+        messages.append(f"☀️ High temperature alert (Current: {temp}°C).")
+        severity = bump_severity(severity, "medium")
+        if icon == "🟢":
+            icon = "☀️"
+    elif temp <= 5:
+        messages.append(f"❄️ Very low temperature alert (Current: {temp}°C).")
+        severity = bump_severity(severity, "medium")
+        if icon == "🟢":
+            icon = "❄️"
+
+    # Check for unusual temperature changes in past week
+    if week_max_temp - temp > 10:
+        messages.append(f"⚠️ Significant temperature drop from week's peak ({week_max_temp:.1f}°C to {temp:.1f}°C).")
+        severity = bump_severity(severity, "medium")
+
+    # Current Rainfall / storm conditions
+    if rain >= 80:
+        messages.append(f"🌀 Extreme rainfall – cyclone-like / severe storm risk (Current: {rain} mm, Week Total: {week_total_rain:.1f} mm).")
+        severity = "high"
+        icon = "🌀"
+    elif rain >= 30:
+        messages.append(f"⛈️ Heavy rainfall – storm / flooding risk (Current: {rain} mm).")
+        severity = bump_severity(severity, "medium")
+        if icon == "🟢":
+            icon = "⛈️"
+
+    # Check weekly rainfall accumulation
+    if week_total_rain >= 200:
+        messages.append(f"💧 Very high weekly rainfall accumulation ({week_total_rain:.1f} mm) - flood risk remains elevated.")
+        severity = bump_severity(severity, "medium")
+
+    # Current AQI conditions
+    if aqi >= 300:
+        messages.append(f"☠️ Hazardous air quality (Current AQI: {aqi}, Week Avg: {week_avg_aqi:.0f}). Limit outdoor activity.")
+        severity = "high"
+        if icon == "🟢":
+            icon = "☠️"
+    elif aqi >= 200:
+        messages.append(f"😷 Very poor air quality (Current AQI: {aqi}). Wear masks outdoors.")
+        severity = bump_severity(severity, "medium")
+        if icon == "🟢":
+            icon = "😷"
+
+    # News-driven alerts (ONLY from past 7 days)
+    if news_articles:
+        # Filter news from past 7 days only
+        recent_articles = []
+        cutoff_date = datetime.now(timezone.utc) - timedelta(days=7)
+
+        for art in news_articles:
+            try:
+                pub_timestamp = art.get('pub_timestamp')
+                if pub_timestamp and pd.notna(pub_timestamp):
+                    # Make timestamp timezone-aware if it isn't
+                    if pub_timestamp.tzinfo is None:
+                        pub_timestamp = pub_timestamp.tz_localize('UTC')
+
+                    if pub_timestamp >= cutoff_date:
+                        recent_articles.append(art)
+            except:
+                # If parsing fails, skip this article
+                continue
+
+        # Only check recent articles (past week)
+        severe_keywords_high = ["cyclone", "landslide", "red alert", "severe storm", "emergency", "disaster"]
+        severe_keywords_med = ["flood", "flooding", "heatwave", "cold wave", "heavy rain", "orange alert", "yellow alert"]
+        flagged_article = None
+        flagged_level = None
+
+        for art in recent_articles:
+            title_clean = art.get("title", "")
+            desc_clean = art.get("description", "")
+            text = (title_clean + " " + desc_clean).lower()
+
+            if any(k in text for k in severe_keywords_high):
+                flagged_article = art
+                flagged_level = "high"
+                break
+            elif any(k in text for k in severe_keywords_med) and flagged_level is None:
+                flagged_article = art
+                flagged_level = "medium"
+
+        if flagged_article:
+            # Clean the title
+            title_clean = html.unescape(re.sub('<[^<]+?>', '', flagged_article.get('title', '')))
+
+            if flagged_level == "high":
+                severity = "high"
+                messages.append(f"🚨 RECENT NEWS ALERT: {title_clean}")
+            else:
+                severity = bump_severity(severity, "medium")
+                messages.append(f"📰 Recent weather advisory: {title_clean}")
+
+            if icon == "🟢":
+                icon = "📰"
+
+    # Nearby stations (from the spatial index)
+    if nearby:
+        flagged = [(name, sev, km) for name, sev, km in nearby if sev != 'normal']
+        if flagged:
+            listed = ", ".join(f"{name} – {sev} ({km:.0f} km)" for name, sev, km in flagged[:3])
+            more = f" and {len(flagged) - 3} more" if len(flagged) > 3 else ""
+            messages.append(f"📍 Nearby station alerts: {listed}{more}.")
+            if any(sev == 'severe' for _, sev, _ in flagged):
+                severity = bump_severity(severity, "medium")
+                if icon == "🟢":
+                    icon = "📍"
+
+    # Unusual for this station and time of year (relative, not absolute, thresholds)
+    if anomalies:
+        unusual = {m: z for m, z in anomalies.items() if pd.notna(z) and abs(z) >= ANOMALY_WARNING}
+        if unusual:
+            listed = ", ".join(
+                f"{m.replace('_', ' ')} {'above' if z > 0 else 'below'} normal (score {z:+.1f})"
+                for m, z in unusual.items()
+            )
+            messages.append(f"📈 Unusual for this station and season: {listed}.")
+            if any(abs(z) >= ANOMALY_SEVERE for z in unusual.values()):
+                severity = bump_severity(severity, "medium")
+            if icon == "🟢":
+                icon = "📈"
+
+    # If no issues at all
+    if not messages:
+        messages = [f"✅ Conditions look stable. No major alerts in the past week. (Avg Temp: {week_avg_temp:.1f}°C, Total Rain: {week_total_rain:.1f}mm, Avg AQI: {week_avg_aqi:.0f})"]
+        severity = "normal"
+        icon = "🟢"
+
+    # Decide alert bar color
+    if severity == "high":
+        bg = "#7f1d1d"
+        border = "#fecaca"
+    elif severity == "medium":
+        bg = "#78350f"
+        border = "#fed7aa"
+    else:
+        bg = "#022c22"
+        border = "#bbf7d0"
+
+    return icon, messages, bg, border, severity
@@ -0,0 +1,235 @@
+"""
+Anomaly scores against per-station day-of-year climatology.
+
+Every station keeps running count / sum / sum-of-squares of each metric per
+day of year, already smoothed over a +/- window_days circular window, so a
+baseline lookup is a single gather and a new reading updates the window
+with one scatter. Readings are scored as z-scores against their station's
+baseline, then smoothed per station with an EWMA (adjust=False), which can
+be continued one reading at a time in streaming mode.
+
+A metric's score is the EWMA (sustained departures) or the raw z divided
+by SPIKE_FACTOR (single-day spikes), whichever is further from zero.
+"""
+import numpy as np
+import pandas as pd
+
+ANOMALY_METRICS = ('temperature', 'air_quality', 'rainfall')
+
+# Metrics scored on a transformed scale (rainfall is heavily right-skewed)
+TRANSFORMS = {'rainfall': np.log1p}
+
+# |score| thresholds, matching the severity names used by the map. A raw
+# z counts 1/SPIKE_FACTOR as much as the EWMA, so one-day spikes need
+# |z| >= 3 (warning) or 4.5 (severe) while noise rarely crosses them.
+ANOMALY_WARNING = 2.0
+ANOMALY_SEVERE = 3.0
+SPIKE_FACTOR = 1.5
+
+DAYS_IN_YEAR = 366
+
+
+def anomaly_level(score):
+    """'normal' / 'warning' / 'severe' from absolute anomaly scores (array-friendly)."""
+    score = np.abs(np.asarray(score, dtype=float))
+    return np.select([score >= ANOMALY_SEVERE, score >= ANOMALY_WARNING], ['severe', 'warning'], default='normal')
+
+def _day_of_year(dates):
+    return pd.DatetimeIndex(dates).dayofyear.to_numpy() - 1
+
+
+class AnomalyEngine:
+    """
+    Per-station climatology with vectorized batch scoring and streaming updates.
+
+    Baselines with fewer than min_count readings in their window fall back
+    to the station's all-year statistics. Memory is
+    stations x 366 x metrics x 3 float32 values.
+    """
+
+    def __init__(self, metrics=ANOMALY_METRICS, window_days=15, halflife_days=3.0,
+                 min_count=8, min_std=1e-3):
+        self.metrics = tuple(metrics)
+        self.window_days = window_days
+        self.alpha = 1 - np.exp(np.log(0.5) / halflife_days)
+        self.min_count = min_count
+        self.min_std = min_std
+        self.locations = []
+        self._ids = {}
+        shape = (0, DAYS_IN_YEAR, len(self.metrics))
+        self._count = np.zeros(shape, dtype=np.float32)
+        self._sum = np.zeros(shape, dtype=np.float32)
+        self._sumsq = np.zeros(shape, dtype=np.float32)
+        self._last_z = np.empty((0, len(self.metrics)))
+        self._ewma = np.empty((0, len(self.metrics)))
+        self._last_date = np.empty(0, dtype='datetime64[ns]')
+
+    def copy(self):
+        """Independent copy, so a published Dataset's engine is never mutated."""
+        other = object.__new__(AnomalyEngine)
+        other.__dict__.update(self.__dict__)
+        other.locations = list(self.locations)
+        other._ids = dict(self._ids)
+        for name in ('_count', '_sum', '_sumsq', '_last_z', '_ewma', '_last_date'):
+            setattr(other, name, getattr(self, name).copy())
+        return other
+
+    # --------------------------------------------------------
+    # Internals
+    # --------------------------------------------------------
+    def _station_ids(self, locations):
+        names, codes = np.unique(np.asarray(locations, dtype=object), return_inverse=True)
+        new = [name for name in names if name not in self._ids]
+        if new:
+            for name in new:
+                self._ids[name] = len(self.locations)
+                self.locations.append(name)
+            grow = ((0, len(new)), (0, 0), (0, 0))
+            self._count = np.pad(self._count, grow)
+            self._sum = np.pad(self._sum, grow)
+            self._sumsq = np.pad(self._sumsq, grow)
+            self._last_z = np.pad(self._last_z, ((0, len(new)), (0, 0)), constant_values=np.nan)
+            self._ewma = np.pad(self._ewma, ((0, len(new)), (0, 0)), constant_values=np.nan)
+            self._last_date = np.concatenate([self._last_date, np.full(len(new), np.datetime64('NaT'), dtype='datetime64[ns]')])
+        lookup = np.array([self._ids[name] for name in names], dtype=np.int64)
+        return lookup[codes]
+
+    def _values(self, frame):
+        columns = []
+        for metric in self.metrics:
+            values = frame[metric].to_numpy(dtype=float)
+            transform = TRANSFORMS.get(metric)
+            columns.append(transform(values) if transform else values)
+        return np.stack(columns, axis=1)
+
+    def _accumulate(self, ids, doy, values):
+        """Add readings to every day-of-year bin whose window covers them."""
+        valid = np.isfinite(values)
+        clean = np.where(valid, values, 0.0)
+        n_stations = self._count.shape[0]
+        size = n_stations * DAYS_IN_YEAR
+        offsets = np.arange(-self.window_days, self.window_days + 1)
+        if len(ids) * len(offsets) < size:
+            # Small (streaming) batches: scatter straight into the window bins
+            rows = np.repeat(ids, len(offsets))
+            bins = ((doy[:, None] + offsets[None, :]) % DAYS_IN_YEAR).ravel()
+            for target, contribution in ((self._count, valid), (self._sum, clean), (self._sumsq, clean * clean)):
+                np.add.at(target, (rows, bins), np.repeat(contribution, len(offsets), axis=0).astype(np.float32))
+            return
+
+        # Large batches: bin raw readings per (station, day, metric), then
+        # take circular window sums as differences of a wrapped cumsum
+        n_metrics = len(self.metrics)
+        w = self.window_days
+        flat = ((ids * DAYS_IN_YEAR + doy)[:, None] * n_metrics + np.arange(n_metrics)).ravel()
+        for target, contribution in ((self._count, valid), (self._sum, clean), (self._sumsq, clean * clean)):
+            binned = np.bincount(flat, weights=contribution.ravel(), minlength=size * n_metrics)
+            binned = binned.reshape(n_stations, DAYS_IN_YEAR, n_metrics)
+            wrapped = np.concatenate([binned[:, -w - 1:], binned, binned[:, :w]], axis=1)
+            cumulative = np.cumsum(wrapped, axis=1)
+            target += (cumulative[:, 2 * w + 1:] - cumulative[:, :-2 * w - 1]).astype(np.float32)
+
+    def _z(self, ids, doy, values):
+        count = self._count[ids, doy].astype(float)
+        total = self._sum[ids, doy].astype(float)
+        total_sq = self._sumsq[ids, doy].astype(float)
+
+        # Sparse windows fall back to the station's all-year statistics
+        sparse = count < self.min_count
+        if sparse.any():
+            year_count = self._count[ids].sum(axis=1, dtype=float)
+            count = np.where(sparse, year_count, count)
+            total = np.where(sparse, self._sum[ids].sum(axis=1, dtype=float), total)
+            total_sq = np.where(sparse, self._sumsq[ids].sum(axis=1, dtype=float), total_sq)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = total / count
+            var = np.maximum(total_sq / count - mean * mean, 0.0)
+            std = np.maximum(np.sqrt(var), self.min_std)
+            z = (values - mean) / std
+        return np.where(count >= 2, z, np.nan)
+
+    def _ewma_step(self, previous, z):
+        """One EWMA step; stations without a previous value start at z, missing z keeps the state."""
+        step = np.where(np.isnan(previous), z, self.alpha * z + (1 - self.alpha) * previous)
+        return np.where(np.isnan(z), previous, step)
+
+    def _columns(self, z, ewma):
+        out = {}
+        spike = z / SPIKE_FACTOR
+        scores = np.where(np.nan_to_num(np.abs(spike)) > np.nan_to_num(np.abs(ewma)), spike, ewma)
+        for j, metric in enumerate(self.metrics):
+            out[f'{metric}_z'] = z[:, j]
+            out[f'{metric}_ewma'] = ewma[:, j]
+            out[f'{metric}_score'] = scores[:, j]
+        score = np.nan_to_num(np.abs(scores)).max(axis=1)
+        out['anomaly'] = score
+        out['anomaly_level'] = anomaly_level(score)
+        return out
+
+    # --------------------------------------------------------
+    # Batch and streaming scoring
+    # --------------------------------------------------------
+    def fit(self, frame):
+        """
+        Build baselines from all rows, then score them in one vectorized pass.
+
+        Returns a frame of per-row scores aligned with frame's index.
+        Scores are in-sample: each reading is part of its own baseline.
+        """
+        ids = self._station_ids(frame['location'])
+        doy = _day_of_year(frame['date'])
+        values = self._values(frame)
+        self._accumulate(ids, doy, values)
+        z = self._z(ids, doy, values)
+
+        # EWMA over a (date x station x metric) cube: one vectorized step per
+        # date for all stations at once, continuing from any existing state
+        dates = frame['date'].to_numpy()
+        date_codes, unique_dates = pd.factorize(dates, sort=True)
+        cube = np.full((len(unique_dates),) + self._ewma.shape, np.nan)
+        cube[date_codes, ids] = z
+        state = self._ewma
+        for t in range(len(unique_dates)):
+            state = self._ewma_step(state, cube[t])
+            cube[t] = state
+        self._ewma = state
+        ewma = cube[date_codes, ids]
+
+        order = np.lexsort((dates, ids))
+        last_rows = order[np.r_[ids[order][1:] != ids[order][:-1], True]]
+        self._last_z[ids[last_rows]] = z[last_rows]
+        self._last_date[ids[last_rows]] = dates[last_rows]
+        return pd.DataFrame(self._columns(z, ewma), index=frame.index)
+
+    def update(self, new_rows):
+        """
+        Streaming mode: score new readings against the current baselines,
+        continue each station's EWMA, then fold the readings into the
+        baselines. Rows are processed in date order.
+        """
+        new_rows = new_rows.sort_values('date', kind='stable')
+        ids = self._station_ids(new_rows['location'])
+        doy = _day_of_year(new_rows['date'])
+        values = self._values(new_rows)
+        dates = new_rows['date'].to_numpy()
+
+        z = np.empty_like(values)
+        ewma = np.empty_like(values)
+        starts = np.flatnonzero(np.r_[True, dates[1:] != dates[:-1]])
+        for start, stop in zip(starts, np.r_[starts[1:], len(dates)]):
+            part = slice(start, stop)
+            z[part] = self._z(ids[part], doy[part], values[part])
+            ewma[part] = self._ewma_step(self._ewma[ids[part]], z[part])
+            self._ewma[ids[part]] = ewma[part]
+            self._last_z[ids[part]] = z[part]
+            self._last_date[ids[part]] = dates[part]
+            self._accumulate(ids[part], doy[part], values[part])
+        return pd.DataFrame(self._columns(z, ewma), index=new_rows.index)
+
+    def latest(self, locations):
+        """Most recent z / EWMA / score columns per location, in the given order."""
+        ids = np.array([self._ids[name] for name in locations], dtype=np.int64)
+        out = pd.DataFrame(self._columns(self._last_z[ids], self._ewma[ids]))
+        out.insert(0, 'location', list(locations))
+        return out
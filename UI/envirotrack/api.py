@@ -0,0 +1,568 @@
+"""
+JSON API over the same data the dashboard shows, built on the stdlib.
+
+    python -m envirotrack serve --port 8600
+
+Endpoints (all GET):
+    /stations[?lat=&lon=&k=|&radius_km=]       station list, or nearest / within radius
+    /stations?q=[&limit=10]                    search by city, state or alias (prefix or typo)
+    /stations?id=                              one station by registry id
+    /snapshot                                  latest reading + severity per station
+    /series?location=&start=&end=&page=&page_size=
+                                               paginated time series for one station
+    /series?location=...&stream=1              whole range as chunked NDJSON
+    /alerts?location=[&news=1][&radius_km=50]  get_alert_status for one station (202 until news lands)
+    /forecast?location=&parameter=[&days=30][&mode=full|fast]
+                                               cached Prophet forecast (202 while it is fitted)
+    /similar?location=&parameter=[&max_lag=0][&k=10]
+                                               most-correlated stations at their best lag
+    /export?[location=][&start=&end=][&format=csv|parquet][&columns=a,b]
+                                               chunked download, one or all stations
+    /metrics                                   cache sizes, hit rates and evictions, process RSS
+    /history?[location=][&start=&end=][&severity=high,medium][&after_id=][&limit=500]
+                                               severity transitions from the alert history
+
+Encoded JSON responses are cached per (dataset version, request) in a
+bounded LRU (cache.BoundedCache) together with a content-hash ETag and a
+gzipped copy, so repeat requests cost a lookup; If-None-Match is answered
+with 304.
+"""
+import gzip
+import hashlib
+import json
+import math
+import threading
+import zlib
+from datetime import datetime, timedelta
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+from .alerts import get_alert_status
+from .batch import PARAMETERS
+from .cache import MB, BoundedCache, cache_stats, process_memory
+from .data import NEARBY_RADIUS_KM, DatasetHolder
+from .export import EXPORT_FORMATS, iter_export
+from .forecast import FORECAST_COLUMNS, FORECAST_MODES, MAX_FORECAST_DAYS, forecast_artifact
+from .history import SEVERITY_LEVELS
+from .scheduler import RefreshScheduler
+from .sources import source_from_env
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+STREAM_CHUNK_ROWS = 2000
+GZIP_MIN_BYTES = 1024
+RESPONSE_TTL_SECONDS = 900
+PENDING_RETRY_SECONDS = 5
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+class ApiPending(Exception):
+    """The result is being computed in the background: answered 202 with payload, never cached."""
+
+    def __init__(self, payload):
+        super().__init__('pending')
+        self.payload = payload
+
+
+# ============================================================
+# Application (transport independent)
+# ============================================================
+class ApiApp:
+    """Routes requests to handlers and caches their encoded responses."""
+
+    def __init__(self, holder, response_cache_entries=512, forecast_cache_entries=128, scheduler=None,
+                 response_cache_mb=64, forecast_cache_mb=32, response_ttl=RESPONSE_TTL_SECONDS):
+        self.holder = holder
+        self.scheduler = scheduler
+        # Keys carry the dataset version, so after a refresh old entries are
+        # unreachable; the TTL frees them without waiting for LRU pressure
+        self.responses = BoundedCache('api responses', max_entries=response_cache_entries,
+                                      max_bytes=response_cache_mb * MB, ttl=response_ttl)
+        self.forecasts = BoundedCache('api forecasts', max_entries=forecast_cache_entries,
+                                      max_bytes=forecast_cache_mb * MB, ttl=6 * 3600)
+        # Single-flight inline fits: one lock per forecast key being fitted
+        self._fit_locks = {}
+        self._fit_locks_guard = threading.Lock()
+        self.routes = {
+            '/stations': self.stations,
+            '/snapshot': self.snapshot,
+            '/series': self.series,
+            '/alerts': self.alerts,
+            '/forecast': self.forecast,
+            '/similar': self.similar,
+        }
+
+    # ---------------- endpoints ----------------
+    def stations(self, dataset, query):
+        registry = dataset.stations
+        if query.get('id'):
+            try:
+                return [registry.station(_int_param(query, 'id', None)).to_dict()]
+            except KeyError:
+                raise ApiError(HTTPStatus.NOT_FOUND, f"unknown station id: {query['id']}")
+        if query.get('q'):
+            found = registry.search(query['q'], limit=_int_param(query, 'limit', 10, minimum=1, maximum=100))
+            return [station.to_dict() for station in found]
+        if query.get('lat') and query.get('lon'):
+            lat, lon = _float_param(query, 'lat'), _float_param(query, 'lon')
+            if query.get('radius_km'):
+                found = registry.within(lat, lon, _float_param(query, 'radius_km', minimum=0))
+            else:
+                found = registry.nearest(lat, lon, k=_int_param(query, 'k', 5, minimum=1))
+        else:
+            found = [(name, None) for name in dataset.locations]
+        stations = []
+        for name, distance in found:
+            item = registry.station(name).to_dict()
+            if distance is not None:
+                item['distance_km'] = round(distance, 3)
+            stations.append(item)
+        return stations
+
+    def snapshot(self, dataset, query):
+        return _records(dataset.latest)
+
+    def series(self, dataset, query):
+        frame = self._range(dataset, query)
+        page = _int_param(query, 'page', 1, minimum=1)
+        page_size = _int_param(query, 'page_size', DEFAULT_PAGE_SIZE, minimum=1, maximum=MAX_PAGE_SIZE)
+        total = len(frame)
+        start = (page - 1) * page_size
+        items = frame.iloc[start:start + page_size]
+        return {
+            'location': query['location'],
+            'page': page,
+            'page_size': page_size,
+            'total': total,
+            'pages': (total + page_size - 1) // page_size,
+            'items': _records(items),
+        }
+
+    def alerts(self, dataset, query):
+        frame = self._location(dataset, query)
+        current_row = frame.iloc[-1]
+        week = frame[frame['date'] >= frame['date'].max() - timedelta(days=7)]
+        articles = None
+        if query.get('news') in ('1', 'true'):
+            if self.scheduler is not None:
+                # Background-refreshed headlines; respond() answers 202 until the first fetch lands
+                news = self.scheduler.news(query['location'])
+                articles = news['articles'] if news else None
+            else:
+                from .news import fetch_weather_news
+                articles = fetch_weather_news(dataset.stations.station(query['location']).city)['articles']
+        radius_km = _float_param(query, 'radius_km', NEARBY_RADIUS_KM, minimum=0)
+        nearby = dataset.nearby(query['location'], radius_km) if radius_km > 0 else None
+        anomalies = dataset.anomaly(query['location'])
+        icon, messages, _, _, severity = get_alert_status(
+            current_row, week, news_articles=articles, nearby=nearby, anomalies=anomalies
+        )
+        return {
+            'location': query['location'],
+            'date': current_row['date'],
+            'severity': severity,
+            'anomalies': {metric: None if pd.isna(score) else score for metric, score in anomalies.items()},
+            'icon': icon,
+            'messages': messages,
+        }
+
+    def forecast(self, dataset, query):
+        frame = self._location(dataset, query)
+        parameter = query.get('parameter', 'temperature')
+        if parameter not in PARAMETERS:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"parameter must be one of {', '.join(PARAMETERS)}")
+        days = _int_param(query, 'days', 30, minimum=1, maximum=365)
+        mode = query.get('mode', 'full')
+        if mode not in FORECAST_MODES:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"mode must be one of {', '.join(FORECAST_MODES)}")
+
+        # One artifact per series serves every horizon up to MAX_FORECAST_DAYS
+        artifact_days = max(days, MAX_FORECAST_DAYS)
+        response = {'location': query['location'], 'parameter': parameter, 'days': days, 'mode': mode}
+        if self.scheduler is not None and days <= MAX_FORECAST_DAYS:
+            artifact = self._scheduled_forecast(dataset, query['location'], parameter, mode)
+            if artifact is None:
+                raise ApiPending({**response, 'status': 'pending'})
+        else:
+            key = (dataset.version, query['location'], parameter, mode, artifact_days)
+            artifact = self._fit_once(key, lambda: forecast_artifact(frame, parameter, mode=mode, days=artifact_days))
+        # Artifacts are float32; round so the JSON does not carry float32 noise digits
+        values = FORECAST_COLUMNS[1:]
+        forecast = artifact.horizon(days).astype(dict.fromkeys(values, 'float64')).round(dict.fromkeys(values, 3))
+        return {**response, 'items': _records(forecast)}
+
+    def similar(self, dataset, query):
+        self._location(dataset, query)
+        parameter = query.get('parameter', 'temperature')
+        if parameter not in PARAMETERS:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"parameter must be one of {', '.join(PARAMETERS)}")
+        max_lag = _int_param(query, 'max_lag', 0, minimum=0, maximum=30)
+        k = _int_param(query, 'k', 10, minimum=1, maximum=50)
+        index = dataset.similarity(parameter, max_lag=max_lag, k=max(k, 10))
+        return {
+            'location': query['location'],
+            'parameter': parameter,
+            'max_lag': index.max_lag,
+            'items': [
+                {'location': name, 'correlation': corr, 'lag_days': lag}
+                for name, corr, lag in index.similar(query['location'], k=k)
+            ],
+        }
+
+    # ---------------- helpers ----------------
+    def _news_stamp(self, dataset, path, query):
+        """
+        Publish time of the scheduler's headlines behind an /alerts?news=1
+        response, so a news refresh changes its cache key. Raises ApiPending
+        while the first fetch for the city has not landed.
+        """
+        if path != '/alerts' or query.get('news') not in ('1', 'true') or self.scheduler is None:
+            return None
+        location = query.get('location')
+        if location not in dataset.stations:
+            return None  # the handler answers 400 / 404
+        self.scheduler.news(location)
+        entry = self.scheduler.cache.entry(('news', dataset.stations.station(location).city))
+        if entry is None:
+            raise ApiPending({'location': location, 'news': 'pending', 'status': 'pending'})
+        return entry[1]
+
+    def _scheduled_forecast(self, dataset, location, parameter, mode):
+        """
+        The scheduler's artifact for this dataset version, or None after
+        queueing its fit there (concurrent requests share that one job).
+        """
+        self.scheduler.forecast_artifact(location, parameter, mode=mode)
+        entry = self.scheduler.cache.entry(('forecast', location, parameter, mode))
+        if entry is not None and entry[2] == dataset.version:
+            return entry[0]
+        error = self.scheduler.forecast_error(location, parameter, mode)
+        if error:
+            raise ApiError(HTTPStatus.SERVICE_UNAVAILABLE, f"forecast could not be fitted ({error}); retrying")
+        return None
+
+    def _fit_once(self, key, fit):
+        """self.forecasts[key], fitting it at most once however many requests wait on it."""
+        artifact = self.forecasts.get(key)
+        if artifact is not None:
+            return artifact
+        with self._fit_locks_guard:
+            lock = self._fit_locks.setdefault(key, threading.Lock())
+        try:
+            with lock:
+                artifact = self.forecasts.get(key)
+                if artifact is None:
+                    artifact = self.forecasts.put(key, fit())
+                return artifact
+        finally:
+            with self._fit_locks_guard:
+                if self._fit_locks.get(key) is lock:
+                    del self._fit_locks[key]
+
+    def _location(self, dataset, query):
+        location = query.get('location')
+        if not location:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "missing 'location' parameter")
+        try:
+            return dataset.location_slice(location)
+        except KeyError:
+            raise ApiError(HTTPStatus.NOT_FOUND, f"unknown location: {location}")
+
+    def _range(self, dataset, query):
+        frame = self._location(dataset, query)
+        try:
+            if query.get('start'):
+                frame = frame[frame['date'] >= pd.Timestamp(query['start'])]
+            if query.get('end'):
+                frame = frame[frame['date'] <= pd.Timestamp(query['end'])]
+        except ValueError as e:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"invalid date: {e}")
+        return frame
+
+    # ---------------- dispatch ----------------
+    def respond(self, path, query, accept_gzip=False, if_none_match=None):
+        """
+        Returns (status, headers, body) where body is bytes or an iterator of
+        bytes chunks (streamed responses).
+        """
+        dataset = self.holder.current()
+        if path == '/metrics':
+            return self._metrics(dataset)
+        if path == '/history':
+            try:
+                return self._history(query)
+            except ApiError as e:
+                return _error(e.status, e.message)
+        if path == '/export':
+            try:
+                return self._export(dataset, query, accept_gzip)
+            except ApiError as e:
+                return _error(e.status, e.message)
+
+        handler = self.routes.get(path)
+        if handler is None:
+            return _error(HTTPStatus.NOT_FOUND, f"no such endpoint: {path}")
+
+        if path == '/series' and query.get('stream') in ('1', 'true'):
+            try:
+                frame = self._range(dataset, query)
+            except ApiError as e:
+                return _error(e.status, e.message)
+            return self._stream(frame, accept_gzip)
+
+        try:
+            news_stamp = self._news_stamp(dataset, path, query)
+        except ApiPending as e:
+            return _pending(e.payload)
+        key = (dataset.version, path, tuple(sorted(query.items())), news_stamp)
+        cached = self.responses.get(key)
+        if cached is None:
+            try:
+                payload = handler(dataset, query)
+            except ApiError as e:
+                return _error(e.status, e.message)
+            except ApiPending as e:
+                return _pending(e.payload)
+            body = json.dumps(payload, ensure_ascii=False, default=_json_default).encode('utf-8')
+            etag = '"%s"' % hashlib.blake2b(body, digest_size=12).hexdigest()
+            gzipped = gzip.compress(body, compresslevel=5) if len(body) >= GZIP_MIN_BYTES else None
+            cached = (etag, body, gzipped)
+            self.responses.put(key, cached)
+
+        etag, body, gzipped = cached
+        headers = {
+            'Content-Type': 'application/json; charset=utf-8',
+            'ETag': etag,
+            'Cache-Control': 'public, max-age=60',
+            'Vary': 'Accept-Encoding',
+        }
+        if if_none_match and etag in [t.strip() for t in if_none_match.split(',')]:
+            return HTTPStatus.NOT_MODIFIED, headers, b''
+        if accept_gzip and gzipped is not None:
+            headers['Content-Encoding'] = 'gzip'
+            return HTTPStatus.OK, headers, gzipped
+        return HTTPStatus.OK, headers, body
+
+    def _metrics(self, dataset):
+        """Cache and memory stats; never cached, so every poll is current."""
+        payload = {
+            'dataset_version': dataset.version,
+            'process': process_memory(),
+            'caches': cache_stats(),
+            'jobs': self.scheduler.status() if self.scheduler is not None else [],
+        }
+        body = json.dumps(payload, ensure_ascii=False, default=_json_default).encode('utf-8')
+        return HTTPStatus.OK, {'Content-Type': 'application/json; charset=utf-8', 'Cache-Control': 'no-store'}, body
+
+    def _history(self, query):
+        """Alert history events, oldest first; not cached, as events land between dataset versions."""
+        history = self.scheduler.history if self.scheduler is not None else None
+        if history is None:
+            raise ApiError(HTTPStatus.NOT_FOUND, "alert history is not enabled (set ENVIROTRACK_ALERT_HISTORY)")
+        severities = query['severity'].split(',') if query.get('severity') else None
+        if severities and not set(severities) <= set(SEVERITY_LEVELS):
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"'severity' must be among {', '.join(SEVERITY_LEVELS)}")
+        try:
+            events = history.events(
+                query.get('location'), start=query.get('start'), end=query.get('end'), severities=severities,
+                after_id=_int_param(query, 'after_id', None), limit=_int_param(query, 'limit', 500, minimum=1,
+                                                                               maximum=5000),
+            )
+        except ValueError as e:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"invalid date: {e}")
+        body = json.dumps(_records(events), ensure_ascii=False, default=_json_default).encode('utf-8')
+        return HTTPStatus.OK, {'Content-Type': 'application/json; charset=utf-8', 'Cache-Control': 'no-store'}, body
+
+    def _stream(self, frame, accept_gzip):
+        headers = {'Content-Type': 'application/x-ndjson; charset=utf-8'}
+        if accept_gzip:
+            headers['Content-Encoding'] = 'gzip'
+
+        def chunks():
+            for start in range(0, len(frame), STREAM_CHUNK_ROWS):
+                block = frame.iloc[start:start + STREAM_CHUNK_ROWS]
+                yield ''.join(
+                    json.dumps(r, ensure_ascii=False, default=_json_default) + '\n'
+                    for r in _records(block)
+                ).encode('utf-8')
+
+        return HTTPStatus.OK, headers, _gzip_chunks(chunks(), accept_gzip)
+
+    def _export(self, dataset, query, accept_gzip):
+        fmt = query.get('format', 'csv')
+        if fmt not in EXPORT_FORMATS:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"format must be one of {', '.join(EXPORT_FORMATS)}")
+        locations = None
+        if query.get('location'):
+            self._location(dataset, query)
+            locations = [query['location']]
+        try:
+            start = pd.Timestamp(query['start']) if query.get('start') else None
+            end = pd.Timestamp(query['end']) if query.get('end') else None
+        except ValueError as e:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"invalid date: {e}")
+        columns = query['columns'].split(',') if query.get('columns') else None
+        if columns and not set(columns) <= set(dataset.frame.columns):
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"'columns' must be among {', '.join(dataset.frame.columns)}")
+
+        content_type, extension = EXPORT_FORMATS[fmt]
+        headers = {
+            'Content-Type': content_type,
+            'Content-Disposition': f'attachment; filename="envirotrack-readings.{extension}"',
+        }
+        body = iter_export(dataset, fmt, locations=locations, start=start, end=end, columns=columns)
+        if fmt == 'csv' and accept_gzip:  # Parquet is already compressed
+            headers['Content-Encoding'] = 'gzip'
+            body = _gzip_chunks(body, True)
+        return HTTPStatus.OK, headers, body
+
+
+def _gzip_chunks(chunks, accept_gzip):
+    """Incrementally gzip a stream of bytes blocks (pass-through when not accepted)."""
+    compressor = zlib.compressobj(5, zlib.DEFLATED, 31) if accept_gzip else None
+    for data in chunks:
+        if compressor:
+            data = compressor.compress(data)
+        if data:
+            yield data
+    if compressor:
+        yield compressor.flush()
+
+
+def _records(frame):
+    """Rows as dicts, with missing readings as null rather than NaN (invalid JSON)."""
+    if frame.isna().to_numpy().any():
+        frame = frame.astype(object).where(frame.notna(), None)
+    return frame.to_dict('records')
+
+def _int_param(query, name, default, minimum=None, maximum=None):
+    raw = query.get(name)
+    if raw is None:
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"'{name}' must be an integer")
+    if minimum is not None and value < minimum:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"'{name}' must be >= {minimum}")
+    if maximum is not None:
+        value = min(value, maximum)
+    return value
+
+def _float_param(query, name, default=None, minimum=None):
+    raw = query.get(name)
+    if raw is None:
+        return default
+    try:
+        value = float(raw)
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"'{name}' must be a number")
+    if not math.isfinite(value):
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"'{name}' must be a finite number")
+    if minimum is not None and value < minimum:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"'{name}' must be >= {minimum}")
+    return value
+
+def _error(status, message):
+    body = json.dumps({'error': message, 'status': int(status)}).encode('utf-8')
+    return status, {'Content-Type': 'application/json; charset=utf-8'}, body
+
+def _pending(payload):
+    body = json.dumps(payload, ensure_ascii=False, default=_json_default).encode('utf-8')
+    return HTTPStatus.ACCEPTED, {'Content-Type': 'application/json; charset=utf-8', 'Cache-Control': 'no-store',
+                                 'Retry-After': str(PENDING_RETRY_SECONDS)}, body
+
+def _json_default(value):
+    if isinstance(value, (pd.Timestamp, datetime)):
+        return value.isoformat()
+    if hasattr(value, 'item'):  # numpy scalars
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+# ============================================================
+# HTTP transport
+# ============================================================
+class ApiRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'EnviroTrackAPI/1.0'
+    # Buffer headers + body into one send; handle_one_request flushes
+    wbufsize = -1
+    disable_nagle_algorithm = True
+    app = None  # set by make_server
+    quiet = False
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        accept_gzip = 'gzip' in self.headers.get('Accept-Encoding', '')
+        try:
+            status, headers, body = self.app.respond(
+                parts.path.rstrip('/') or '/', query,
+                accept_gzip=accept_gzip,
+                if_none_match=self.headers.get('If-None-Match'),
+            )
+        except Exception as e:
+            status, headers, body = _error(HTTPStatus.INTERNAL_SERVER_ERROR, f"{type(e).__name__}: {e}")
+
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if isinstance(body, bytes):
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if status != HTTPStatus.NOT_MODIFIED:
+                self.wfile.write(body)
+            return
+
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for chunk in body:
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+            self.wfile.flush()
+        self.wfile.write(b'0\r\n\r\n')
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+def make_server(host='127.0.0.1', port=8600, holder=None, seed=None, quiet=False, source=None,
+                refresh=False):
+    """
+    Build a ThreadingHTTPServer serving the API (not yet started). Without
+    a holder, readings are loaded from source (default: source_from_env()).
+    refresh=True starts a RefreshScheduler that keeps news (for
+    /alerts?news=1) and viewed forecasts fresh in the background, and
+    appends new readings from source when there is one.
+    """
+    if holder is None:
+        source = source or source_from_env(seed=seed)
+        holder = DatasetHolder()
+        holder.publish(source.load())
+    scheduler = RefreshScheduler.from_env(holder, source=source).start() if refresh else None
+    handler = type('BoundApiRequestHandler', (ApiRequestHandler,), {
+        'app': ApiApp(holder, scheduler=scheduler),
+        'quiet': quiet,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+def serve(host='127.0.0.1', port=8600, seed=None, quiet=False, source=None):
+    server = make_server(host, port, seed=seed, quiet=quiet, source=source, refresh=True)
+    print(f"EnviroTrack API listening on http://{host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,200 @@
+"""
+Rolling-origin backtests of the forecasting engines.
+
+For each cutoff the engine is fitted on every reading up to the cutoff
+and scored on the next `horizon` days:
+- MAE
+- MAPE, over actuals with |y| >= MAPE_MIN_ACTUAL; rainfall is often 0
+- interval coverage, against the engine's nominal interval width
+- fit time and peak memory
+
+sweep() expands engines over a grid of settings (interval width,
+seasonalities, uncertainty samples), each combination scored as its own
+variant. Stations run in parallel through the batch driver (the
+'backtest' task). summarize() aggregates the per-fold records per
+variant and parameter, and cheapest() picks the fastest one meeting an
+accuracy bar.
+"""
+import itertools
+import time
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from .forecast import ENGINE_SETTINGS, ENGINES, INTERVAL_WIDTH
+
+MAPE_MIN_ACTUAL = 1.0
+
+
+# ------------------------------------------------------------
+# Settings grid
+# ------------------------------------------------------------
+def _flag(text):
+    if text.lower() in ('true', 'yes', '1'):
+        return True
+    if text.lower() in ('false', 'no', '0'):
+        return False
+    raise ValueError(f"expected true or false, got {text!r}")
+
+def _width(text):
+    value = float(text)
+    if not 0 < value < 1:
+        raise ValueError(f"interval_width must be between 0 and 1, got {text}")
+    return value
+
+SETTING_TYPES = {
+    'yearly_seasonality': _flag,
+    'weekly_seasonality': _flag,
+    'interval_width': _width,
+    'uncertainty_samples': int,
+}
+
+def parse_setting(text):
+    """'interval_width=0.8,0.95' -> ('interval_width', [0.8, 0.95]); raises ValueError."""
+    name, sep, values = text.partition('=')
+    if not sep or name not in SETTING_TYPES:
+        raise ValueError(f"expected NAME=V1,V2 with NAME one of {', '.join(SETTING_TYPES)}")
+    return name, [SETTING_TYPES[name](value) for value in values.split(',') if value]
+
+def variant_name(engine, settings):
+    if not settings:
+        return engine
+    return engine + '[' + ','.join(f"{name}={value}" for name, value in settings.items()) + ']'
+
+def sweep(engines, grid=None):
+    """
+    [(variant_name, engine, settings)] for every engine and every
+    combination of the grid's values that engine accepts (ENGINE_SETTINGS).
+    """
+    variants = []
+    for engine in engines:
+        names = [name for name in (grid or {}) if name in ENGINE_SETTINGS.get(engine, ())]
+        for values in itertools.product(*(grid[name] for name in names)):
+            settings = dict(zip(names, values))
+            variants.append((variant_name(engine, settings), engine, settings))
+    return variants
+
+
+def rolling_origins(n_days, initial=30, horizon=7, step=7):
+    """Cutoff positions: the first `initial` days train the first fold, then every `step` days."""
+    return list(range(initial, n_days - horizon + 1, step))
+
+# ------------------------------------------------------------
+# Peak memory per fit
+# ------------------------------------------------------------
+def _read_status(field):
+    try:
+        with open("/proc/self/status", encoding="ascii") as fh:
+            for line in fh:
+                if line.startswith(field):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+def _reset_peak_rss():
+    """Reset this process's VmHWM (Linux); returns False where that is not possible."""
+    try:
+        with open("/proc/self/clear_refs", "w") as fh:
+            fh.write("5")
+        return True
+    except OSError:
+        return False
+
+def measure_fit(engine, frame, parameter, days):
+    """(forecast, seconds, peak_mb) for one fit. peak_mb is the RSS growth (None off Linux)."""
+    can_measure = _reset_peak_rss()
+    baseline = _read_status("VmRSS:") if can_measure else None
+    start = time.perf_counter()
+    forecast = engine(frame, parameter, days=days)
+    seconds = time.perf_counter() - start
+    peak = _read_status("VmHWM:") if can_measure else None
+    peak_mb = max(peak - baseline, 0.0) if peak is not None and baseline is not None else None
+    return forecast, seconds, peak_mb
+
+# ------------------------------------------------------------
+# One series
+# ------------------------------------------------------------
+def score_fold(actual, forecast):
+    """MAE, MAPE (%) and interval coverage of one fold's forecast against its actuals."""
+    y = actual.to_numpy(dtype=float)
+    merged = pd.DataFrame({'ds': actual.index, 'y': y}).merge(forecast, on='ds', how='left')
+    error = merged['yhat'].to_numpy() - merged['y'].to_numpy()
+    inside = (merged['y'] >= merged['yhat_lower']) & (merged['y'] <= merged['yhat_upper'])
+    mape_rows = np.abs(merged['y'].to_numpy()) >= MAPE_MIN_ACTUAL
+    return {
+        'mae': float(np.nanmean(np.abs(error))),
+        'mape': float(np.nanmean(np.abs(error[mape_rows] / merged['y'].to_numpy()[mape_rows])) * 100)
+        if mape_rows.any() else None,
+        'coverage': float(inside.mean()),
+    }
+
+def backtest_series(frame, parameter, engine_name, horizon=7, initial=30, step=7, settings=None):
+    """One record per cutoff for one engine (with settings, see sweep()) on one station/parameter series."""
+    engine = partial(ENGINES[engine_name], **settings) if settings else ENGINES[engine_name]
+    nominal = (settings or {}).get('interval_width', INTERVAL_WIDTH)
+    frame = frame.sort_values('date').reset_index(drop=True)
+    series = frame.set_index('date')[parameter]
+    records = []
+    for cutoff in rolling_origins(len(frame), initial, horizon, step):
+        train = frame.iloc[:cutoff]
+        actual = series.iloc[cutoff:cutoff + horizon]
+        forecast, seconds, peak_mb = measure_fit(engine, train, parameter, horizon)
+        records.append({
+            'engine': variant_name(engine_name, settings),
+            'parameter': parameter,
+            'cutoff': train['date'].iloc[-1],
+            'train_days': cutoff,
+            **score_fold(actual, forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']]),
+            'nominal': nominal,
+            'fit_seconds': seconds,
+            'peak_mb': peak_mb,
+        })
+    return records
+
+# ------------------------------------------------------------
+# Aggregation
+# ------------------------------------------------------------
+def summarize(records):
+    """
+    Mean accuracy and cost per (engine variant, parameter) from backtest
+    records; coverage_gap is coverage minus the variant's nominal width.
+    """
+    frame = pd.DataFrame.from_records(records)
+    if frame.empty:
+        return frame
+    frame['mape'] = pd.to_numeric(frame['mape'])
+    frame['peak_mb'] = pd.to_numeric(frame['peak_mb'])
+    grouped = frame.groupby(['engine', 'parameter'], sort=True)
+    summary = grouped.agg(
+        series=('location', 'nunique'),
+        folds=('mae', 'size'),
+        mae=('mae', 'mean'),
+        mape=('mape', 'mean'),
+        coverage=('coverage', 'mean'),
+        nominal=('nominal', 'first'),
+        fit_seconds=('fit_seconds', 'mean'),
+        fit_p95=('fit_seconds', lambda s: s.quantile(0.95)),
+        peak_mb=('peak_mb', 'max'),
+    )
+    summary['coverage_gap'] = summary['coverage'] - summary['nominal']
+    return summary.reset_index()
+
+def cheapest(summary, max_mape=None, max_mae=None, min_coverage=None):
+    """
+    Per parameter, the engine with the lowest mean fit time whose accuracy
+    meets every given bar (None where no engine does).
+    """
+    ok = pd.Series(True, index=summary.index)
+    if max_mape is not None:
+        ok &= summary['mape'] <= max_mape
+    if max_mae is not None:
+        ok &= summary['mae'] <= max_mae
+    if min_coverage is not None:
+        ok &= summary['coverage'] >= min_coverage
+    picks = {}
+    for parameter, group in summary.groupby('parameter', sort=True):
+        passing = group[ok.loc[group.index]]
+        picks[parameter] = passing.sort_values('fit_seconds')['engine'].iloc[0] if len(passing) else None
+    return picks
@@ -0,0 +1,166 @@
+"""
+Batch evaluation across stations: severity snapshots, alerts and forecasts.
+
+Each station is an independent task; tasks are fanned out over a process
+pool so nightly jobs use every core. Failures are collected per station
+instead of aborting the whole run.
+"""
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from .alerts import assess_severity, get_alert_status
+from .anomalies import AnomalyEngine
+from .data import extract_city_keyword
+
+PARAMETERS = ['temperature', 'air_quality', 'rainfall']
+
+
+# ------------------------------------------------------------
+# Per-station tasks (run inside worker processes)
+# ------------------------------------------------------------
+def _number(value):
+    """float, or None for a missing reading (real observations have gaps)."""
+    return None if pd.isna(value) else float(value)
+
+def snapshot_station(location, frame):
+    row = frame.iloc[-1]
+    return [{
+        'location': location,
+        'date': row['date'],
+        'lat': float(row['lat']),
+        'lon': float(row['lon']),
+        'temperature': _number(row['temperature']),
+        'air_quality': _number(row['air_quality']),
+        'rainfall': _number(row['rainfall']),
+        'severity': assess_severity(row['temperature'], row['rainfall'], row['air_quality']),
+    }]
+
+def alert_station(location, frame, with_news=False):
+    current_row = frame.iloc[-1]
+    week_ago = frame['date'].max() - timedelta(days=7)
+    week = frame[frame['date'] >= week_ago]
+
+    articles = None
+    if with_news:
+        from .news import fetch_weather_news
+        articles = fetch_weather_news(extract_city_keyword(location))["articles"]
+
+    # Climatology from this station's own history (tasks only see one station)
+    engine = AnomalyEngine()
+    engine.fit(frame)
+    latest = engine.latest([location]).iloc[0]
+    anomalies = {metric: latest[f'{metric}_score'] for metric in engine.metrics}
+
+    icon, messages, _, _, severity = get_alert_status(
+        current_row, week, news_articles=articles, anomalies=anomalies
+    )
+    return [{
+        'location': location,
+        'date': current_row['date'],
+        'severity': severity,
+        'anomaly': float(latest['anomaly']),
+        'icon': icon,
+        'messages': messages,
+        'evaluated_at': datetime.now(),
+    }]
+
+def forecast_station(location, frame, parameters=PARAMETERS, days=30, mode='full'):
+    from .forecast import FORECAST_MODES, quiet_prophet_logs
+
+    quiet_prophet_logs()
+    last_date = frame['date'].max()
+    records = []
+    for parameter in parameters:
+        forecast = FORECAST_MODES[mode](frame, parameter, days=days)
+        future = forecast[forecast['ds'] > last_date]
+        for row in future[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].itertuples(index=False):
+            records.append({
+                'location': location,
+                'parameter': parameter,
+                'ds': row.ds,
+                'yhat': float(row.yhat),
+                'yhat_lower': float(row.yhat_lower),
+                'yhat_upper': float(row.yhat_upper),
+            })
+    return records
+
+def backtest_station(location, frame, parameters=PARAMETERS, engines=('prophet',), horizon=7, initial=30, step=7,
+                     grid=None):
+    from .backtest import backtest_series, sweep
+    from .forecast import quiet_prophet_logs
+
+    quiet_prophet_logs()
+    records = []
+    for _, engine, settings in sweep(engines, grid):
+        for parameter in parameters:
+            for record in backtest_series(frame, parameter, engine, horizon=horizon, initial=initial, step=step,
+                                          settings=settings):
+                records.append({'location': location, **record})
+    return records
+
+TASKS = {
+    'snapshot': snapshot_station,
+    'alerts': alert_station,
+    'forecast': forecast_station,
+    'backtest': backtest_station,
+}
+
+def _run_task(args):
+    kind, location, frame, options = args
+    try:
+        return location, TASKS[kind](location, frame, **options), None
+    except Exception as e:
+        return location, [], f"{type(e).__name__}: {e}"
+
+
+# ------------------------------------------------------------
+# Driver
+# ------------------------------------------------------------
+def run_batch(kind, data, locations=None, workers=None, **options):
+    """
+    Run one task kind for the given locations (all if None).
+
+    Returns (records, failures) where failures maps location -> error text.
+    """
+    if kind not in TASKS:
+        raise ValueError(f"Unknown batch task: {kind}")
+
+    data = data.sort_values(['location', 'date'])
+    if locations is not None:
+        data = data[data['location'].isin(locations)]
+    tasks = [(kind, location, frame, options) for location, frame in data.groupby('location', sort=True)]
+
+    workers = min(workers or os.cpu_count() or 1, max(len(tasks), 1))
+    records, failures = [], {}
+    if workers == 1:
+        _collect(map(_run_task, tasks), records, failures)
+    else:
+        chunksize = max(1, len(tasks) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            _collect(pool.map(_run_task, tasks, chunksize=chunksize), records, failures)
+    return records, failures
+
+def _collect(results, records, failures):
+    for location, station_records, error in results:
+        records.extend(station_records)
+        if error:
+            failures[location] = error
+
+def write_records(records, path, fmt='json'):
+    """Write batch records as JSON (list of objects) or Parquet."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    if fmt == 'parquet':
+        pd.DataFrame.from_records(records).to_parquet(path, index=False)
+    else:
+        with open(path, 'w', encoding='utf-8') as fh:
+            json.dump(records, fh, ensure_ascii=False, indent=2, default=_json_default)
+    return path
+
+def _json_default(value):
+    if isinstance(value, (pd.Timestamp, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
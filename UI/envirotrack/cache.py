@@ -0,0 +1,168 @@
+"""
+Bounded in-process caches with memory accounting.
+
+Every long-lived cache (API responses and forecasts, scheduler results,
+heatmap images) is a BoundedCache, a thread-safe LRU mapping that:
+- tracks its entry count and approximate bytes (approx_size)
+- evicts least-recently-used entries beyond max_entries / max_bytes
+- expires entries older than ttl seconds
+- counts hits, misses, evictions and expirations
+
+cache_stats() reports every live cache; the dashboard's debug panel and
+the API's /metrics endpoint show it next to process_memory().
+"""
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+MB = 2**20
+
+_CACHES = weakref.WeakSet()
+_CACHES_LOCK = threading.Lock()
+
+
+def approx_size(value, _depth=0):
+    """Approximate bytes held by value: deep for frames, arrays, bytes and (nested) containers."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    nbytes = getattr(value, 'nbytes', None)  # numpy arrays, ForecastArtifact
+    if isinstance(nbytes, (int, np.integer)):
+        return int(nbytes)
+    size = sys.getsizeof(value)
+    if _depth < 4:
+        if isinstance(value, dict):
+            size += sum(approx_size(k, _depth + 1) + approx_size(v, _depth + 1) for k, v in value.items())
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            size += sum(approx_size(item, _depth + 1) for item in value)
+    return size
+
+def process_memory():
+    """{'rss_mb', 'peak_rss_mb'} of this process (None where unavailable)."""
+    memory = {'rss_mb': None, 'peak_rss_mb': None}
+    try:
+        with open("/proc/self/status", encoding="ascii") as fh:
+            for line in fh:
+                if line.startswith("VmRSS:"):
+                    memory['rss_mb'] = round(int(line.split()[1]) / 1024, 1)
+                elif line.startswith("VmHWM:"):
+                    memory['peak_rss_mb'] = round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        import resource
+        memory['peak_rss_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return memory
+
+
+class BoundedCache:
+    """
+    Thread-safe LRU with optional entry, byte and age budgets.
+
+    sizeof(value) gives an entry's bytes (default approx_size). on_evict(key)
+    is called, outside the lock, for entries dropped to stay within budget
+    or expired by ttl (not for discard()).
+    """
+
+    def __init__(self, name, max_entries=None, max_bytes=None, ttl=None, sizeof=approx_size, on_evict=None):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self.on_evict = on_evict
+        self._data = OrderedDict()  # key -> (value, bytes, stored_at)
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = self.expirations = 0
+        with _CACHES_LOCK:
+            _CACHES.add(self)
+
+    def get(self, key, default=None):
+        expired = False
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[2] > self.ttl:
+                self._remove(key)
+                self.expirations += 1
+                entry, expired = None, True
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._data.move_to_end(key)
+        if expired and self.on_evict is not None:
+            self.on_evict(key)
+        return default if entry is None else entry[0]
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, size, time.monotonic())
+            self.bytes += size
+            evicted = self._evict()
+        if self.on_evict is not None:
+            for old in evicted:
+                self.on_evict(old)
+        return value
+
+    def discard(self, key):
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def _remove(self, key):
+        self.bytes -= self._data.pop(key)[1]
+
+    def _evict(self):
+        evicted = []
+        while self._data and (
+            (self.max_entries is not None and len(self._data) > self.max_entries)
+            or (self.max_bytes is not None and self.bytes > self.max_bytes)
+        ):
+            key = next(iter(self._data))
+            self._remove(key)
+            self.evictions += 1
+            evicted.append(key)
+        return evicted
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'cache': self.name,
+                'entries': len(self._data),
+                'max_entries': self.max_entries,
+                'mb': round(self.bytes / MB, 2),
+                'max_mb': None if self.max_bytes is None else round(self.max_bytes / MB, 2),
+                'ttl_s': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+
+def cache_stats():
+    """stats() of every live BoundedCache, by name."""
+    with _CACHES_LOCK:
+        caches = list(_CACHES)
+    return sorted((cache.stats() for cache in caches), key=lambda s: s['cache'])
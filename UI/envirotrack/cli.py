@@ -0,0 +1,314 @@
+"""
+Command-line entry point for headless batch jobs.
+
+    python -m envirotrack snapshot --output out/
+    python -m envirotrack alerts --stations Delhi Mumbai --format parquet
+    python -m envirotrack snapshot --source observations.csv --source-options cpcb.json
+    python -m envirotrack forecast --parameters temperature --days 14 --workers 8
+    python -m envirotrack backtest --engines prophet prophet-lite naive --max-mape 15
+    python -m envirotrack backtest --engines prophet --param interval_width=0.8,0.95 --param weekly_seasonality=true,false
+    python -m envirotrack serve --port 8600
+    python -m envirotrack generate --num-stations 5000 --years 3 --freq h --output data/
+    python -m envirotrack prerender --output static/
+    python -m envirotrack alerts --history alerts.db
+    python -m envirotrack history show --stations Delhi --since 2025-06-01
+    python -m envirotrack history notify --webhook https://example.org/hook --follow 60
+
+Exit status is 0 on success, 1 if any station failed and 2 on bad arguments.
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+import pandas as pd
+
+from .backtest import SETTING_TYPES, cheapest, parse_setting, summarize
+from .batch import PARAMETERS, run_batch, write_records
+from .data import NEARBY_RADIUS_KM, STATIONS, DatasetHolder, station_search
+from .forecast import ENGINES, FORECAST_MODES, INTERVAL_WIDTH
+from .history import HISTORY_RETENTION_DAYS, SEVERITY_LEVELS, AlertHistory, Notifier, print_sink, webhook_sink
+from .sources import SchemaError, open_source, read_options, source_from_env
+from .synthetic import DEFAULT_START, PARTITION_FORMATS, generate_dataset
+
+
+def resolve_stations(requested, available):
+    """Map full names, cities, aliases or states (case- and accent-insensitive) to station names."""
+    index = station_search(list(available))
+    resolved, unknown = [], []
+    for item in requested:
+        found = index.match(item)
+        if found:
+            resolved.extend(station.name for station in found)
+        else:
+            unknown.append(item)
+    return sorted(set(resolved)), unknown
+
+def data_source(args):
+    """
+    The source named by --source / --source-options, else ENVIROTRACK_DATA_SOURCE
+    or sample data. File sources aggregate to daily rows unless "daily": false.
+    """
+    options = read_options(args.source_options) if args.source_options else {}
+    if args.source:
+        return open_source(args.source, **{'daily': True, **options})
+    if options:
+        return open_source(None, seed=args.seed, **options)
+    return source_from_env(seed=args.seed)
+
+def setting_arg(text):
+    try:
+        return parse_setting(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="envirotrack",
+        description="Headless severity snapshots, alert evaluation and forecasts.",
+    )
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--stations", nargs="+", metavar="STATION",
+                        help="station names or city keywords (default: all)")
+    common.add_argument("--output", default="output", help="output directory (default: output)")
+    common.add_argument("--format", choices=["json", "parquet"], default="json")
+    common.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: CPU count)")
+    common.add_argument("--seed", type=int, default=None,
+                        help="seed for the simulated dataset")
+    sources = argparse.ArgumentParser(add_help=False)
+    sources.add_argument("--source", metavar="PATH",
+                         help="CSV file, Parquet file or directory of readings (default: simulated data)")
+    sources.add_argument("--source-options", metavar="JSON",
+                         help="JSON file of source options (column mapping, units, stations table)")
+
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("snapshot", parents=[common, sources], help="latest reading and severity per station")
+    alerts = sub.add_parser("alerts", parents=[common, sources], help="alert status per station")
+    alerts.add_argument("--with-news", action="store_true",
+                        help="include recent news headlines (network, or ENVIROTRACK_NEWS_FEED)")
+    alerts.add_argument("--history", metavar="DB",
+                        help="also record severity changes to this SQLite alert history")
+    forecast = sub.add_parser("forecast", parents=[common, sources], help="Prophet forecasts per station")
+    forecast.add_argument("--parameters", nargs="+", choices=PARAMETERS, default=PARAMETERS)
+    forecast.add_argument("--days", type=int, default=30, help="forecast horizon in days")
+    forecast.add_argument("--mode", choices=list(FORECAST_MODES), default="full",
+                          help="interval mode: full (sampled) or fast (analytic)")
+
+    backtest = sub.add_parser("backtest", parents=[common, sources],
+                              help="rolling-origin accuracy and cost of the forecast engines")
+    backtest.add_argument("--engines", nargs="+", choices=list(ENGINES), default=list(ENGINES))
+    backtest.add_argument("--parameters", nargs="+", choices=PARAMETERS, default=PARAMETERS)
+    backtest.add_argument("--horizon", type=int, default=7, help="days scored after each cutoff")
+    backtest.add_argument("--initial", type=int, default=30, help="training days before the first cutoff")
+    backtest.add_argument("--step", type=int, default=7, help="days between cutoffs")
+    backtest.add_argument("--param", action="append", type=setting_arg, default=[], metavar="NAME=V1,V2",
+                          help=f"sweep an engine setting ({', '.join(SETTING_TYPES)}); repeat to combine. "
+                               f"Each combination is scored as its own engine variant")
+    backtest.add_argument("--max-mape", type=float, help="accuracy bar: mean MAPE (%%) at most this")
+    backtest.add_argument("--max-mae", type=float, help="accuracy bar: mean MAE at most this")
+    backtest.add_argument("--min-coverage", type=float,
+                          help=f"accuracy bar: interval coverage at least this (default intervals are {INTERVAL_WIDTH}; "
+                               f"the summary's nominal column has each variant's width)")
+
+    serve = sub.add_parser("serve", parents=[sources], help="run the JSON API server")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8600)
+    serve.add_argument("--seed", type=int, default=None, help="seed for the simulated dataset")
+    serve.add_argument("--quiet", action="store_true", help="do not log each request")
+
+    generate = sub.add_parser("generate", help="write a partitioned synthetic dataset for scale testing")
+    generate.add_argument("--output", default="synthetic", help="output directory (default: synthetic)")
+    generate.add_argument("--num-stations", type=int, default=len(STATIONS),
+                          help=f"stations to simulate; beyond {len(STATIONS)} are jittered copies")
+    generate.add_argument("--years", type=int, default=1)
+    generate.add_argument("--start", default=DEFAULT_START, help=f"first timestamp (default: {DEFAULT_START})")
+    generate.add_argument("--freq", default="D", help="pandas frequency, e.g. D, h, 15min (default: D)")
+    generate.add_argument("--format", choices=PARTITION_FORMATS, default="parquet")
+    generate.add_argument("--chunk-rows", type=int, default=1_000_000,
+                          help="approximate rows per partition file (bounds memory per worker)")
+    generate.add_argument("--workers", type=int, default=None,
+                          help="worker processes (default: CPU count)")
+    generate.add_argument("--seed", type=int, default=None, help="seed for reproducible output")
+
+    prerender = sub.add_parser("prerender", parents=[sources],
+                               help="render the map, alert cards and charts into a static site")
+    prerender.add_argument("--output", default="static", help="site directory (default: static)")
+    prerender.add_argument("--workers", type=int, default=None,
+                           help="worker processes (default: CPU count)")
+    prerender.add_argument("--force", action="store_true", help="re-render every station, ignoring the manifest")
+    prerender.add_argument("--radius-km", type=float, default=NEARBY_RADIUS_KM,
+                           help=f"nearby-station radius for the alert cards (default: {NEARBY_RADIUS_KM})")
+    prerender.add_argument("--seed", type=int, default=None, help="seed for the simulated dataset")
+
+    history = sub.add_parser("history", help="list, compact or send notifications from the alert history")
+    history.add_argument("action", choices=["show", "compact", "notify"])
+    history.add_argument("--db", default=os.environ.get("ENVIROTRACK_ALERT_HISTORY", "alert_history.db"),
+                         help="SQLite alert history (default: ENVIROTRACK_ALERT_HISTORY or alert_history.db)")
+    history.add_argument("--stations", nargs="+", metavar="STATION",
+                         help="show: station names or city keywords (default: all)")
+    history.add_argument("--since", help="show: events observed at or after this date")
+    history.add_argument("--until", help="show: events observed at or before this date")
+    history.add_argument("--severity", nargs="+", choices=list(SEVERITY_LEVELS),
+                         help="show: only transitions into these levels; notify: default medium high")
+    history.add_argument("--keep-days", type=float, default=HISTORY_RETENTION_DAYS,
+                         help=f"compact: days of events kept before the latest one (default: {HISTORY_RETENTION_DAYS})")
+    history.add_argument("--vacuum", action="store_true", help="compact: also shrink the file")
+    history.add_argument("--webhook", metavar="URL", help="notify: POST events here (default: print them)")
+    history.add_argument("--name", default="cli", help="notify: cursor name, one per destination")
+    history.add_argument("--recoveries", action="store_true", help="notify: include returns to normal")
+    history.add_argument("--follow", type=float, metavar="SECONDS", help="notify: keep polling every SECONDS")
+    return parser
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+
+    if args.command == "serve":
+        from .api import serve
+        try:
+            source = data_source(args)
+        except (SchemaError, OSError) as e:
+            print(f"envirotrack serve: {e}", file=sys.stderr)
+            return 1
+        serve(args.host, args.port, seed=args.seed, quiet=args.quiet, source=source)
+        return 0
+
+    if args.command == "history":
+        return run_history(args, parser)
+
+    if args.command == "generate":
+        if args.num_stations < 1 or args.years < 1 or args.chunk_rows < 1:
+            parser.error("--num-stations, --years and --chunk-rows must be positive")
+        try:
+            manifest = generate_dataset(
+                args.output, n_stations=args.num_stations, years=args.years, start=args.start,
+                freq=args.freq, fmt=args.format, seed=args.seed, workers=args.workers,
+                chunk_rows=args.chunk_rows,
+            )
+        except Exception as e:
+            print(f"envirotrack generate: {type(e).__name__}: {e}", file=sys.stderr)
+            return 1
+        print(f"Wrote {manifest['rows']:,} rows in {len(manifest['files'])} file(s) to {args.output} "
+              f"in {manifest['seconds']:.1f}s (seed entropy {manifest['seed_entropy']})")
+        return 0
+
+    try:
+        data = data_source(args).load()
+    except (SchemaError, OSError) as e:
+        print(f"envirotrack {args.command}: {e}", file=sys.stderr)
+        return 1
+
+    if args.command == "prerender":
+        from .prerender import prerender
+        holder = DatasetHolder()
+        holder.publish(data)
+        report = prerender(holder.current(), args.output, workers=args.workers, force=args.force,
+                           nearby_radius_km=args.radius_km)
+        for location, error in sorted(report['failures'].items()):
+            print(f"envirotrack prerender: {location}: {error}", file=sys.stderr)
+        print(f"Rendered {report['rendered']} station(s), {report['skipped']} unchanged, "
+              f"{report['removed']} removed{', map rebuilt' if report['map_rendered'] else ''} "
+              f"in {report['seconds']:.1f}s to {args.output}")
+        return 1 if report['failures'] else 0
+
+    locations = None
+    if args.stations:
+        locations, unknown = resolve_stations(args.stations, data['location'].unique())
+        if unknown:
+            parser.error(f"unknown station(s): {', '.join(unknown)}")
+
+    options = {}
+    if args.command == "alerts":
+        options["with_news"] = args.with_news
+    elif args.command == "forecast":
+        options["parameters"] = args.parameters
+        options["days"] = args.days
+        options["mode"] = args.mode
+    elif args.command == "backtest":
+        if min(args.horizon, args.initial, args.step) < 1:
+            parser.error("--horizon, --initial and --step must be positive")
+        options.update(parameters=args.parameters, engines=args.engines, grid=dict(args.param) or None,
+                       horizon=args.horizon, initial=args.initial, step=args.step)
+
+    try:
+        records, failures = run_batch(args.command, data, locations=locations,
+                                      workers=args.workers, **options)
+        path = os.path.join(args.output, f"{args.command}.{args.format}")
+        write_records(records, path, fmt=args.format)
+    except Exception as e:
+        print(f"envirotrack {args.command}: {type(e).__name__}: {e}", file=sys.stderr)
+        return 1
+
+    for location, error in sorted(failures.items()):
+        print(f"envirotrack {args.command}: {location}: {error}", file=sys.stderr)
+    print(f"Wrote {len(records)} record(s) to {path}"
+          + (f"; {len(failures)} station(s) failed" if failures else ""))
+    if args.command == "alerts" and args.history and records:
+        changed = AlertHistory(args.history).record(pd.DataFrame.from_records(records))
+        print(f"Recorded {changed} severity change(s) to {args.history}")
+    if args.command == "backtest" and records:
+        report_backtest(records, args)
+    return 1 if failures else 0
+
+def report_backtest(records, args):
+    """Write and print the per-engine summary, and the cheapest engine meeting the accuracy bar."""
+    summary = summarize(records)
+    path = os.path.join(args.output, f"backtest_summary.{args.format}")
+    write_records(summary.to_dict("records"), path, fmt=args.format)
+    width = max(22, summary['engine'].str.len().max() + 2)
+    print(f"\n{'engine':<{width}}{'parameter':<13}{'folds':>6}{'MAE':>9}{'MAPE %':>9}{'cover':>7}{'nominal':>8}"
+          f"{'fit s':>8}{'p95 s':>8}{'peak MB':>9}")
+    for row in summary.itertuples():
+        mape = f"{row.mape:.1f}" if row.mape == row.mape else "-"
+        peak = f"{row.peak_mb:.0f}" if row.peak_mb == row.peak_mb else "-"
+        print(f"{row.engine:<{width}}{row.parameter:<13}{row.folds:>6}{row.mae:>9.2f}{mape:>9}{row.coverage:>7.2f}"
+              f"{row.nominal:>8.2f}{row.fit_seconds:>8.3f}{row.fit_p95:>8.3f}{peak:>9}")
+    if args.max_mape is not None or args.max_mae is not None or args.min_coverage is not None:
+        picks = cheapest(summary, args.max_mape, args.max_mae, args.min_coverage)
+        print("\nCheapest engine meeting the bar: "
+              + ", ".join(f"{parameter}: {engine or 'none'}" for parameter, engine in picks.items()))
+    print(f"Summary written to {path}")
+
+def run_history(args, parser):
+    """history show / compact / notify against the SQLite alert history."""
+    history = AlertHistory(args.db)
+    if args.action == "compact":
+        last = history.stats()['last']
+        deleted = history.compact(pd.Timestamp(last) - pd.Timedelta(days=args.keep_days), vacuum=args.vacuum) \
+            if last else 0
+        print(f"Deleted {deleted} event(s) from {args.db}; {history.stats()['events']} remain")
+        return 0
+
+    if args.action == "show":
+        locations = None
+        if args.stations:
+            locations, unknown = resolve_stations(args.stations, history.current()['location'])
+            if unknown:
+                parser.error(f"unknown station(s): {', '.join(unknown)}")
+        try:
+            events = history.events(locations, start=args.since, end=args.until, severities=args.severity)
+        except ValueError as e:
+            parser.error(f"invalid date: {e}")
+        print_sink(events)
+        print(f"{len(events)} event(s)")
+        return 0
+
+    send = webhook_sink(args.webhook) if args.webhook else print_sink
+    notifier = Notifier(history, send, name=args.name, severities=args.severity or ('medium', 'high'),
+                        recoveries=args.recoveries)
+    while True:
+        try:
+            notifier.poll()
+        except Exception as e:  # the cursor did not move; the same events are retried
+            print(f"envirotrack history notify: {type(e).__name__}: {e}", file=sys.stderr)
+            if not args.follow:
+                return 1
+        if not args.follow:
+            return 0
+        try:
+            time.sleep(args.follow)
+        except KeyboardInterrupt:
+            return 0
@@ -0,0 +1,98 @@
+"""
+Cross-station (lagged) correlation over the day x station matrix.
+
+Columns are standardized once; correlations are then plain matrix products
+of the standardized matrix with itself, evaluated for one block of stations
+at a time so memory stays within ``max_block_bytes`` however many stations
+there are. For a lag L, ``corr[i, j]`` is the correlation of station i on
+day t with station j on day t + L: a positive best lag means j follows i.
+"""
+import numpy as np
+
+
+def standardize(matrix):
+    """
+    Column z-scores (float32) of a (days x stations) matrix; missing days become 0.
+
+    Filling gaps with the column mean (0 after standardizing) keeps every
+    product a single matmul; with few gaps it slightly shrinks correlations.
+    """
+    matrix = np.asarray(matrix, dtype=float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.nanmean(matrix, axis=0)
+        std = np.nanstd(matrix, axis=0)
+        z = (matrix - mean) / np.where(std > 0, std, np.nan)
+    return np.nan_to_num(z, nan=0.0).astype(np.float32)
+
+def lagged_correlation(z, rows, max_lag=0):
+    """
+    Correlations of stations ``rows`` with every station at lags -max_lag..max_lag.
+
+    z is the output of standardize(); max_lag must be below the number of
+    days. Returns an array shaped (2 * max_lag + 1, len(rows), stations);
+    index max_lag is lag 0. Lagged values reuse the full-series mean and
+    std, so they are approximate and are clipped to [-1, 1].
+    """
+    n_days = len(z)
+    block = z[:, rows]
+    out = np.empty((2 * max_lag + 1, block.shape[1], z.shape[1]), dtype=np.float32)
+    for lag in range(max_lag + 1):
+        overlap = n_days - lag
+        # station i today vs station j `lag` days later, and the reverse
+        out[max_lag + lag] = block[:overlap].T @ z[lag:] / overlap
+        if lag:
+            out[max_lag - lag] = block[lag:].T @ z[:overlap] / overlap
+    return np.clip(out, -1.0, 1.0, out=out)
+
+def iter_blocks(n_stations, max_lag=0, max_block_bytes=64 * 2**20):
+    """Row ranges whose lagged correlation blocks fit in max_block_bytes."""
+    per_row = 4 * n_stations * (2 * max_lag + 3)
+    step = max(1, int(max_block_bytes // per_row))
+    for start in range(0, n_stations, step):
+        yield start, min(start + step, n_stations)
+
+
+class SimilarityIndex:
+    """
+    Top-k most correlated stations for every station, at their best lag.
+
+    Built block by block from one standardized matrix; only the top-k
+    results per station are kept, so memory is O(stations x k) beyond one
+    block.
+    """
+
+    def __init__(self, names, matrix, k=10, max_lag=0, max_block_bytes=64 * 2**20):
+        self.names = list(names)
+        max_lag = min(max_lag, max(len(matrix) - 2, 0))
+        self.max_lag = max_lag
+        n_stations = len(self.names)
+        k = max(0, min(k, n_stations - 1))
+        z = standardize(matrix)
+
+        self.neighbours = np.zeros((n_stations, k), dtype=np.int64)
+        self.correlation = np.zeros((n_stations, k))
+        self.lag = np.zeros((n_stations, k), dtype=np.int64)
+        for start, stop in iter_blocks(n_stations, max_lag, max_block_bytes):
+            rows = np.arange(start, stop)
+            corr = lagged_correlation(z, rows, max_lag)
+            best_lag = np.argmax(corr, axis=0)
+            best = np.take_along_axis(corr, best_lag[None], axis=0)[0]
+            best[np.arange(len(rows)), rows] = -np.inf  # never similar to itself
+            if not k:
+                continue
+            top = np.argpartition(-best, k - 1, axis=1)[:, :k]
+            order = np.argsort(-np.take_along_axis(best, top, axis=1), axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            self.neighbours[start:stop] = top
+            self.correlation[start:stop] = np.take_along_axis(best, top, axis=1)
+            self.lag[start:stop] = np.take_along_axis(best_lag, top, axis=1) - max_lag
+        self._ids = {name: i for i, name in enumerate(self.names)}
+
+    def similar(self, name, k=None):
+        """[(station, correlation, lag_days)] for one station, most similar first."""
+        i = self._ids[name]
+        k = self.neighbours.shape[1] if k is None else k
+        return [
+            (self.names[j], float(c), int(lag))
+            for j, c, lag in zip(self.neighbours[i, :k], self.correlation[i, :k], self.lag[i, :k])
+        ]
@@ -0,0 +1,609 @@
+"""
+Station list, simulated readings and the shared read-only Dataset.
+"""
+import threading
+from datetime import datetime, timedelta
+from functools import cached_property, lru_cache, wraps
+
+import numpy as np
+import pandas as pd
+
+from .alerts import assess_severity_array
+from .anomalies import AnomalyEngine
+from .correlation import SimilarityIndex
+from .rollups import RegionalRollups
+from .stations import Station, StationRegistry, StationSearch
+from .viewport import ClusterPyramid
+
+# ============================================================
+# Stations
+# ============================================================
+# Default radius for "nearby stations" in alerts and on the map
+NEARBY_RADIUS_KM = 50
+
+STATIONS = [
+    # Jammu & Kashmir (including PoK - Muzaffarabad as integral part)
+    {'name': 'Srinagar (Jammu & Kashmir)', 'lat': 34.0837, 'lon': 74.7973},
+    {'name': 'Jammu (Jammu & Kashmir)', 'lat': 32.7266, 'lon': 74.8570},
+    {'name': 'Anantnag (Jammu & Kashmir)', 'lat': 33.7310, 'lon': 75.1484},
+    {'name': 'Muzaffarabad (Jammu & Kashmir - PoK)', 'lat': 34.3700, 'lon': 73.4711},
+
+    # Ladakh (including Aksai Chin areas)
+    {'name': 'Leh (Ladakh)', 'lat': 34.1526, 'lon': 77.5771},
+    {'name': 'Kargil (Ladakh)', 'lat': 34.5539, 'lon': 76.1313},
+    {'name': 'Aksai Chin Region (Ladakh)', 'lat': 35.3000, 'lon': 79.0000},
+
+    # Himachal Pradesh
+    {'name': 'Shimla (Himachal Pradesh)', 'lat': 31.1048, 'lon': 77.1734},
+    {'name': 'Dharamshala (Himachal Pradesh)', 'lat': 32.2190, 'lon': 76.3234},
+    {'name': 'Manali (Himachal Pradesh)', 'lat': 32.2396, 'lon': 77.1887},
+
+    # Punjab
+    {'name': 'Chandigarh (Punjab & Haryana)', 'lat': 30.7333, 'lon': 76.7794},
+    {'name': 'Amritsar (Punjab)', 'lat': 31.6340, 'lon': 74.8723},
+    {'name': 'Ludhiana (Punjab)', 'lat': 30.9010, 'lon': 75.8573},
+    {'name': 'Patiala (Punjab)', 'lat': 30.3398, 'lon': 76.3869},
+
+    # Haryana
+    {'name': 'Gurugram (Haryana)', 'lat': 28.4595, 'lon': 77.0266},
+    {'name': 'Faridabad (Haryana)', 'lat': 28.4089, 'lon': 77.3178},
+    {'name': 'Panipat (Haryana)', 'lat': 29.3909, 'lon': 76.9635},
+
+    # Delhi
+    {'name': 'New Delhi (Delhi)', 'lat': 28.6139, 'lon': 77.2090},
+    {'name': 'Dwarka (Delhi)', 'lat': 28.5921, 'lon': 77.0460},
+    {'name': 'Rohini (Delhi)', 'lat': 28.7499, 'lon': 77.0672},
+
+    # Uttarakhand
+    {'name': 'Dehradun (Uttarakhand)', 'lat': 30.3165, 'lon': 78.0322},
+    {'name': 'Haridwar (Uttarakhand)', 'lat': 29.9457, 'lon': 78.1642},
+    {'name': 'Nainital (Uttarakhand)', 'lat': 29.3803, 'lon': 79.4636},
+
+    # Uttar Pradesh
+    {'name': 'Lucknow (Uttar Pradesh)', 'lat': 26.8467, 'lon': 80.9462},
+    {'name': 'Agra (Uttar Pradesh)', 'lat': 27.1767, 'lon': 78.0081},
+    {'name': 'Varanasi (Uttar Pradesh)', 'lat': 25.3176, 'lon': 82.9739},
+    {'name': 'Kanpur (Uttar Pradesh)', 'lat': 26.4499, 'lon': 80.3319},
+
+    # Rajasthan
+    {'name': 'Jaipur (Rajasthan)', 'lat': 26.9124, 'lon': 75.7873},
+    {'name': 'Jodhpur (Rajasthan)', 'lat': 26.2389, 'lon': 73.0243},
+    {'name': 'Udaipur (Rajasthan)', 'lat': 24.5854, 'lon': 73.7125},
+    {'name': 'Jaisalmer (Rajasthan)', 'lat': 26.9157, 'lon': 70.9083},
+
+    # Gujarat
+    {'name': 'Gandhinagar (Gujarat)', 'lat': 23.2156, 'lon': 72.6369},
+    {'name': 'Ahmedabad (Gujarat)', 'lat': 23.0225, 'lon': 72.5714},
+    {'name': 'Surat (Gujarat)', 'lat': 21.1702, 'lon': 72.8311},
+    {'name': 'Vadodara (Gujarat)', 'lat': 22.3072, 'lon': 73.1812},
+
+    # Madhya Pradesh
+    {'name': 'Bhopal (Madhya Pradesh)', 'lat': 23.2599, 'lon': 77.4126},
+    {'name': 'Indore (Madhya Pradesh)', 'lat': 22.7196, 'lon': 75.8577},
+    {'name': 'Gwalior (Madhya Pradesh)', 'lat': 26.2183, 'lon': 78.1828},
+    {'name': 'Ujjain (Madhya Pradesh)', 'lat': 23.1765, 'lon': 75.7885},
+
+    # Chhattisgarh
+    {'name': 'Raipur (Chhattisgarh)', 'lat': 21.2514, 'lon': 81.6296},
+    {'name': 'Bhilai (Chhattisgarh)', 'lat': 21.2167, 'lon': 81.3833},
+    {'name': 'Bilaspur (Chhattisgarh)', 'lat': 22.0797, 'lon': 82.1409},
+
+    # Maharashtra
+    {'name': 'Mumbai (Maharashtra)', 'lat': 19.0760, 'lon': 72.8777},
+    {'name': 'Pune (Maharashtra)', 'lat': 18.5204, 'lon': 73.8567},
+    {'name': 'Nagpur (Maharashtra)', 'lat': 21.1458, 'lon': 79.0882},
+    {'name': 'Nashik (Maharashtra)', 'lat': 19.9975, 'lon': 73.7898},
+
+    # Goa
+    {'name': 'Panaji (Goa)', 'lat': 15.4909, 'lon': 73.8278},
+    {'name': 'Vasco da Gama (Goa)', 'lat': 15.3989, 'lon': 73.8150},
+    {'name': 'Margao (Goa)', 'lat': 15.2708, 'lon': 73.9528},
+
+    # Karnataka
+    {'name': 'Bengaluru (Karnataka)', 'lat': 12.9716, 'lon': 77.5946},
+    {'name': 'Mysuru (Karnataka)', 'lat': 12.2958, 'lon': 76.6394},
+    {'name': 'Mangaluru (Karnataka)', 'lat': 12.9141, 'lon': 74.8560},
+    {'name': 'Hubballi (Karnataka)', 'lat': 15.3647, 'lon': 75.1240},
+
+    # Telangana
+    {'name': 'Hyderabad (Telangana)', 'lat': 17.3850, 'lon': 78.4867},
+    {'name': 'Warangal (Telangana)', 'lat': 17.9689, 'lon': 79.5941},
+    {'name': 'Nizamabad (Telangana)', 'lat': 18.6725, 'lon': 78.0941},
+
+    # Andhra Pradesh
+    {'name': 'Amaravati (Andhra Pradesh)', 'lat': 16.5113, 'lon': 80.5154},
+    {'name': 'Visakhapatnam (Andhra Pradesh)', 'lat': 17.6868, 'lon': 83.2185},
+    {'name': 'Vijayawada (Andhra Pradesh)', 'lat': 16.5062, 'lon': 80.6480},
+    {'name': 'Tirupati (Andhra Pradesh)', 'lat': 13.6288, 'lon': 79.4192},
+
+    # Tamil Nadu
+    {'name': 'Chennai (Tamil Nadu)', 'lat': 13.0827, 'lon': 80.2707},
+    {'name': 'Coimbatore (Tamil Nadu)', 'lat': 11.0168, 'lon': 76.9558},
+    {'name': 'Madurai (Tamil Nadu)', 'lat': 9.9252, 'lon': 78.1198},
+    {'name': 'Tiruchirappalli (Tamil Nadu)', 'lat': 10.7905, 'lon': 78.7047},
+
+    # Kerala
+    {'name': 'Thiruvananthapuram (Kerala)', 'lat': 8.5241, 'lon': 76.9366},
+    {'name': 'Kochi (Kerala)', 'lat': 9.9312, 'lon': 76.2673},
+    {'name': 'Kozhikode (Kerala)', 'lat': 11.2588, 'lon': 75.7804},
+    {'name': 'Thrissur (Kerala)', 'lat': 10.5276, 'lon': 76.2144},
+
+    # Bihar
+    {'name': 'Patna (Bihar)', 'lat': 25.5941, 'lon': 85.1376},
+    {'name': 'Gaya (Bihar)', 'lat': 24.7955, 'lon': 84.9994},
+    {'name': 'Bhagalpur (Bihar)', 'lat': 25.2425, 'lon': 86.9842},
+
+    # Jharkhand
+    {'name': 'Ranchi (Jharkhand)', 'lat': 23.3441, 'lon': 85.3096},
+    {'name': 'Jamshedpur (Jharkhand)', 'lat': 22.8046, 'lon': 86.2029},
+    {'name': 'Dhanbad (Jharkhand)', 'lat': 23.7957, 'lon': 86.4304},
+
+    # Odisha
+    {'name': 'Bhubaneswar (Odisha)', 'lat': 20.2961, 'lon': 85.8245},
+    {'name': 'Cuttack (Odisha)', 'lat': 20.4625, 'lon': 85.8830},
+    {'name': 'Puri (Odisha)', 'lat': 19.8135, 'lon': 85.8312},
+
+    # West Bengal
+    {'name': 'Kolkata (West Bengal)', 'lat': 22.5726, 'lon': 88.3639},
+    {'name': 'Howrah (West Bengal)', 'lat': 22.5958, 'lon': 88.2636},
+    {'name': 'Siliguri (West Bengal)', 'lat': 26.7271, 'lon': 88.3953},
+    {'name': 'Darjeeling (West Bengal)', 'lat': 27.0360, 'lon': 88.2627},
+
+    # Sikkim
+    {'name': 'Gangtok (Sikkim)', 'lat': 27.3389, 'lon': 88.6065},
+    {'name': 'Namchi (Sikkim)', 'lat': 27.1667, 'lon': 88.3667},
+    {'name': 'Pelling (Sikkim)', 'lat': 27.2871, 'lon': 88.2150},
+
+    # Assam
+    {'name': 'Dispur (Assam)', 'lat': 26.1433, 'lon': 91.7898},
+    {'name': 'Guwahati (Assam)', 'lat': 26.1445, 'lon': 91.7362},
+    {'name': 'Silchar (Assam)', 'lat': 24.8333, 'lon': 92.7789},
+
+    # Arunachal Pradesh
+    {'name': 'Itanagar (Arunachal Pradesh)', 'lat': 27.0844, 'lon': 93.6053},
+    {'name': 'Tawang (Arunachal Pradesh)', 'lat': 27.5860, 'lon': 91.8590},
+    {'name': 'Ziro (Arunachal Pradesh)', 'lat': 27.5450, 'lon': 93.8317},
+
+    # Nagaland
+    {'name': 'Kohima (Nagaland)', 'lat': 25.6751, 'lon': 94.1086},
+    {'name': 'Dimapur (Nagaland)', 'lat': 25.9040, 'lon': 93.7267},
+    {'name': 'Mokokchung (Nagaland)', 'lat': 26.3217, 'lon': 94.5203},
+
+    # Manipur
+    {'name': 'Imphal (Manipur)', 'lat': 24.8170, 'lon': 93.9368},
+    {'name': 'Thoubal (Manipur)', 'lat': 24.6333, 'lon': 93.9833},
+    {'name': 'Bishnupur (Manipur)', 'lat': 24.6000, 'lon': 93.7667},
+
+    # Mizoram
+    {'name': 'Aizawl (Mizoram)', 'lat': 23.7307, 'lon': 92.7173},
+    {'name': 'Lunglei (Mizoram)', 'lat': 22.8900, 'lon': 92.7347},
+    {'name': 'Champhai (Mizoram)', 'lat': 23.4697, 'lon': 93.3269},
+
+    # Tripura
+    {'name': 'Agartala (Tripura)', 'lat': 23.8315, 'lon': 91.2868},
+    {'name': 'Udaipur (Tripura)', 'lat': 23.5333, 'lon': 91.4833},
+    {'name': 'Dharmanagar (Tripura)', 'lat': 24.3667, 'lon': 92.1667},
+
+    # Meghalaya
+    {'name': 'Shillong (Meghalaya)', 'lat': 25.5788, 'lon': 91.8933},
+    {'name': 'Tura (Meghalaya)', 'lat': 25.5138, 'lon': 90.2034},
+    {'name': 'Cherrapunji (Meghalaya)', 'lat': 25.2697, 'lon': 91.7320},
+
+    # Andaman & Nicobar
+    {'name': 'Port Blair (Andaman & Nicobar)', 'lat': 11.6234, 'lon': 92.7265},
+    {'name': 'Diglipur (Andaman & Nicobar)', 'lat': 13.2667, 'lon': 93.0000},
+    {'name': 'Car Nicobar (Andaman & Nicobar)', 'lat': 9.1528, 'lon': 92.8194},
+
+    # Puducherry
+    {'name': 'Puducherry (Puducherry)', 'lat': 11.9416, 'lon': 79.8083},
+    {'name': 'Karaikal (Puducherry)', 'lat': 10.9254, 'lon': 79.8380},
+    {'name': 'Mahe (Puducherry)', 'lat': 11.7009, 'lon': 75.5340},
+
+    # Lakshadweep
+    {'name': 'Kavaratti (Lakshadweep)', 'lat': 10.5593, 'lon': 72.6358},
+    {'name': 'Agatti (Lakshadweep)', 'lat': 10.8482, 'lon': 72.1920},
+    {'name': 'Minicoy (Lakshadweep)', 'lat': 8.2833, 'lon': 73.0500},
+
+    # Daman & Diu
+    {'name': 'Daman (Daman & Diu)', 'lat': 20.3974, 'lon': 72.8328},
+    {'name': 'Diu (Daman & Diu)', 'lat': 20.7144, 'lon': 70.9882},
+
+    # Dadra & Nagar Haveli
+    {'name': 'Silvassa (Dadra & Nagar Haveli)', 'lat': 20.2766, 'lon': 73.0081},
+    {'name': 'Dadra (Dadra & Nagar Haveli)', 'lat': 20.2700, 'lon': 73.0150}
+]
+
+
+# Location suffixes that are not a state/UT name on their own
+STATE_ALIASES = {
+    'Jammu & Kashmir - PoK': 'Jammu & Kashmir',
+    'Punjab & Haryana': 'Chandigarh',
+}
+
+REGIONS = {
+    'Jammu & Kashmir': 'North', 'Ladakh': 'North', 'Himachal Pradesh': 'North',
+    'Punjab': 'North', 'Chandigarh': 'North', 'Haryana': 'North', 'Delhi': 'North',
+    'Uttarakhand': 'North', 'Uttar Pradesh': 'North', 'Rajasthan': 'North',
+    'Gujarat': 'West', 'Maharashtra': 'West', 'Goa': 'West',
+    'Daman & Diu': 'West', 'Dadra & Nagar Haveli': 'West',
+    'Madhya Pradesh': 'Central', 'Chhattisgarh': 'Central',
+    'Karnataka': 'South', 'Telangana': 'South', 'Andhra Pradesh': 'South',
+    'Tamil Nadu': 'South', 'Kerala': 'South', 'Puducherry': 'South',
+    'Bihar': 'East', 'Jharkhand': 'East', 'Odisha': 'East', 'West Bengal': 'East',
+    'Sikkim': 'North-East', 'Assam': 'North-East', 'Arunachal Pradesh': 'North-East',
+    'Nagaland': 'North-East', 'Manipur': 'North-East', 'Mizoram': 'North-East',
+    'Tripura': 'North-East', 'Meghalaya': 'North-East',
+    'Andaman & Nicobar': 'Islands', 'Lakshadweep': 'Islands',
+}
+
+# Other names people search for, by city and by state (station search)
+CITY_ALIASES = {
+    'New Delhi': ['Delhi'], 'Mumbai': ['Bombay'], 'Chennai': ['Madras'], 'Kolkata': ['Calcutta'],
+    'Bengaluru': ['Bangalore'], 'Mysuru': ['Mysore'], 'Mangaluru': ['Mangalore'], 'Hubballi': ['Hubli'],
+    'Gurugram': ['Gurgaon'], 'Thiruvananthapuram': ['Trivandrum'], 'Kochi': ['Cochin'],
+    'Kozhikode': ['Calicut'], 'Thrissur': ['Trichur'], 'Tiruchirappalli': ['Trichy'],
+    'Puducherry': ['Pondicherry'], 'Vadodara': ['Baroda'], 'Visakhapatnam': ['Vizag'],
+    'Varanasi': ['Banaras', 'Benares'], 'Panaji': ['Panjim'], 'Margao': ['Madgaon'],
+    'Vasco da Gama': ['Vasco'], 'Guwahati': ['Gauhati'], 'Dharamshala': ['Dharamsala'],
+    'Cherrapunji': ['Sohra'], 'Port Blair': ['Sri Vijaya Puram'], 'Shimla': ['Simla'],
+    'Cuttack': ['Katak'], 'Kanpur': ['Cawnpore'],
+}
+
+STATE_SHORT_NAMES = {
+    'Jammu & Kashmir': ['J&K'], 'Himachal Pradesh': ['HP'], 'Uttar Pradesh': ['UP'],
+    'Madhya Pradesh': ['MP'], 'Andhra Pradesh': ['AP'], 'Arunachal Pradesh': ['Arunachal'],
+    'Tamil Nadu': ['TN'], 'West Bengal': ['WB', 'Bengal'], 'Delhi': ['NCT'],
+    'Andaman & Nicobar': ['Andaman and Nicobar Islands', 'A&N'], 'Odisha': ['Orissa'],
+    'Uttarakhand': ['Uttaranchal'], 'Dadra & Nagar Haveli': ['DNH'], 'Daman & Diu': ['DD'],
+}
+
+
+@lru_cache(maxsize=None)
+def split_location(location_name):
+    """(city, state) from a "City (State)" station name; state is '' when absent."""
+    city, _, rest = location_name.partition("(")
+    state = rest.rsplit(")", 1)[0].strip()
+    return city.strip(), STATE_ALIASES.get(state, state)
+
+def extract_city_keyword(location_name: str) -> str:
+    return split_location(location_name)[0]
+
+def extract_state(location_name: str) -> str:
+    return split_location(location_name)[1]
+
+def location_regions(locations):
+    """Per-row state and region arrays, parsing each distinct name only once."""
+    names, codes = np.unique(np.asarray(locations, dtype=object), return_inverse=True)
+    states = np.array([extract_state(name) or 'Unknown' for name in names], dtype=object)
+    regions = np.array([REGIONS.get(state, 'Other') for state in states], dtype=object)
+    return states[codes], regions[codes]
+
+def _station_metadata(names, states=None, regions=None):
+    cities = [extract_city_keyword(name) for name in names]
+    if states is None:
+        states = [extract_state(name) or 'Unknown' for name in names]
+    if regions is None:
+        regions = [REGIONS.get(state, 'Other') for state in states]
+    return {'cities': cities, 'states': list(states), 'regions': list(regions),
+            'aliases': [CITY_ALIASES.get(city, ()) for city in cities]}
+
+def station_registry(df):
+    """StationRegistry with city, state, region and alias metadata for df's stations (one row each)."""
+    first = df.drop_duplicates('location')
+    states = first['state'].tolist() if 'state' in first else None
+    regions = first['region'].tolist() if 'region' in first else None
+    return StationRegistry(first['location'].tolist(), first['lat'].to_numpy(), first['lon'].to_numpy(),
+                           state_aliases=STATE_SHORT_NAMES,
+                           **_station_metadata(first['location'].tolist(), states, regions))
+
+def station_search(names):
+    """StationSearch over bare station names (no coordinates needed), e.g. to resolve CLI arguments."""
+    metadata = _station_metadata(names)
+    records = [
+        Station(i, name, city=metadata['cities'][i], state=metadata['states'][i],
+                region=metadata['regions'][i], aliases=metadata['aliases'][i])
+        for i, name in enumerate(names)
+    ]
+    return StationSearch(records, STATE_SHORT_NAMES)
+
+# ============================================================
+# Data Loading
+# ============================================================
+def simulate_readings(stations, dates, rng):
+    """
+    Simulated readings for every station at every timestamp, station-major.
+
+    stations is a list of {'name', 'lat', 'lon'} dicts. Seasonal, latitude
+    and AQI rules are applied per month. For sub-daily timestamps
+    temperature gets a diurnal cycle (peak mid-afternoon) and rainfall is
+    scaled to the interval, so daily totals match the daily rules.
+    """
+    dates = pd.DatetimeIndex(dates)
+    shape = (len(stations), len(dates))
+    lat = np.array([s['lat'] for s in stations], dtype=float)[:, None]
+    month = dates.month.to_numpy()[None, :]
+
+    summer = np.isin(month, [5, 6])
+    winter = np.isin(month, [12, 1])
+    base_temp = 30 - (lat - 20) * 0.5
+    temp_mean = np.where(summer, base_temp + 5, np.where(winter, base_temp - 10, base_temp))
+    temp = temp_mean + np.where(summer | winter, 3, 4) * rng.standard_normal(shape)
+
+    polluted = (lat > 25) & np.isin(month, [11, 12, 1, 2])
+    aqi = np.where(polluted, 200, 100) + np.where(polluted, 50, 30) * rng.standard_normal(shape)
+
+    monsoon = np.isin(month, [6, 7, 8, 9])
+    rain_scale = np.where(monsoon, np.where((lat > 8) & (lat < 20), 20, 15), 2)
+    rainfall = rain_scale * rng.standard_exponential(shape)
+
+    step = dates[1] - dates[0] if len(dates) > 1 else pd.Timedelta(days=1)
+    if step < pd.Timedelta(days=1):
+        hour = (dates.hour + dates.minute / 60).to_numpy()[None, :]
+        temp = temp + 4 * np.cos(2 * np.pi * (hour - 15) / 24)
+        rainfall = rainfall * (step / pd.Timedelta(days=1))
+
+    return pd.DataFrame({
+        'date': np.tile(dates.to_numpy(), len(stations)),
+        'location': np.repeat([s['name'] for s in stations], len(dates)),
+        'lat': np.repeat(lat[:, 0], len(dates)),
+        'lon': np.repeat([s['lon'] for s in stations], len(dates)).astype(float),
+        'temperature': np.round(np.clip(temp, 0, 50), 2).ravel(),
+        'air_quality': np.round(np.clip(aqi, 0, 500), 2).ravel(),
+        'rainfall': np.round(rainfall, 2).ravel(),
+    })
+
+def load_sample_data(seed=None):
+    """Simulated daily readings for the last 60 days; pass a seed for repeatable runs."""
+    rng = np.random.default_rng(seed)
+
+    # Generate data for last 60 days from today
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=60)
+    dates = pd.date_range(start=start_date, end=end_date, freq='D')
+    return simulate_readings(STATIONS, dates, rng)
+
+# ============================================================
+# Shared Dataset (one read-only copy for every session)
+# ============================================================
+def _derived(build):
+    """
+    cached_property built at most once per Dataset: sessions and scheduler
+    workers share one instance, so the build runs under its _derived_lock.
+    """
+    name = build.__name__
+
+    @wraps(build)
+    def locked(self):
+        with self._derived_lock:
+            if name not in self.__dict__:
+                self.__dict__[name] = build(self)
+            return self.__dict__[name]
+    return cached_property(locked)
+
+
+class Dataset:
+    """
+    Immutable, versioned snapshot of the station readings.
+
+    Rows are sorted by (location, date) and every column is backed by a
+    read-only array, so the same buffers can be handed to all sessions
+    without pickling or copying. State and region are parsed from the
+    location names once, here, and stored as columns. Everything else
+    (registry, latest table, anomalies, clusters, rollups) is built on
+    first use and kept for this version.
+    """
+
+    def __init__(self, df, version, rollups=None, anomalies=None):
+        df = df.sort_values(["location", "date"], kind="stable")
+        columns = {}
+        for col in df.columns:
+            values = df[col].to_numpy(copy=True)
+            values.flags.writeable = False
+            columns[col] = values
+        if "state" not in columns:
+            columns["state"], columns["region"] = location_regions(columns["location"])
+            columns["state"].flags.writeable = False
+            columns["region"].flags.writeable = False
+        self._frame = pd.DataFrame(columns, copy=False)
+        self.version = version
+        self.created_at = datetime.now()
+
+        # Row ranges per location, so per-city views are slices, not filters
+        locations = self._frame["location"].to_numpy()
+        starts = np.flatnonzero(np.r_[True, locations[1:] != locations[:-1]])
+        stops = np.r_[starts[1:], len(locations)]
+        self._offsets = {
+            locations[start]: (int(start), int(stop)) for start, stop in zip(starts, stops)
+        }
+        self.locations = tuple(sorted(self._offsets))
+
+        # Calendar day of every row (readings carry a time of day)
+        self._day = self._frame["date"].dt.normalize().to_numpy()
+        self._day.flags.writeable = False
+        self.days = tuple(pd.DatetimeIndex(np.unique(self._day)))
+
+        # Derived tables built on first use and kept for this version only;
+        # re-entrant because some derived tables are built from others
+        self._derived_lock = threading.RLock()
+        self._wide = {}
+        self._similarity = {}
+        # Carried over from the previous version by DatasetHolder.append()
+        # (rollups extended, anomalies updated in streaming mode)
+        if rollups is not None:
+            self.rollups = rollups
+        if anomalies is not None:
+            self.anomalies = anomalies
+
+    # --------------------------------------------------------
+    # Derived per version, on first use
+    # --------------------------------------------------------
+    @_derived
+    def stations(self):
+        """Station metadata and search; ids follow self.locations."""
+        return station_registry(self._frame)
+
+    @_derived
+    def anomalies(self):
+        """Per-station climatology anomalies (AnomalyEngine) fitted on every reading."""
+        engine = AnomalyEngine()
+        engine.fit(self._frame)
+        return engine
+
+    @_derived
+    def rollups(self):
+        """Daily state/region aggregates."""
+        return RegionalRollups.from_frame(self._frame, self._day)
+
+    @_derived
+    def _latest_readings(self):
+        """Latest reading per location with its severity, in location order."""
+        last_rows = [self._offsets[loc][1] - 1 for loc in self.locations]
+        latest = self._frame.iloc[last_rows].reset_index(drop=True)
+        latest['severity'] = assess_severity_array(
+            latest['temperature'], latest['rainfall'], latest['air_quality']
+        )
+        return latest
+
+    @_derived
+    def _latest(self):
+        """_latest_readings plus each station's latest anomaly scores (fits the anomalies)."""
+        scores = self.anomalies.latest(self.locations).drop(columns='location')
+        return pd.concat([self._latest_readings, scores], axis=1)
+
+    @_derived
+    def _latest_severity(self):
+        return dict(zip(self._latest_readings['location'], self._latest_readings['severity']))
+
+    @_derived
+    def _latest_index(self):
+        return {loc: i for i, loc in enumerate(self.locations)}
+
+    @_derived
+    def viewport(self):
+        """Marker clusters per zoom for the interactive map; indices match latest rows."""
+        latest = self._latest_readings
+        return ClusterPyramid(latest['lat'], latest['lon'], latest['severity'])
+
+    @_derived
+    def state_centroids(self):
+        return self._latest_readings.groupby('state')[['lat', 'lon']].mean()
+
+    @property
+    def frame(self):
+        """Shallow view of the shared frame; buffers are shared, columns are not."""
+        return self._frame.copy(deep=False)
+
+    @property
+    def latest(self):
+        """Latest reading + severity per location (shallow view)."""
+        return self._latest.copy(deep=False)
+
+    def location_slice(self, location):
+        """All rows of one location in date order (zero-copy slice)."""
+        start, stop = self._offsets[location]
+        return self._frame.iloc[start:stop]
+
+    def row_ranges(self, locations=None, start=None, end=None):
+        """
+        [(start_row, stop_row)] of the frame for locations (default: all)
+        with dates in [start, end], found by binary search per location.
+        """
+        dates = self._frame["date"].to_numpy()
+        start = None if start is None else np.datetime64(pd.Timestamp(start))
+        end = None if end is None else np.datetime64(pd.Timestamp(end))
+        ranges = []
+        for location in (self.locations if locations is None else locations):
+            lo, hi = self._offsets[location]
+            if start is not None:
+                lo += int(np.searchsorted(dates[lo:hi], start, side="left"))
+            if end is not None:
+                hi = lo + int(np.searchsorted(dates[lo:hi], end, side="right"))
+            if hi > lo:
+                ranges.append((lo, hi))
+        return ranges
+
+    def readings_on(self, day):
+        """All station readings on one calendar day."""
+        return self._frame[self._day == np.datetime64(pd.Timestamp(day).normalize())]
+
+    def wide(self, metric):
+        """Read-only (day x location) table of one metric, built once per version."""
+        with self._derived_lock:
+            if metric not in self._wide:
+                day_codes = np.searchsorted(np.asarray(self.days, dtype='datetime64[ns]'), self._day)
+                counts = [stop - start for start, stop in (self._offsets[loc] for loc in self.locations)]
+                loc_codes = np.repeat(np.arange(len(self.locations)), counts)
+                matrix = np.full((len(self.days), len(self.locations)), np.nan)
+                matrix[day_codes, loc_codes] = self._frame[metric].to_numpy(dtype=float)
+                matrix.flags.writeable = False
+                self._wide[metric] = pd.DataFrame(
+                    matrix, index=pd.DatetimeIndex(self.days, name='date'),
+                    columns=pd.Index(self.locations, name='location'), copy=False
+                )
+            return self._wide[metric]
+
+    def similarity(self, metric, max_lag=0, k=10):
+        """Most-correlated stations for every station (SimilarityIndex), cached per version."""
+        matrix = self.wide(metric).to_numpy()
+        with self._derived_lock:
+            key = (metric, max_lag, k)
+            if key not in self._similarity:
+                self._similarity[key] = SimilarityIndex(self.locations, matrix, k=k, max_lag=max_lag)
+            return self._similarity[key]
+
+    def anomaly(self, location):
+        """Latest signed anomaly score per metric for one location, as {metric: score}."""
+        row = self._latest.iloc[self._latest_index[location]]
+        return {metric: float(row[f'{metric}_score']) for metric in self.anomalies.metrics}
+
+    def nearby(self, location, radius_km):
+        """Other stations within radius_km as [(name, severity, distance_km)], nearest first."""
+        return [
+            (name, self._latest_severity[name], distance)
+            for name, distance in self.stations.neighbours(location, radius_km=radius_km)
+        ]
+
+
+class DatasetHolder:
+    """Process-wide slot for the current Dataset; publish() swaps it atomically."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._current = None
+
+    def current(self):
+        return self._current
+
+    def publish(self, df):
+        with self._lock:
+            version = self._current.version + 1 if self._current is not None else 1
+            dataset = Dataset(df, version)
+            self._current = dataset
+        return dataset
+
+    def append(self, new_rows):
+        """
+        Publish the current readings plus new_rows (readings for new dates).
+
+        Only the new rows are aggregated: the state/region rollups of the
+        current version are extended and a copy of its anomaly engine is
+        updated in streaming mode, rather than either being recomputed.
+        Either one the current version never built stays lazy.
+        """
+        with self._lock:
+            current = self._current
+            if current is None:
+                raise RuntimeError("no dataset published yet")
+            new_rows = new_rows.copy()
+            new_rows["state"], new_rows["region"] = location_regions(new_rows["location"])
+            built = vars(current)
+            rollups = anomalies = None
+            if 'rollups' in built:
+                rollups = current.rollups.updated(new_rows, new_rows["date"].dt.normalize().to_numpy())
+            if 'anomalies' in built:
+                anomalies = current.anomalies.copy()
+                anomalies.update(new_rows)
+            df = pd.concat([current.frame, new_rows[current.frame.columns]], ignore_index=True)
+            dataset = Dataset(df, current.version + 1, rollups=rollups, anomalies=anomalies)
+            self._current = dataset
+        return dataset
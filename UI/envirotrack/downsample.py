@@ -0,0 +1,40 @@
+"""
+Min/max decimation for line charts.
+
+Rows are split into equal buckets and, per column, only the rows holding
+the bucket's minimum and maximum are kept, so peaks and troughs survive
+while the number of points sent to the browser stays bounded.
+"""
+import numpy as np
+
+
+def minmax_indices(values, max_points):
+    """
+    Row indices to keep for each column of a (rows x columns) array.
+
+    Returns a list with one sorted index array per column, each at most
+    max_points long (every row is kept when it already fits).
+    """
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values[:, None]
+    n_rows, n_cols = values.shape
+    if n_rows <= max_points:
+        return [np.arange(n_rows)] * n_cols
+
+    n_buckets = max(1, max_points // 2)
+    size = -(-n_rows // n_buckets)  # ceil
+    padded = np.full((n_buckets * size, n_cols), np.nan)
+    padded[:n_rows] = values
+    buckets = padded.reshape(n_buckets, size, n_cols)
+
+    lows = np.argmin(np.where(np.isnan(buckets), np.inf, buckets), axis=1)
+    highs = np.argmax(np.where(np.isnan(buckets), -np.inf, buckets), axis=1)
+    offsets = (np.arange(n_buckets) * size)[:, None]
+    keep = np.concatenate([lows + offsets, highs + offsets], axis=0)  # (2 * buckets, columns)
+    return [np.unique(col[col < n_rows]) for col in keep.T]
+
+def downsample_wide(wide, max_points=500):
+    """{column: Series} of a wide frame, each reduced to at most max_points rows."""
+    indices = minmax_indices(wide.to_numpy(), max_points)
+    return {col: wide[col].iloc[idx] for col, idx in zip(wide.columns, indices)}
@@ -0,0 +1,134 @@
+"""
+Server-side paging and chunked CSV/Parquet export of station readings.
+
+Both work on row ranges of the shared Dataset (rows are sorted by
+location then date), so a page or an export chunk is a slice of the
+read-only frame rather than a filtered copy of it.
+"""
+import io
+
+import numpy as np
+import pandas as pd
+
+from .alerts import assess_severity_array
+
+SORTABLE_COLUMNS = ('date', 'temperature', 'air_quality', 'rainfall')
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+EXPORT_CHUNK_ROWS = 50_000
+
+
+# ------------------------------------------------------------
+# Paging
+# ------------------------------------------------------------
+def query_page(dataset, location, start=None, end=None, columns=None, sort_by='date',
+               descending=True, severities=None, page=1, page_size=100):
+    """
+    One page of a station's readings, filtered and sorted server-side.
+
+    Returns (page_frame, total_rows). With the default date sort and no
+    severity filter the page is cut straight out of the location's row
+    range; otherwise only that range is filtered and argsorted.
+    """
+    frame = dataset.frame
+    ranges = dataset.row_ranges([location], start, end)
+    lo, hi = ranges[0] if ranges else (0, 0)
+    rows = np.arange(lo, hi)
+
+    if severities:
+        block = frame.iloc[lo:hi]
+        severity = assess_severity_array(block['temperature'], block['rainfall'], block['air_quality'])
+        rows = rows[np.isin(severity, list(severities))]
+
+    if sort_by != 'date':
+        order = np.argsort(frame[sort_by].to_numpy()[rows], kind='stable')
+        rows = rows[order]
+    if descending:
+        rows = rows[::-1]
+
+    total = len(rows)
+    first = (max(page, 1) - 1) * page_size
+    out = frame.take(rows[first:first + page_size])
+    if columns:
+        out = out[list(columns)]
+    return out.reset_index(drop=True), total
+
+
+# ------------------------------------------------------------
+# Chunked export
+# ------------------------------------------------------------
+def iter_chunks(dataset, locations=None, start=None, end=None, columns=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    """
+    Readings as DataFrames of about chunk_rows rows, in (location, date)
+    order. Exports of more than one station always carry location and date.
+    """
+    frame = dataset.frame
+    columns = list(columns) if columns else list(frame.columns)
+    if locations is None or len(locations) > 1:
+        columns = [c for c in ('location', 'date') if c not in columns] + columns
+    pending, pending_rows = [], 0
+    for lo, hi in dataset.row_ranges(locations, start, end):
+        for first in range(lo, hi, chunk_rows):
+            last = min(first + chunk_rows, hi)
+            pending.append(frame.iloc[first:last][columns])
+            pending_rows += last - first
+            if pending_rows >= chunk_rows:
+                yield pd.concat(pending, ignore_index=True)
+                pending, pending_rows = [], 0
+    if pending:
+        yield pd.concat(pending, ignore_index=True)
+
+def iter_csv(chunks):
+    """Encoded CSV, one bytes block per chunk (header on the first)."""
+    header = True
+    for chunk in chunks:
+        yield chunk.to_csv(index=False, header=header).encode('utf-8')
+        header = False
+
+class _ByteSink(io.RawIOBase):
+    """Write-only file object that hands back whatever was written since the last take()."""
+
+    def __init__(self):
+        self._parts = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def take(self):
+        data = b''.join(self._parts)
+        self._parts.clear()
+        return data
+
+def iter_parquet(chunks):
+    """Encoded Parquet, one row group per chunk, yielded as soon as it is written."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sink = _ByteSink()
+    writer = None
+    for chunk in chunks:
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(sink, table.schema)
+        writer.write_table(table)
+        data = sink.take()
+        if data:
+            yield data
+    if writer is not None:
+        writer.close()
+    data = sink.take()
+    if data:
+        yield data
+
+def iter_export(dataset, fmt='csv', **options):
+    """Bytes blocks of a CSV or Parquet export; see iter_chunks() for options."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"unknown export format: {fmt}")
+    chunks = iter_chunks(dataset, **options)
+    return iter_parquet(chunks) if fmt == 'parquet' else iter_csv(chunks)
@@ -0,0 +1,164 @@
+"""
+Forecasting engines for a single station/parameter series.
+
+Every engine takes (df, parameter, days) and returns a frame with ds,
+yhat, yhat_lower and yhat_upper covering the history plus `days` future
+days, like Prophet's predict(). ENGINES names the configurations the
+backtest compares.
+
+The dashboard, API and scheduler fit each series once at MAX_FORECAST_DAYS
+in one of FORECAST_MODES and keep the result as a ForecastArtifact; any
+shorter horizon is a slice of it, so changing the horizon never refits.
+"""
+import logging
+import time
+from functools import partial
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+# Prophet's default interval width; baseline engines use the same
+INTERVAL_WIDTH = 0.8
+
+# Longest horizon offered by the dashboard; artifacts are fitted this far out
+MAX_FORECAST_DAYS = 60
+
+FORECAST_COLUMNS = ['ds', 'yhat', 'yhat_lower', 'yhat_upper']
+
+
+def quiet_prophet_logs():
+    """Keep Prophet's per-fit INFO/WARNING lines out of batch output (importing prophet resets its level)."""
+    import prophet  # noqa: F401
+    from cmdstanpy.utils import get_logger
+
+    logging.getLogger("prophet").setLevel(logging.ERROR)
+    get_logger().setLevel(logging.WARNING)  # installs cmdstanpy's handler first, or it resets the level
+
+def create_forecast(df, parameter, days=30, yearly_seasonality=True, weekly_seasonality=True, **options):
+    """Prophet forecast; options (interval_width, uncertainty_samples, ...) go to Prophet()."""
+    from prophet import Prophet
+
+    tmp = df[['date', parameter]].rename(columns={'date': 'ds', parameter: 'y'})
+    model = Prophet(yearly_seasonality=yearly_seasonality, weekly_seasonality=weekly_seasonality, **options)
+    model.fit(tmp)
+    future = model.make_future_dataframe(periods=days)
+    forecast = model.predict(future)
+    return forecast
+
+def fast_forecast(df, parameter, days=30, interval_width=INTERVAL_WIDTH, **options):
+    """
+    Prophet point forecast without uncertainty sampling. Intervals are
+    analytic: the in-sample residual spread, widened by sqrt(1 + h / n)
+    for a horizon of h days after n days of history.
+    """
+    forecast = create_forecast(df, parameter, days=days, uncertainty_samples=0, **options)
+    history = df[['date', parameter]].rename(columns={'date': 'ds', parameter: 'y'})
+    fitted = forecast[['ds', 'yhat']].merge(history, on='ds', how='left')
+    residual_std = np.nanstd(fitted['y'].to_numpy(dtype=float) - fitted['yhat'].to_numpy())
+    n_history = len(forecast) - days
+    horizon = np.r_[np.zeros(n_history), np.arange(1, days + 1)]
+    spread = NormalDist().inv_cdf(0.5 + interval_width / 2) * residual_std * np.sqrt(1 + horizon / n_history)
+    forecast['yhat_lower'] = forecast['yhat'] - spread
+    forecast['yhat_upper'] = forecast['yhat'] + spread
+    return forecast
+
+def _baseline_frame(history_dates, fitted, future, spread, days):
+    """History (fitted values) plus `days` future rows with +/- spread intervals."""
+    last = history_dates.iloc[-1]
+    ds = pd.concat([history_dates, pd.Series(pd.date_range(last, periods=days + 1, freq='D')[1:])],
+                   ignore_index=True)
+    yhat = np.concatenate([fitted, future])
+    spread = np.concatenate([np.zeros(len(fitted)), spread])
+    return pd.DataFrame({'ds': ds, 'yhat': yhat, 'yhat_lower': yhat - spread, 'yhat_upper': yhat + spread})
+
+def naive_forecast(df, parameter, days=30, interval_width=INTERVAL_WIDTH):
+    """
+    Persistence: the last value carried forward. Intervals widen with
+    sqrt(horizon) from the spread of day-to-day changes (a random walk).
+    """
+    y = df[parameter].to_numpy(dtype=float)
+    step_std = np.nanstd(np.diff(y)) if len(y) > 1 else 0.0
+    z = NormalDist().inv_cdf(0.5 + interval_width / 2)
+    horizon = np.arange(1, days + 1)
+    fitted = np.r_[y[:1], y[:-1]]
+    return _baseline_frame(df['date'].reset_index(drop=True), fitted, np.full(days, y[-1]),
+                           z * step_std * np.sqrt(horizon), days)
+
+def seasonal_naive_forecast(df, parameter, days=30, period=7, interval_width=INTERVAL_WIDTH):
+    """Each future day repeats the same weekday of the last week; intervals from seasonal differences."""
+    y = df[parameter].to_numpy(dtype=float)
+    if len(y) <= period:
+        return naive_forecast(df, parameter, days, interval_width)
+    last_season = y[-period:]
+    future = np.resize(last_season, days)
+    residual_std = np.nanstd(y[period:] - y[:-period])
+    z = NormalDist().inv_cdf(0.5 + interval_width / 2)
+    cycles = np.arange(days) // period + 1
+    fitted = np.r_[y[:period], y[:-period]]
+    return _baseline_frame(df['date'].reset_index(drop=True), fitted, future,
+                           z * residual_std * np.sqrt(cycles), days)
+
+# ------------------------------------------------------------
+# Horizon-independent artifacts
+# ------------------------------------------------------------
+# full: Prophet's 1000-sample simulated intervals; fast: analytic intervals
+FORECAST_MODES = {
+    'full': create_forecast,
+    'fast': fast_forecast,
+}
+
+class ForecastArtifact:
+    """
+    One series fitted once at `days` ahead: FORECAST_COLUMNS (float32)
+    for the history plus the future rows. horizon(days) slices it.
+    """
+    __slots__ = ('frame', 'history_rows', 'days', 'mode', 'fit_seconds')
+
+    def __init__(self, frame, history_rows, days, mode, fit_seconds):
+        self.frame = frame
+        self.history_rows = history_rows
+        self.days = days
+        self.mode = mode
+        self.fit_seconds = fit_seconds
+
+    def horizon(self, days):
+        """History plus the first `days` forecast days (a view, no refit)."""
+        if days > self.days:
+            raise ValueError(f"artifact covers {self.days} days, {days} requested")
+        return self.frame.iloc[:self.history_rows + days]
+
+    @property
+    def nbytes(self):
+        return int(self.frame.memory_usage(index=False, deep=True).sum())
+
+def forecast_artifact(df, parameter, mode='full', days=MAX_FORECAST_DAYS):
+    """Fit parameter's series once in the given mode and keep only the columns needed to serve it."""
+    start = time.perf_counter()
+    forecast = FORECAST_MODES[mode](df, parameter, days=days)
+    fit_seconds = time.perf_counter() - start
+    frame = forecast[FORECAST_COLUMNS].astype({column: 'float32' for column in FORECAST_COLUMNS[1:]})
+    return ForecastArtifact(frame.reset_index(drop=True), len(frame) - days, days, mode, fit_seconds)
+
+# Named configurations compared by the backtest (python -m envirotrack backtest)
+ENGINES = {
+    'prophet': create_forecast,
+    'prophet-fast': fast_forecast,
+    'prophet-no-yearly': partial(create_forecast, yearly_seasonality=False),
+    'prophet-200-samples': partial(create_forecast, uncertainty_samples=200),
+    'prophet-lite': partial(create_forecast, yearly_seasonality=False, uncertainty_samples=200),
+    'naive': naive_forecast,
+    'seasonal-naive': seasonal_naive_forecast,
+}
+
+# Settings each engine accepts when the backtest sweeps them (--param)
+PROPHET_SETTINGS = ('yearly_seasonality', 'weekly_seasonality', 'interval_width', 'uncertainty_samples')
+ENGINE_SETTINGS = {
+    'prophet': PROPHET_SETTINGS,
+    'prophet-fast': ('yearly_seasonality', 'weekly_seasonality', 'interval_width'),  # never samples
+    'prophet-no-yearly': PROPHET_SETTINGS,
+    'prophet-200-samples': PROPHET_SETTINGS,
+    'prophet-lite': PROPHET_SETTINGS,
+    'naive': ('interval_width',),
+    'seasonal-naive': ('interval_width',),
+}
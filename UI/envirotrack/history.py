@@ -0,0 +1,292 @@
+"""
+Alert history: an append-only SQLite log of severity transitions.
+
+The batch alert evaluation (the scheduler's alert table, or
+`python -m envirotrack alerts --history`) is passed to record(). Only
+stations whose severity differs from their last recorded one get an
+event, so a quiet network costs no writes however often it is evaluated.
+The first evaluation of a station records its starting severity.
+
+Tables:
+    alert_events    id, location, observed_at, recorded_at, severity,
+                    previous, icon, messages (JSON), dataset_version;
+                    indexed on (location, observed_at) and observed_at
+    alert_state     latest severity per station (what record() diffs against)
+    notify_cursors  last event id delivered, per Notifier name
+
+observed_at is the time of the reading that was evaluated, recorded_at
+the wall-clock time of the write. Range queries use observed_at.
+compact() drops old events but keeps each station's last one before the
+cutoff, so the severity at any retained time can still be read back.
+The history view and Notifier only read events, never past readings.
+"""
+import json
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import datetime
+
+import pandas as pd
+
+SEVERITY_LEVELS = {'normal': 0, 'medium': 1, 'high': 2}
+EVENT_COLUMNS = ['id', 'location', 'observed_at', 'recorded_at', 'severity', 'previous',
+                 'icon', 'messages', 'dataset_version']
+
+# Events older than this are compacted by the scheduler
+HISTORY_RETENTION_DAYS = 90
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS alert_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    location TEXT NOT NULL,
+    observed_at TEXT NOT NULL,
+    recorded_at TEXT NOT NULL,
+    severity TEXT NOT NULL,
+    previous TEXT,
+    icon TEXT,
+    messages TEXT,
+    dataset_version INTEGER
+);
+CREATE INDEX IF NOT EXISTS alert_events_location_time ON alert_events (location, observed_at);
+CREATE INDEX IF NOT EXISTS alert_events_time ON alert_events (observed_at);
+CREATE TABLE IF NOT EXISTS alert_state (
+    location TEXT PRIMARY KEY,
+    severity TEXT NOT NULL,
+    since TEXT NOT NULL,
+    event_id INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS notify_cursors (
+    name TEXT PRIMARY KEY,
+    last_id INTEGER NOT NULL
+);
+"""
+
+
+def _ts(value):
+    """Sortable text timestamp ('YYYY-MM-DD HH:MM:SS') for observed_at / recorded_at."""
+    return pd.Timestamp(value).strftime('%Y-%m-%d %H:%M:%S')
+
+def _frame(rows):
+    frame = pd.DataFrame.from_records(rows, columns=EVENT_COLUMNS)
+    frame['messages'] = [json.loads(m) if m else [] for m in frame['messages']]
+    frame['previous'] = frame['previous'].astype(object).where(frame['previous'].notna(), None)
+    for column in ('observed_at', 'recorded_at'):
+        frame[column] = pd.to_datetime(frame[column])
+    return frame
+
+
+class AlertHistory:
+    """
+    Severity transition log in one SQLite file (created on first use).
+
+    Safe to share between threads: every call opens its own connection,
+    writes are serialized, and WAL mode lets readers run during a write.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    # --------------------------------------------------------
+    # Write side
+    # --------------------------------------------------------
+    def record(self, table, version=None):
+        """
+        Append an event for every row of table (columns location, date,
+        severity and optionally icon, messages) whose severity differs
+        from the station's last recorded one. Returns the number written.
+        """
+        recorded_at = _ts(datetime.now())
+        with self._lock, closing(self._connect()) as conn, conn:
+            state = dict(conn.execute("SELECT location, severity FROM alert_state"))
+            written = 0
+            for row in table.to_dict('records'):
+                previous = state.get(row['location'])
+                if previous == row['severity']:
+                    continue
+                observed_at = _ts(row['date'])
+                cursor = conn.execute(
+                    "INSERT INTO alert_events (location, observed_at, recorded_at, severity, previous,"
+                    " icon, messages, dataset_version) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (row['location'], observed_at, recorded_at, row['severity'], previous, row.get('icon'),
+                     json.dumps(list(row.get('messages') or []), ensure_ascii=False),
+                     version),
+                )
+                conn.execute(
+                    "INSERT INTO alert_state (location, severity, since, event_id) VALUES (?, ?, ?, ?)"
+                    " ON CONFLICT(location) DO UPDATE SET severity = excluded.severity,"
+                    " since = excluded.since, event_id = excluded.event_id",
+                    (row['location'], row['severity'], observed_at, cursor.lastrowid),
+                )
+                state[row['location']] = row['severity']
+                written += 1
+        return written
+
+    def compact(self, before, vacuum=False):
+        """
+        Delete events observed before `before`, except each station's last
+        one before it (its severity at the cutoff). Returns the number deleted.
+        """
+        cutoff = _ts(before)
+        with self._lock, closing(self._connect()) as conn:
+            with conn:
+                deleted = conn.execute(
+                    "DELETE FROM alert_events WHERE observed_at < ? AND id NOT IN ("
+                    " SELECT MAX(id) FROM alert_events WHERE observed_at < ? GROUP BY location)",
+                    (cutoff, cutoff),
+                ).rowcount
+            if vacuum and deleted:
+                conn.execute("VACUUM")
+        return deleted
+
+    # --------------------------------------------------------
+    # Read side
+    # --------------------------------------------------------
+    def events(self, location=None, start=None, end=None, severities=None, after_id=None, limit=None):
+        """
+        Events as a DataFrame (EVENT_COLUMNS, messages as lists), oldest
+        first. location may be one name or a list; start / end bound
+        observed_at (inclusive); after_id skips events up to that id.
+        """
+        clauses, params = [], []
+        if location is not None:
+            names = [location] if isinstance(location, str) else list(location)
+            clauses.append(f"location IN ({', '.join('?' * len(names))})")
+            params.extend(names)
+        if start is not None:
+            clauses.append("observed_at >= ?")
+            params.append(_ts(start))
+        if end is not None:
+            clauses.append("observed_at <= ?")
+            params.append(_ts(end))
+        if severities is not None:
+            clauses.append(f"severity IN ({', '.join('?' * len(severities))})")
+            params.extend(severities)
+        if after_id is not None:
+            clauses.append("id > ?")
+            params.append(int(after_id))
+        sql = f"SELECT {', '.join(EVENT_COLUMNS)} FROM alert_events"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY observed_at, id"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        with closing(self._connect()) as conn:
+            return _frame(conn.execute(sql, params).fetchall())
+
+    def severity_at(self, location, when):
+        """Severity of location at `when` (from its last event at or before it), or None."""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT severity FROM alert_events WHERE location = ? AND observed_at <= ?"
+                " ORDER BY observed_at DESC, id DESC LIMIT 1",
+                (location, _ts(when)),
+            ).fetchone()
+        return row[0] if row else None
+
+    def current(self):
+        """Latest recorded severity per station: DataFrame of location, severity, since."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT location, severity, since FROM alert_state ORDER BY location").fetchall()
+        frame = pd.DataFrame(rows, columns=['location', 'severity', 'since'])
+        frame['since'] = pd.to_datetime(frame['since'])
+        return frame
+
+    def stats(self):
+        with closing(self._connect()) as conn:
+            count, first, last, last_id = conn.execute(
+                "SELECT COUNT(*), MIN(observed_at), MAX(observed_at), MAX(id) FROM alert_events"
+            ).fetchone()
+            stations = conn.execute("SELECT COUNT(*) FROM alert_state").fetchone()[0]
+        return {'events': count, 'stations': stations, 'first': first, 'last': last, 'last_id': last_id}
+
+    # --------------------------------------------------------
+    # Notification cursors
+    # --------------------------------------------------------
+    def cursor(self, name):
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT last_id FROM notify_cursors WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def set_cursor(self, name, last_id):
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT INTO notify_cursors (name, last_id) VALUES (?, ?)"
+                " ON CONFLICT(name) DO UPDATE SET last_id = excluded.last_id",
+                (name, int(last_id)),
+            )
+
+
+# ============================================================
+# Notifications
+# ============================================================
+class Notifier:
+    """
+    Delivers new transitions from an AlertHistory to send(events) (a
+    DataFrame), at least once: the named cursor only advances after send
+    returns. A new cursor starts at the latest event, so history recorded
+    before the notifier existed is not replayed (unless from_start).
+
+    severities: deliver transitions into these levels. With recoveries,
+    transitions from an alert level back to 'normal' are delivered too.
+    """
+
+    def __init__(self, history, send, name='default', severities=('medium', 'high'), recoveries=False,
+                 from_start=False):
+        self.history = history
+        self.send = send
+        self.name = name
+        self.severities = set(severities)
+        self.recoveries = recoveries
+        if history.cursor(name) is None:
+            history.set_cursor(name, 0 if from_start else history.stats()['last_id'] or 0)
+
+    def wanted(self, events):
+        keep = events['severity'].isin(self.severities)
+        if self.recoveries:
+            keep |= (events['severity'] == 'normal') & events['previous'].isin(['medium', 'high'])
+        return events[keep]
+
+    def poll(self):
+        """Send any events past the cursor; returns the events sent."""
+        last_id = self.history.cursor(self.name)
+        events = self.history.events(after_id=last_id).sort_values('id')
+        if events.empty:
+            return events
+        selected = self.wanted(events)
+        if not selected.empty:
+            self.send(selected)
+        self.history.set_cursor(self.name, events['id'].max())
+        return selected
+
+
+def describe(event):
+    """One-line text for an event (a row of events())."""
+    change = f"{event['previous']} -> {event['severity']}" if event['previous'] else event['severity']
+    detail = f": {event['messages'][0]}" if event['messages'] else ""
+    return f"{event['observed_at']:%Y-%m-%d %H:%M} {event['icon'] or ''} {event['location']} {change}{detail}"
+
+def print_sink(events):
+    for event in events.to_dict('records'):
+        print(describe(event), flush=True)
+
+def webhook_sink(url, timeout=10):
+    """send() that POSTs {"events": [...]} as JSON to url, raising on failure."""
+    import requests
+
+    def send(events):
+        payload = [{
+            **event,
+            'observed_at': event['observed_at'].isoformat(),
+            'recorded_at': event['recorded_at'].isoformat(),
+            'text': describe(event),
+        } for event in events.to_dict('records')]
+        response = requests.post(url, json={'events': payload}, timeout=timeout)
+        response.raise_for_status()
+    return send
@@ -0,0 +1,106 @@
+"""
+Inverse-distance-weighted surfaces over a lat/lon grid, rendered to RGBA.
+
+Distances are chord lengths between unit vectors, computed in float32
+blocks of grid cells so the (cells x stations) distance matrix never
+exceeds ``max_block_bytes`` regardless of station or grid size.
+"""
+import numpy as np
+
+from .stations import EARTH_RADIUS_KM, km_to_chord, to_unit_vectors
+
+# lat_min, lon_min, lat_max, lon_max
+INDIA_BOUNDS = (6.0, 68.0, 37.5, 98.0)
+DEFAULT_RESOLUTION = 0.1  # degrees, ~95k cells over INDIA_BOUNDS
+
+# Colour stops per metric: (value, (r, g, b))
+COLOR_SCALES = {
+    'temperature': [
+        (0, (59, 130, 246)), (15, (16, 185, 129)), (30, (251, 191, 36)),
+        (38, (249, 115, 22)), (45, (239, 68, 68)),
+    ],
+    'air_quality': [
+        (0, (16, 185, 129)), (50, (16, 185, 129)), (100, (251, 191, 36)),
+        (200, (249, 115, 22)), (300, (239, 68, 68)), (400, (153, 27, 27)),
+    ],
+    'rainfall': [
+        (0, (224, 242, 254)), (5, (125, 211, 252)), (30, (59, 130, 246)),
+        (80, (30, 64, 175)), (150, (76, 29, 149)),
+    ],
+}
+
+
+def make_grid(bounds=INDIA_BOUNDS, resolution=DEFAULT_RESOLUTION):
+    """Cell-centre latitudes (north to south) and longitudes (west to east)."""
+    lat_min, lon_min, lat_max, lon_max = bounds
+    lats = np.arange(lat_max - resolution / 2, lat_min, -resolution)
+    lons = np.arange(lon_min + resolution / 2, lon_max, resolution)
+    return lats, lons
+
+def idw_grid(station_lat, station_lon, values, lats, lons, power=2.0,
+             max_distance_km=None, max_block_bytes=64 * 2**20):
+    """
+    IDW estimate for every (lat, lon) cell of the grid.
+
+    Returns (surface, nearest_km), both shaped (len(lats), len(lons)). Cells
+    farther than max_distance_km from every station are NaN.
+    """
+    values = np.asarray(values, dtype=float)
+    ok = np.isfinite(values)
+    stations = to_unit_vectors(np.asarray(station_lat)[ok], np.asarray(station_lon)[ok])
+    stations = stations.astype(np.float32)
+    values = values[ok].astype(np.float32)
+
+    grid_lat, grid_lon = np.meshgrid(lats, lons, indexing='ij')
+    cells = to_unit_vectors(grid_lat.ravel(), grid_lon.ravel()).astype(np.float32)
+    surface = np.full(len(cells), np.nan)
+    nearest = np.full(len(cells), np.inf)
+    if not len(values):
+        return surface.reshape(grid_lat.shape), nearest.reshape(grid_lat.shape)
+
+    # the float32 (block x stations) matrix is reused in place for d2 and
+    # weights; budget for it twice to cover ufunc/matmul temporaries
+    block = max(1, int(max_block_bytes // (2 * 4 * len(values))))
+    eps = np.float32(km_to_chord(1.0) ** 2)  # float32 resolves ~1 km chords
+    half_power = power / 2
+    for start in range(0, len(cells), block):
+        part = cells[start:start + block]
+        # |a - b|^2 = 2 - 2 a.b for unit vectors
+        d2 = part @ stations.T
+        np.multiply(d2, -2, out=d2)
+        np.add(d2, 2, out=d2)
+        np.maximum(d2, eps, out=d2)
+
+        nearest[start:start + block] = d2.min(axis=1)
+        if half_power == 1:  # default power=2: a reciprocal is much cheaper than pow
+            weights = np.reciprocal(d2, out=d2)
+        else:
+            weights = np.power(d2, -half_power, out=d2)
+        surface[start:start + block] = (weights @ values) / weights.sum(axis=1)
+
+    nearest_km = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(nearest) / 2)
+    if max_distance_km is not None:
+        surface[nearest_km > max_distance_km] = np.nan
+    return surface.reshape(grid_lat.shape), nearest_km.reshape(grid_lat.shape)
+
+def colorize(surface, metric, alpha=180):
+    """Map a surface to an RGBA uint8 image using the metric's colour scale; NaN is transparent."""
+    stops = COLOR_SCALES[metric]
+    xs = np.array([v for v, _ in stops], dtype=float)
+    rgba = np.zeros(surface.shape + (4,), dtype=np.uint8)
+    valid = np.isfinite(surface)
+    for channel in range(3):
+        ys = np.array([c[channel] for _, c in stops], dtype=float)
+        rgba[..., channel] = np.interp(np.where(valid, surface, 0), xs, ys).astype(np.uint8)
+    rgba[..., 3] = np.where(valid, alpha, 0)
+    return rgba
+
+def heatmap_image(station_lat, station_lon, values, metric, bounds=INDIA_BOUNDS,
+                  resolution=DEFAULT_RESOLUTION, power=2.0, max_distance_km=400):
+    """RGBA image (north-up) of the IDW surface plus its (min, max) value range."""
+    lats, lons = make_grid(bounds, resolution)
+    surface, _ = idw_grid(station_lat, station_lon, values, lats, lons,
+                          power=power, max_distance_km=max_distance_km)
+    finite = surface[np.isfinite(surface)]
+    value_range = (float(finite.min()), float(finite.max())) if finite.size else (np.nan, np.nan)
+    return colorize(surface, metric), value_range
@@ -0,0 +1,64 @@
+"""
+Folium map building shared by the dashboard and the static pre-render.
+"""
+import folium
+import numpy as np
+
+from .alerts import get_marker_color
+
+MAP_CENTER = (20.5937, 78.9629)
+MAP_ZOOM = 4
+
+# Map style -> (tiles, attribution)
+MAP_TILES = {
+    "Satellite": ("https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}",
+                  "Esri World Imagery"),
+    "Street View": ("OpenStreetMap", None),
+}
+
+
+def base_map(map_type="Satellite"):
+    """India-centred folium.Map in the given MAP_TILES style."""
+    tiles, attr = MAP_TILES[map_type]
+    return folium.Map(location=list(MAP_CENTER), zoom_start=MAP_ZOOM, tiles=tiles, attr=attr)
+
+def add_station_markers(target, rows, highlighted, colour_by="severity"):
+    """One CircleMarker per station row of dataset.latest, coloured by severity or anomaly_level."""
+    for row in rows.itertuples(index=False):
+        marker_color = get_marker_color(getattr(row, colour_by))
+
+        popup_text = (
+            f"<b>{row.location}</b><br>"
+            f"Status: <b style='color:{get_marker_color(row.severity)}'>{row.severity.upper()}</b><br>"
+            f"Anomaly: <b style='color:{get_marker_color(row.anomaly_level)}'>{row.anomaly:.1f}</b><br>"
+            f"Temp: {row.temperature}°C<br>"
+            f"AQI: {row.air_quality}<br>"
+            f"Rainfall: {row.rainfall} mm"
+        )
+
+        folium.CircleMarker(
+            location=[row.lat, row.lon],
+            radius=8,
+            popup=popup_text,
+            tooltip=row.location,
+            color="#3b82f6" if row.location in highlighted else marker_color,
+            fill=True,
+            fillColor=marker_color,
+            fillOpacity=0.7,
+            weight=4 if row.location in highlighted else 2
+        ).add_to(target)
+
+def add_cluster_markers(target, clusters):
+    """One sized marker per pre-aggregated cluster, coloured by its worst severity."""
+    for lat, lon, count, severity in zip(clusters['lat'], clusters['lon'], clusters['count'], clusters['severity']):
+        marker_color = get_marker_color(severity)
+        folium.CircleMarker(
+            location=[lat, lon],
+            radius=8 + 3 * float(np.log2(count)),
+            tooltip=f"{count} stations (worst: {severity})",
+            color=marker_color,
+            fill=True,
+            fillColor=marker_color,
+            fillOpacity=0.5,
+            weight=2
+        ).add_to(target)
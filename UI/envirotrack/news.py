@@ -0,0 +1,59 @@
+"""
+Weather news from Google News RSS.
+"""
+import os
+import xml.etree.ElementTree as ET
+
+import pandas as pd
+import requests
+
+
+def fetch_weather_news(city_keyword: str):
+    """
+    Fetch latest weather-related news using Google News RSS.
+
+    If ENVIROTRACK_NEWS_FEED points to a local RSS file it is read instead
+    of the network (offline runs and load tests).
+    """
+    query = f"{city_keyword} weather OR rainfall OR storm OR cyclone OR heatwave"
+    url = f"https://news.google.com/rss/search?q={query.replace(' ', '+')}"
+    local_feed = os.environ.get("ENVIROTRACK_NEWS_FEED")
+
+    try:
+        if local_feed:
+            with open(local_feed, "rb") as fh:
+                content = fh.read()
+        else:
+            response = requests.get(url, timeout=10)
+            if response.status_code != 200:
+                return {"articles": [], "error": f"RSS error: {response.status_code}"}
+            content = response.content
+
+        root = ET.fromstring(content)
+
+        articles = []
+        for item in root.findall(".//item"):
+            title_text = item.find("title").text if item.find("title") is not None else ""
+            desc_text = item.find("description").text if item.find("description") is not None else ""
+            url_text = item.find("link").text if item.find("link") is not None else ""
+            pub_date = item.find("pubDate").text if item.find("pubDate") is not None else ""
+
+            articles.append({
+                "title": title_text,
+                "description": desc_text,
+                "url": url_text,
+                "published_at": pub_date,
+                "source": "Google News",
+                "pub_timestamp": pd.to_datetime(pub_date, errors='coerce')
+            })
+
+        # Sort by publication date (most recent first)
+        articles_df = pd.DataFrame(articles)
+        if not articles_df.empty and 'pub_timestamp' in articles_df.columns:
+            articles_df = articles_df.sort_values('pub_timestamp', ascending=False)
+            articles = articles_df.to_dict('records')
+
+        return {"articles": articles[:15], "error": None}  # Return top 15 most recent
+
+    except Exception as e:
+        return {"articles": [], "error": f"Exception: {e}"}
@@ -0,0 +1,301 @@
+"""
+Static pre-render of the public views, for serving peak traffic from a
+plain file server or CDN instead of Streamlit sessions.
+
+    python -m envirotrack prerender --output static/
+
+Output layout:
+    index.html                       national map plus the station list
+    map.html                         Folium map, markers coloured by severity
+    stations.json                    [{name, slug, severity, icon, lat, lon}]
+    stations/<slug>/alert.html       alert card (standalone, embeddable)
+    stations/<slug>/index.html       alert card plus trend charts
+    stations/<slug>/<metric>.json    Plotly figure JSON per metric
+    template.json                    the charts' shared Plotly theme
+    manifest.json                    input hash per station and for the map
+
+Rebuilds are incremental. A station's inputs (its readings, its nearby
+stations' severities and its anomaly scores) are hashed. Only stations
+whose hash differs from manifest.json, or whose files are missing, are
+rendered again, in parallel worker processes. Every file is written under
+a temporary name and renamed into place, and the manifest is written
+last, so the file server never sees a half-written file.
+"""
+import hashlib
+import html
+import json
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from .alerts import get_alert_status
+from .batch import PARAMETERS
+from .data import NEARBY_RADIUS_KM
+from .downsample import minmax_indices
+
+# Bump when a template or chart changes, so every station is re-rendered
+RENDER_VERSION = 1
+MAX_CHART_POINTS = 1000
+PLOTLY_JS = "https://cdn.plot.ly/plotly-2.35.2.min.js"
+MAP_COLUMNS = ['location', 'lat', 'lon', 'severity', 'anomaly_level', 'anomaly',
+               'temperature', 'air_quality', 'rainfall']
+
+CHART_TITLES = {
+    'temperature': 'Temperature (°C)',
+    'air_quality': 'Air Quality (AQI)',
+    'rainfall': 'Rainfall (mm)',
+}
+
+PAGE_STYLE = """
+body { font-family: system-ui, sans-serif; background: #0b1120; color: #e2e8f0; margin: 1.5rem; }
+a { color: #93c5fd; }
+.alert-bar { border-radius: 0.75rem; padding: 0.9rem 1.1rem; margin: 0.6rem 0 0.8rem; font-weight: 500;
+             display: flex; align-items: center; gap: 0.6rem; }
+.alert-icon { font-size: 1.6rem; }
+.chart { height: 380px; margin-bottom: 1rem; }
+table { border-collapse: collapse; } td, th { padding: 0.25rem 0.8rem; text-align: left; }
+"""
+
+
+# ------------------------------------------------------------
+# Helpers
+# ------------------------------------------------------------
+def slugify(name):
+    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-') or 'station'
+
+def _hash(*parts):
+    digest = hashlib.sha1(str(RENDER_VERSION).encode())
+    for part in parts:
+        if isinstance(part, pd.DataFrame):
+            digest.update(pd.util.hash_pandas_object(part, index=False).to_numpy().tobytes())
+        else:
+            digest.update(json.dumps(part, sort_keys=True, default=str).encode())
+    return digest.hexdigest()[:16]
+
+def _write(path, text):
+    """Write via a temporary file and rename, so readers never see a partial file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as fh:
+        fh.write(text)
+    os.replace(tmp, path)
+
+def _page(title, body, head=""):
+    return (f"<!DOCTYPE html>\n<html lang=\"en\"><head><meta charset=\"utf-8\">"
+            f"<meta name=\"viewport\" content=\"width=device-width, initial-scale=1\">"
+            f"<title>{html.escape(title)}</title><style>{PAGE_STYLE}</style>{head}</head>\n"
+            f"<body>\n{body}\n</body></html>\n")
+
+def read_manifest(output):
+    try:
+        with open(os.path.join(output, 'manifest.json'), encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+# ------------------------------------------------------------
+# One station (runs inside worker processes)
+# ------------------------------------------------------------
+def alert_card(location, icon, messages, bg, border):
+    return (
+        f'<div class="alert-bar" style="background:{bg}; border:1px solid {border};">'
+        f'<div class="alert-icon">{icon}</div><div class="alert-text">'
+        f'<b>Alert Status for {html.escape(location)} (Past 7 Days Analysis)</b><br>'
+        f'{"<br>".join(messages)}</div></div>'
+    )
+
+def trend_figure(location, frame, metric):
+    """
+    The dashboard's trend line for one metric, min/max-decimated to
+    MAX_CHART_POINTS. The theme is left out (template.json is applied by
+    the page): embedding plotly_dark in every figure triples its size and
+    makes serialising it about 5x slower.
+    """
+    import plotly.graph_objects as go
+
+    keep = minmax_indices(frame[metric].to_numpy(dtype=float), MAX_CHART_POINTS)[0]
+    rows = frame.iloc[keep]
+    return go.Figure(
+        go.Scatter(x=rows['date'], y=rows[metric], mode='lines', line=dict(width=3), name=CHART_TITLES[metric]),
+        layout=dict(
+            title=f"{metric.replace('_', ' ').title()} Trend ({location})",
+            xaxis_title='Date',
+            yaxis_title=CHART_TITLES[metric],
+            margin=dict(l=10, r=10, t=40, b=10),
+            hovermode='x unified',
+            template='none',
+        ),
+    )
+
+def render_station(location, slug, frame, nearby, anomalies, output):
+    """Write one station's card, page and chart JSON; returns its stations.json entry."""
+    week = frame[frame['date'] >= frame['date'].max() - timedelta(days=7)]
+    icon, messages, bg, border, severity = get_alert_status(
+        frame.iloc[-1], week, nearby=nearby, anomalies=anomalies
+    )
+    card = alert_card(location, icon, messages, bg, border)
+    folder = os.path.join(output, 'stations', slug)
+
+    charts = []
+    for metric in PARAMETERS:
+        _write(os.path.join(folder, f'{metric}.json'), trend_figure(location, frame, metric).to_json())
+        charts.append(f'<div class="chart" id="{metric}"></div>')
+    loader = (
+        f'<script src="{PLOTLY_JS}"></script><script>'
+        f'fetch("../../template.json").then(r => r.json()).then(t => {json.dumps(PARAMETERS)}.forEach('
+        f'm => fetch(m + ".json").then(r => r.json()).then(f => '
+        f'Plotly.newPlot(m, f.data, {{...f.layout, template: t}}, {{responsive: true}}))));</script>'
+    )
+    _write(os.path.join(folder, 'alert.html'), _page(location, card))
+    _write(os.path.join(folder, 'index.html'), _page(
+        location,
+        f'<p><a href="../../index.html">&larr; All stations</a></p>\n'
+        f'<h1>{html.escape(location)}</h1>\n{card}\n' + "\n".join(charts) + "\n" + loader,
+    ))
+    return {'name': location, 'slug': slug, 'severity': severity, 'icon': icon}
+
+def _render_task(args):
+    location = args[0]
+    try:
+        return location, render_station(*args), None
+    except Exception as e:
+        return location, None, f"{type(e).__name__}: {e}"
+
+
+# ------------------------------------------------------------
+# Network-wide pages
+# ------------------------------------------------------------
+def render_map(latest, output):
+    """National map with both tile styles and every station, written to map.html."""
+    import folium
+
+    from .maps import add_station_markers, base_map
+
+    m = base_map("Satellite")
+    folium.TileLayer("OpenStreetMap", name="Street View").add_to(m)
+    markers = folium.FeatureGroup(name="Stations")
+    add_station_markers(markers, latest, highlighted=set())
+    markers.add_to(m)
+    folium.LayerControl().add_to(m)
+    os.makedirs(output, exist_ok=True)
+    tmp = os.path.join(output, 'map.html.tmp')
+    m.save(tmp)
+    os.replace(tmp, os.path.join(output, 'map.html'))
+
+def render_index(entries, output):
+    rows = "\n".join(
+        f'<tr><td>{entry["icon"]}</td><td><a href="stations/{entry["slug"]}/index.html">'
+        f'{html.escape(entry["name"])}</a></td><td>{entry["severity"]}</td></tr>'
+        for entry in sorted(entries, key=lambda e: ({'high': 0, 'medium': 1}.get(e['severity'], 2), e['name']))
+    )
+    _write(os.path.join(output, 'index.html'), _page(
+        "EnviroTrack India",
+        '<h1>EnviroTrack India</h1>\n'
+        '<iframe src="map.html" title="Station map" style="width:100%; height:480px; border:0;"></iframe>\n'
+        f'<table><tr><th></th><th>Station</th><th>Severity</th></tr>\n{rows}\n</table>',
+    ))
+
+
+# ------------------------------------------------------------
+# Driver
+# ------------------------------------------------------------
+def prerender(dataset, output, workers=None, force=False, nearby_radius_km=NEARBY_RADIUS_KM):
+    """
+    Bring the static site in output up to date with dataset (a data.Dataset).
+
+    Returns a report dict: rendered / skipped / removed station counts,
+    failures ({location: error}), whether the map was rebuilt, and seconds.
+    """
+    start = time.perf_counter()
+    previous = {} if force else read_manifest(output)
+    previous_stations = previous.get('stations', {})
+    latest = dataset.latest
+
+    # Stable, unique slugs: a station keeps the slug it was first given
+    slugs, taken = {}, {entry['slug'] for entry in previous_stations.values()}
+    for location in dataset.locations:
+        slug = previous_stations.get(location, {}).get('slug')
+        if slug is None:
+            base = slug = slugify(location)
+            n = 2
+            while slug in taken:
+                slug, n = f"{base}-{n}", n + 1
+            taken.add(slug)
+        slugs[location] = slug
+
+    stations, tasks = {}, []
+    for location in dataset.locations:
+        frame = dataset.location_slice(location)
+        nearby = dataset.nearby(location, nearby_radius_km)
+        anomalies = {metric: None if np.isnan(score) else round(score, 6)
+                     for metric, score in dataset.anomaly(location).items()}
+        digest = _hash(frame[['date', *PARAMETERS]], nearby, anomalies)
+        old = previous_stations.get(location)
+        page = os.path.join(output, 'stations', slugs[location], 'index.html')
+        if old is not None and old.get('hash') == digest and os.path.exists(page):
+            stations[location] = old
+        else:
+            tasks.append((location, slugs[location], frame, nearby, anomalies, output))
+            stations[location] = {'hash': digest}
+
+    if tasks:
+        import plotly.io as pio
+        from plotly.utils import PlotlyJSONEncoder
+
+        template = pio.templates['plotly_dark'].to_plotly_json()
+        _write(os.path.join(output, 'template.json'), json.dumps(template, cls=PlotlyJSONEncoder))
+
+    failures = {}
+    workers = min(workers or os.cpu_count() or 1, max(len(tasks), 1))
+    if workers == 1:
+        results = list(map(_render_task, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_render_task, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+    for location, entry, error in results:
+        if error:
+            failures[location] = error
+            stations.pop(location)  # retried on the next run
+        else:
+            stations[location].update(entry)
+
+    removed = [location for location in previous_stations if location not in slugs]
+    for location in removed:
+        shutil.rmtree(os.path.join(output, 'stations', previous_stations[location]['slug']), ignore_errors=True)
+
+    map_hash = _hash(latest[MAP_COLUMNS])
+    map_rendered = map_hash != previous.get('map') or not os.path.exists(os.path.join(output, 'map.html'))
+    if map_rendered:
+        render_map(latest, output)
+
+    entries = []
+    positions = dict(zip(latest['location'], zip(latest['lat'], latest['lon'])))
+    for location, entry in stations.items():
+        lat, lon = positions[location]
+        entries.append({'name': location, 'slug': entry['slug'], 'severity': entry['severity'],
+                        'icon': entry['icon'], 'lat': float(lat), 'lon': float(lon)})
+    if tasks or removed or map_rendered:
+        _write(os.path.join(output, 'stations.json'), json.dumps(entries, ensure_ascii=False))
+        render_index(entries, output)
+    _write(os.path.join(output, 'manifest.json'), json.dumps({
+        'render_version': RENDER_VERSION,
+        'dataset_version': dataset.version,
+        'map': map_hash,
+        'stations': stations,
+    }, ensure_ascii=False, indent=1, default=str))
+
+    return {
+        'rendered': len(tasks) - len(failures),
+        'skipped': len(stations) - (len(tasks) - len(failures)),
+        'removed': len(removed),
+        'failures': failures,
+        'map_rendered': map_rendered,
+        'seconds': time.perf_counter() - start,
+    }
@@ -0,0 +1,107 @@
+"""
+Daily state- and region-level aggregates of the station readings.
+
+Aggregates are kept as additive totals per (day, state): sums and counts
+rather than means, so new readings can be folded in without touching the
+rows already aggregated, and region figures are derived from the (small)
+state table instead of the raw readings.
+"""
+import numpy as np
+import pandas as pd
+
+from .alerts import assess_severity_array
+
+SEVERITIES = ('normal', 'warning', 'severe')
+
+# Columns of the per-level tables and their labels
+ROLLUP_METRICS = {
+    'temp_mean': 'Mean temperature (°C)',
+    'temp_max': 'Max temperature (°C)',
+    'aqi_mean': 'Mean AQI',
+    'rainfall_total': 'Total rainfall (mm)',
+}
+
+_SUMS = ['temp_sum', 'temp_count', 'aqi_sum', 'aqi_count', 'rainfall_total', 'readings', *SEVERITIES]
+
+
+def daily_totals(frame, day):
+    """Additive totals per (day, state) for readings with state/region columns."""
+    temperature = frame['temperature'].to_numpy(dtype=float)
+    air_quality = frame['air_quality'].to_numpy(dtype=float)
+    rainfall = frame['rainfall'].to_numpy(dtype=float)
+    severity = assess_severity_array(temperature, rainfall, air_quality)
+
+    parts = pd.DataFrame({
+        'day': day,
+        'state': frame['state'].to_numpy(),
+        'region': frame['region'].to_numpy(),
+        'temp_sum': np.nan_to_num(temperature),
+        'temp_count': np.isfinite(temperature).astype(np.int64),
+        'temp_max': temperature,
+        'aqi_sum': np.nan_to_num(air_quality),
+        'aqi_count': np.isfinite(air_quality).astype(np.int64),
+        'rainfall_total': np.nan_to_num(rainfall),
+        'readings': np.ones(len(frame), dtype=np.int64),
+        **{name: (severity == name).astype(np.int64) for name in SEVERITIES},
+    })
+    return _combine(parts)
+
+def _combine(parts):
+    grouped = parts.groupby(['day', 'state', 'region'], sort=True)
+    totals = grouped[_SUMS].sum()
+    totals['temp_max'] = grouped['temp_max'].max()
+    return totals
+
+def _finish(totals):
+    """Means and labels from additive totals (indexed by day + one name level)."""
+    out = pd.DataFrame(index=totals.index)
+    out['temp_mean'] = totals['temp_sum'] / totals['temp_count'].replace(0, np.nan)
+    out['temp_max'] = totals['temp_max']
+    out['aqi_mean'] = totals['aqi_sum'] / totals['aqi_count'].replace(0, np.nan)
+    out['rainfall_total'] = totals['rainfall_total']
+    out['readings'] = totals['readings']
+    for name in SEVERITIES:
+        out[name] = totals[name]
+    return out.reset_index()
+
+
+class RegionalRollups:
+    """
+    Read-only daily aggregates per state and per region.
+
+    ``states`` has one row per (day, state) and ``regions`` one row per
+    (day, region), each with the ROLLUP_METRICS columns plus the number of
+    readings (``readings``) and readings per severity. These are reading
+    counts, not distinct stations, so they stay additive across updated().
+    """
+
+    def __init__(self, totals):
+        self._totals = totals
+        self.states = _finish(totals.droplevel('region'))
+        self.states['region'] = totals.index.get_level_values('region')
+
+        by_region = totals.groupby(level=['day', 'region'], sort=True)
+        region_totals = by_region[_SUMS].sum()
+        region_totals['temp_max'] = by_region['temp_max'].max()
+        self.regions = _finish(region_totals)
+        self.days = tuple(pd.DatetimeIndex(self.states['day'].unique()))
+
+    @classmethod
+    def from_frame(cls, frame, day):
+        return cls(daily_totals(frame, day))
+
+    def updated(self, new_rows, day):
+        """New rollups with new_rows folded in; existing totals are not recomputed from raw rows."""
+        parts = pd.concat([self._totals, daily_totals(new_rows, day)]).reset_index()
+        return RegionalRollups(_combine(parts))
+
+    def on(self, day, level='state'):
+        """All states (or regions) on one calendar day."""
+        table = self.states if level == 'state' else self.regions
+        return table[table['day'] == pd.Timestamp(day).normalize()].reset_index(drop=True)
+
+    def series(self, names, metric, level='state'):
+        """Wide day x name table of one metric for comparison charts."""
+        table = self.states if level == 'state' else self.regions
+        table = table[table[level].isin(list(names))]
+        return table.pivot(index='day', columns=level, values=metric)
@@ -0,0 +1,442 @@
+"""
+Background refresh of news feeds, the alert table and forecasts.
+
+Work is registered as jobs (news per city, a forecast per station /
+parameter / interval mode, one alert table). A dispatcher thread hands due jobs
+to a small worker pool, and results are published to a ResultCache.
+Dashboard reruns only ever read from that cache: a missing entry is
+requested and shown as pending, so no page waits on the network or a
+model fit. The API reads news from it and reuses fitted forecasts.
+Forecasts are ForecastArtifacts fitted at MAX_FORECAST_DAYS, so every
+horizon up to that is served from the same job.
+
+Scheduling rules:
+- Due jobs for stations viewed in the last recent_seconds run first.
+- Intervals are jittered by +/- jitter so refreshes do not line up.
+- A failing job backs off exponentially (backoff_base * 2**n, capped at
+  backoff_max) and keeps serving its last good result.
+- Forecast and alert jobs rerun as soon as a new dataset version is
+  published.
+- News and forecast jobs nobody has viewed for expire_seconds are dropped
+  along with their results.
+
+With prerender_dir set, the static site (prerender.py) is also rebuilt
+incrementally after each new dataset version. With an AlertHistory, every
+alert table is recorded to it (severity transitions only) and events older
+than history_retention_days are compacted daily. With a source, readings
+for days after the current dataset's last one are reloaded hourly and
+appended (DatasetHolder.append updates the rollups and anomaly scores
+incrementally).
+"""
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import pandas as pd
+
+from .alerts import get_alert_status
+from .cache import MB, BoundedCache, approx_size
+from .data import NEARBY_RADIUS_KM
+from .forecast import MAX_FORECAST_DAYS, forecast_artifact
+from .history import HISTORY_RETENTION_DAYS, AlertHistory
+from .news import fetch_weather_news
+from .prerender import prerender
+
+# Seconds between refreshes per job kind
+REFRESH_INTERVALS = {
+    'news': 1800,
+    'alerts': 300,
+    'forecast': 6 * 3600,
+    'prerender': 3600,
+    'compact': 24 * 3600,
+    'data': 3600,
+}
+
+# Budget for published results (news, forecasts, alert table, ...)
+RESULT_CACHE_MB = 256
+
+# Longest the dispatcher sleeps, so a newly published dataset version is
+# noticed promptly even when no job is due for hours
+VERSION_POLL_SECONDS = 5.0
+
+
+class ResultCache(BoundedCache):
+    """
+    {key: (value, published_at, version)} written by workers, read by pages,
+    with a byte budget (least recently read results are evicted first).
+    """
+
+    def __init__(self, max_bytes=None, on_evict=None):
+        super().__init__('scheduler results', max_bytes=max_bytes, on_evict=on_evict,
+                         sizeof=lambda entry: approx_size(entry[0]))
+
+    def get(self, key, default=None):
+        entry = super().get(key)
+        return entry[0] if entry is not None else default
+
+    def entry(self, key):
+        """(value, published_at, version) or None."""
+        return super().get(key)
+
+    def publish(self, key, value, version=None):
+        self.put(key, (value, time.time(), version))
+
+
+class Job:
+    """One refreshable result: what to run, how often, and its retry state."""
+
+    def __init__(self, key, run, interval, location=None, versioned=False, fallback=None):
+        self.key = key
+        self.run = run
+        self.interval = interval
+        self.location = location
+        self.versioned = versioned
+        self.fallback = fallback
+        self.next_due = 0.0
+        self.running = False
+        self.failures = 0
+        self.last_error = None
+        self.last_run = None
+        self.version = None
+
+
+class RefreshScheduler:
+    """
+    Worker pool plus dispatcher thread refreshing registered jobs into self.cache.
+
+    holder is the DatasetHolder whose current() version forecasts and
+    alerts are computed from. start() is idempotent; stop() waits for
+    running jobs.
+    """
+
+    def __init__(self, holder, workers=2, intervals=None, jitter=0.1, backoff_base=30.0,
+                 backoff_max=1800.0, recent_seconds=900.0, expire_seconds=6 * 3600.0, seed=None,
+                 prerender_dir=None, prerender_workers=1, cache_mb=RESULT_CACHE_MB, history=None,
+                 history_retention_days=HISTORY_RETENTION_DAYS, source=None):
+        self.holder = holder
+        self.workers = max(1, workers)
+        self.intervals = {**REFRESH_INTERVALS, **(intervals or {})}
+        self.jitter = jitter
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.recent_seconds = recent_seconds
+        self.expire_seconds = expire_seconds
+        self.cache = ResultCache(max_bytes=cache_mb * MB, on_evict=self._evicted)
+        self._rng = random.Random(seed)
+        self._jobs = {}
+        self._viewed = {}
+        self._running = 0
+        self._cond = threading.Condition()
+        self._pool = None
+        self._thread = None
+        self._stopping = False
+        self._add(Job(('alerts',), self._alert_table, self.intervals['alerts'], versioned=True))
+        self.prerender_dir = prerender_dir
+        self.prerender_workers = prerender_workers
+        if prerender_dir:
+            self._add(Job(('prerender',), self._prerender, self.intervals['prerender'], versioned=True))
+        self.history = history
+        self.history_retention_days = history_retention_days
+        if history is not None:
+            self._add(Job(('compact',), self._compact_history, self.intervals['compact']))
+        self.source = source
+        if source is not None:
+            job = Job(('data',), self._append_readings, self.intervals['data'])
+            job.next_due = time.monotonic() + job.interval  # the holder was just loaded
+            self._add(job)
+
+    @classmethod
+    def from_env(cls, holder, source=None):
+        """
+        Worker count and intervals from ENVIROTRACK_REFRESH_WORKERS /
+        ENVIROTRACK_<KIND>_REFRESH; static pre-render into
+        ENVIROTRACK_PRERENDER_DIR (with ENVIROTRACK_PRERENDER_WORKERS processes);
+        result budget from ENVIROTRACK_RESULT_CACHE_MB; alert history in the
+        SQLite file ENVIROTRACK_ALERT_HISTORY, kept for
+        ENVIROTRACK_ALERT_HISTORY_DAYS. New readings are appended from source.
+        """
+        intervals = {
+            kind: float(os.environ[f"ENVIROTRACK_{kind.upper()}_REFRESH"])
+            for kind in REFRESH_INTERVALS if f"ENVIROTRACK_{kind.upper()}_REFRESH" in os.environ
+        }
+        workers = int(os.environ.get("ENVIROTRACK_REFRESH_WORKERS", 2))
+        history_path = os.environ.get("ENVIROTRACK_ALERT_HISTORY")
+        return cls(holder, workers=workers, intervals=intervals,
+                   prerender_dir=os.environ.get("ENVIROTRACK_PRERENDER_DIR"),
+                   prerender_workers=int(os.environ.get("ENVIROTRACK_PRERENDER_WORKERS", 1)),
+                   cache_mb=float(os.environ.get("ENVIROTRACK_RESULT_CACHE_MB", RESULT_CACHE_MB)),
+                   history=AlertHistory(history_path) if history_path else None,
+                   history_retention_days=float(os.environ.get("ENVIROTRACK_ALERT_HISTORY_DAYS",
+                                                               HISTORY_RETENTION_DAYS)),
+                   source=source)
+
+    # --------------------------------------------------------
+    # Lifecycle
+    # --------------------------------------------------------
+    def start(self):
+        with self._cond:
+            if self._thread is None:
+                self._stopping = False
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="envirotrack-refresh")
+                self._thread = threading.Thread(target=self._dispatch, name="envirotrack-scheduler", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            thread, pool = self._thread, self._pool
+            self._thread = self._pool = None
+        if thread is not None:
+            thread.join()
+            pool.shutdown(wait=True)
+
+    # --------------------------------------------------------
+    # Read side (never blocks on a refresh)
+    # --------------------------------------------------------
+    def touch(self, location):
+        """Record a view of location, so its jobs get priority."""
+        with self._cond:
+            self._viewed[location] = time.monotonic()
+
+    def news(self, location):
+        """Cached news payload for location's city, or None while the first fetch is pending."""
+        city = self.holder.current().stations.station(location).city
+        key = ('news', city)
+        self.touch(location)
+        self._ensure(key, lambda: Job(
+            key, lambda: _fetch_news(city), self.intervals['news'], location=location,
+            fallback=lambda error: {"articles": [], "error": str(error)},
+        ))
+        return self.cache.get(key)
+
+    def forecast(self, location, parameter, days, request=True, mode='full'):
+        """
+        Cached forecast frame (FORECAST_COLUMNS) for the next `days` days
+        (at most MAX_FORECAST_DAYS), or None while it is pending.
+
+        With request=False a missing forecast is only looked up, not queued.
+        A forecast from an older dataset version is returned while its refit runs.
+        """
+        artifact = self.forecast_artifact(location, parameter, request=request, mode=mode)
+        return artifact.horizon(days) if artifact is not None else None
+
+    def forecast_artifact(self, location, parameter, request=True, mode='full'):
+        """The cached ForecastArtifact behind forecast(), or None while it is pending."""
+        key = ('forecast', location, parameter, mode)
+        if request or key in self._jobs:
+            self.touch(location)
+            self._ensure(key, lambda: Job(
+                key, lambda: self._forecast(location, parameter, mode), self.intervals['forecast'],
+                location=location, versioned=True,
+            ))
+        return self.cache.get(key)
+
+    def forecast_pending(self, location, parameter, mode='full'):
+        """True while a requested forecast has no published result yet and its last fit did not fail."""
+        key = ('forecast', location, parameter, mode)
+        job = self._jobs.get(key)
+        return job is not None and job.last_error is None and key not in self.cache
+
+    def forecast_error(self, location, parameter, mode='full'):
+        """Why a requested forecast has no result (its last fit's error), or None."""
+        key = ('forecast', location, parameter, mode)
+        job = self._jobs.get(key)
+        if job is None or key in self.cache:
+            return None
+        return job.last_error
+
+    def retry(self, key):
+        """Make a failed job due now instead of after its backoff; it reads as pending again."""
+        with self._cond:
+            job = self._jobs.get(key)
+            if job is None or job.running or job.last_error is None:
+                return
+            job.last_error = None
+            job.next_due = time.monotonic()
+            self._cond.notify()
+
+    def alert_table(self):
+        """Per-station alert table for the latest computed version, or None before the first run."""
+        return self.cache.get(('alerts',))
+
+    def status(self):
+        """One dict per job (for debugging and /metrics-style views)."""
+        now = time.monotonic()
+        with self._cond:
+            return [
+                {
+                    'job': ':'.join(str(part) for part in job.key),
+                    'running': job.running,
+                    'due_in_s': round(max(job.next_due - now, 0.0), 1),
+                    'failures': job.failures,
+                    'last_error': job.last_error,
+                    'cached': job.key in self.cache,
+                }
+                for job in self._jobs.values()
+            ]
+
+    # --------------------------------------------------------
+    # Jobs
+    # --------------------------------------------------------
+    def _add(self, job):
+        self._jobs[job.key] = job
+
+    def _ensure(self, key, make_job):
+        """Register a job on first request; new jobs are due immediately."""
+        if key in self._jobs:
+            return
+        with self._cond:
+            if key not in self._jobs:
+                self._add(make_job())
+                self._cond.notify()
+
+    def _evicted(self, key):
+        """
+        A result was dropped to stay within the cache budget. Per-station
+        jobs are unregistered (the next view requests them again, rather
+        than showing "pending" until the next refresh); network-wide jobs
+        are made due.
+        """
+        with self._cond:
+            job = self._jobs.get(key)
+            if job is None or job.running:
+                return
+            if job.location is not None:
+                del self._jobs[key]
+            else:
+                job.next_due = time.monotonic()
+                self._cond.notify()
+
+    def _forecast(self, location, parameter, mode):
+        frame = self.holder.current().location_slice(location)
+        return forecast_artifact(frame, parameter, mode=mode, days=MAX_FORECAST_DAYS)
+
+    def _alert_table(self):
+        """
+        Alert status for every station, using cached news only (never the
+        network). Severity changes are recorded to the alert history.
+        """
+        dataset = self.holder.current()
+        rows = []
+        for location in dataset.locations:
+            frame = dataset.location_slice(location)
+            week = frame[frame['date'] >= frame['date'].max() - timedelta(days=7)]
+            news = self.cache.get(('news', dataset.stations.station(location).city))
+            icon, messages, _, _, severity = get_alert_status(
+                frame.iloc[-1], week, news_articles=news["articles"] if news else None,
+                nearby=dataset.nearby(location, NEARBY_RADIUS_KM), anomalies=dataset.anomaly(location),
+            )
+            rows.append({'location': location, 'date': frame['date'].iloc[-1], 'severity': severity,
+                         'icon': icon, 'messages': messages})
+        table = pd.DataFrame(rows, columns=['location', 'date', 'severity', 'icon', 'messages'])
+        if self.history is not None:
+            self.history.record(table, version=dataset.version)
+        return table
+
+    def _compact_history(self):
+        """Drop alert events older than the retention period; returns the number deleted."""
+        cutoff = self.holder.current().frame['date'].max() - timedelta(days=self.history_retention_days)
+        return self.history.compact(cutoff)
+
+    def _append_readings(self):
+        """Append source readings dated after the current last day; returns the row count."""
+        frame = self.source.load()
+        last_day = self.holder.current().frame['date'].max().normalize()
+        new_rows = frame[frame['date'].dt.normalize() > last_day]
+        if len(new_rows):
+            self.holder.append(new_rows)
+        return {'appended': len(new_rows)}
+
+    def _prerender(self):
+        """Incremental static-site rebuild; the report is published like any result."""
+        report = prerender(self.holder.current(), self.prerender_dir, workers=self.prerender_workers)
+        if report['failures']:
+            raise RuntimeError(f"{len(report['failures'])} station(s) failed to render")
+        return report
+
+    # --------------------------------------------------------
+    # Dispatch
+    # --------------------------------------------------------
+    def _jittered(self, seconds):
+        return seconds * (1 + self._rng.uniform(-self.jitter, self.jitter))
+
+    def _is_recent(self, job, now):
+        viewed = self._viewed.get(job.location)
+        return viewed is not None and now - viewed <= self.recent_seconds
+
+    def _next_jobs(self, now):
+        """Due jobs to start now, recently viewed first; also expires stale jobs."""
+        version = self.holder.current().version if self.holder.current() is not None else None
+        due = []
+        for key, job in list(self._jobs.items()):
+            if job.location is not None and not job.running:
+                viewed = self._viewed.get(job.location)
+                if viewed is None or now - viewed > self.expire_seconds:
+                    del self._jobs[key]
+                    self.cache.discard(key)
+                    continue
+            if job.versioned and job.version != version and job.failures == 0:
+                job.next_due = min(job.next_due, now)
+            if not job.running and job.next_due <= now:
+                due.append(job)
+        # A scan per wakeup is cheap for hundreds of jobs and, unlike a heap,
+        # picks up priority changes from new views immediately
+        due.sort(key=lambda job: (not self._is_recent(job, now), job.next_due))
+        return due[:self.workers - self._running]
+
+    def _dispatch(self):
+        with self._cond:
+            while not self._stopping:
+                now = time.monotonic()
+                if self.holder.current() is None:
+                    self._cond.wait(1.0)
+                    continue
+                for job in self._next_jobs(now):
+                    job.running = True
+                    self._running += 1
+                    self._pool.submit(self._execute, job)
+                idle = [job.next_due for job in self._jobs.values() if not job.running]
+                timeout = min(idle) - now if idle and self._running < self.workers else VERSION_POLL_SECONDS
+                self._cond.wait(min(max(timeout, 0.05), VERSION_POLL_SECONDS))
+
+    def _execute(self, job):
+        version = self.holder.current().version
+        try:
+            value = job.run()
+        except Exception as e:  # keep serving the last good result and retry later
+            error = e
+        else:
+            error = None
+            self.cache.publish(job.key, value, version)
+
+        with self._cond:
+            now = time.monotonic()
+            job.running = False
+            job.last_run = time.time()
+            self._running -= 1
+            if error is None:
+                job.failures = 0
+                job.last_error = None
+                job.version = version
+                job.next_due = now + self._jittered(job.interval)
+            else:
+                job.failures += 1
+                job.last_error = f"{type(error).__name__}: {error}"
+                delay = min(self.backoff_max, self.backoff_base * 2 ** (job.failures - 1))
+                job.next_due = now + self._jittered(delay)
+                if job.fallback is not None and job.key not in self.cache:
+                    self.cache.publish(job.key, job.fallback(error), version)
+            self._cond.notify()
+
+
+def _fetch_news(city):
+    """fetch_weather_news, raising on failure so the scheduler backs off."""
+    result = fetch_weather_news(city)
+    if result["error"]:
+        raise RuntimeError(result["error"])
+    return result
@@ -0,0 +1,447 @@
+"""
+Pluggable sources of station readings.
+
+A source yields raw chunks, and normalize() turns each one into the
+dashboard schema (SCHEMA):
+- renames columns, converts units and coerces dtypes
+- fills in coordinates from a station table
+- drops rows it cannot use, counting them in the source's report
+
+Loaders therefore never hold more than one raw chunk at a time; load()
+only keeps the normalized rows (optionally aggregated to one per day).
+
+    CsvSource      large CSV exports (CPCB/IMD style), read in chunks
+    ParquetSource  a columnar store, e.g. the output of `generate`
+    SyntheticSource  simulated readings (the default sample data)
+
+open_source() picks one from a path, and source_from_env() from the
+ENVIROTRACK_DATA_SOURCE / ENVIROTRACK_DATA_OPTIONS environment variables.
+"""
+import json
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from .data import STATIONS, simulate_readings
+
+# Column -> dtype of every frame a source yields
+SCHEMA = {
+    'date': 'datetime64[us]',
+    'location': 'str',
+    'lat': 'float64',
+    'lon': 'float64',
+    'temperature': 'float64',
+    'air_quality': 'float64',
+    'rainfall': 'float64',
+}
+METRICS = ('temperature', 'air_quality', 'rainfall')
+
+# Dashboard units first; other accepted units convert to them
+UNITS = {
+    'temperature': {'C': None, 'degC': None, 'K': lambda v: v - 273.15, 'F': lambda v: (v - 32) * 5 / 9},
+    'air_quality': {'AQI': None},
+    'rainfall': {'mm': None, 'cm': lambda v: v * 10, 'm': lambda v: v * 1000, 'in': lambda v: v * 25.4},
+}
+
+# Plausible ranges (dashboard units); values outside become missing
+VALID_RANGES = {
+    'temperature': (-60.0, 60.0),
+    'air_quality': (0.0, 1000.0),
+    'rainfall': (0.0, 1500.0),
+}
+
+# Timezone-aware timestamps are converted to local (naive) time
+LOCAL_TZ = 'Asia/Kolkata'
+
+# Extra tokens read as missing in observation exports
+NA_VALUES = ['None', 'NONE', '-', '--', 'Invalid', 'NoData', 'null']
+
+DEFAULT_CHUNK_ROWS = 250_000
+
+
+class SchemaError(ValueError):
+    """A source cannot be mapped onto SCHEMA (missing columns, unknown units, bad values)."""
+
+
+# ============================================================
+# Normalization
+# ============================================================
+def load_stations(stations=None):
+    """{name: (lat, lon)} from a list of station dicts, a CSV path, or the built-in STATIONS."""
+    if stations is None:
+        stations = STATIONS
+    elif isinstance(stations, (str, os.PathLike)):
+        stations = pd.read_csv(stations, usecols=['name', 'lat', 'lon']).to_dict('records')
+    return {s['name']: (float(s['lat']), float(s['lon'])) for s in stations}
+
+def unit_converter(metric, unit):
+    """Function converting metric values from unit to dashboard units (None: already there)."""
+    try:
+        return UNITS[metric][unit]
+    except KeyError:
+        known = ', '.join(UNITS.get(metric, ()))
+        raise SchemaError(f"unknown unit {unit!r} for {metric} (known: {known})") from None
+
+def _count(report, reason, n):
+    if n:
+        report['rejected'][reason] = report['rejected'].get(reason, 0) + int(n)
+
+def new_report():
+    return {'rows_read': 0, 'rows_kept': 0, 'values_out_of_range': 0, 'rejected': {}}
+
+def normalize(raw, columns=None, units=None, stations=None, start=None, end=None,
+              date_format=None, dayfirst=False, report=None):
+    """
+    One raw chunk as a SCHEMA frame.
+
+    columns maps source column names to schema names, units maps metrics to
+    their source unit, stations is a {name: (lat, lon)} lookup used when the
+    chunk has no coordinates. Rows without a usable date, location or
+    coordinates, or without any metric, are dropped and counted in report.
+    """
+    report = report if report is not None else new_report()
+    frame = raw.rename(columns=columns) if columns else raw
+    report['rows_read'] += len(frame)
+
+    missing = [c for c in ('date', 'location') if c not in frame.columns]
+    if missing:
+        raise SchemaError(f"missing required column(s): {', '.join(missing)}")
+    present = [m for m in METRICS if m in frame.columns]
+    if not present:
+        raise SchemaError(f"no metric columns (expected any of: {', '.join(METRICS)})")
+
+    out = {}
+    dates = frame['date']
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates, errors='coerce', format=date_format, dayfirst=dayfirst)
+    if getattr(dates.dt, 'tz', None) is not None:
+        dates = dates.dt.tz_convert(LOCAL_TZ).dt.tz_localize(None)
+    out['date'] = dates.astype(SCHEMA['date'])
+
+    # String work happens on the distinct names only (a chunk has few
+    # stations but many rows); code -1 marks a missing or blank name
+    codes, names = pd.factorize(frame['location'])
+    names = pd.Index(names).astype(SCHEMA['location']).str.strip()
+    name_codes, names = pd.factorize(names)
+    name_codes = np.where(names[name_codes] == '', -1, name_codes) if len(names) else name_codes
+    codes = np.append(name_codes, -1)[codes]
+    out['location'] = pd.Series(names.take(codes, allow_fill=True), index=frame.index)
+
+    if 'lat' in frame.columns and 'lon' in frame.columns:
+        out['lat'] = pd.to_numeric(frame['lat'], errors='coerce').astype('float64')
+        out['lon'] = pd.to_numeric(frame['lon'], errors='coerce').astype('float64')
+    else:
+        if stations is None:
+            raise SchemaError("no lat/lon columns and no station table to look them up in")
+        coords = np.array([stations.get(name, (np.nan, np.nan)) for name in names], dtype=float).reshape(-1, 2)
+        coords = np.vstack([coords, [np.nan, np.nan]])
+        out['lat'] = pd.Series(coords[codes, 0], index=frame.index)
+        out['lon'] = pd.Series(coords[codes, 1], index=frame.index)
+
+    for metric in METRICS:
+        if metric not in frame.columns:
+            out[metric] = pd.Series(np.nan, index=frame.index)
+            continue
+        values = pd.to_numeric(frame[metric], errors='coerce').to_numpy(dtype='float64')
+        convert = unit_converter(metric, (units or {}).get(metric, next(iter(UNITS[metric]))))
+        if convert is not None:
+            values = convert(values)
+        low, high = VALID_RANGES[metric]
+        with np.errstate(invalid='ignore'):
+            bad = (values < low) | (values > high)
+        report['values_out_of_range'] += int(bad.sum())
+        out[metric] = pd.Series(np.where(bad, np.nan, values), index=frame.index)
+
+    out = pd.DataFrame(out)
+    keep = out['date'].notna().to_numpy(copy=True)
+    _count(report, 'bad_date', (~keep).sum())
+    no_name = (codes < 0) & keep
+    _count(report, 'no_location', no_name.sum())
+    keep &= ~no_name
+    no_coords = (out['lat'].isna() | out['lon'].isna()).to_numpy() & keep
+    _count(report, 'unknown_station', no_coords.sum())
+    keep &= ~no_coords
+    no_metric = out[list(METRICS)].isna().all(axis=1).to_numpy() & keep
+    _count(report, 'no_metrics', no_metric.sum())
+    keep &= ~no_metric
+    if start is not None:
+        keep &= (out['date'] >= pd.Timestamp(start)).to_numpy()
+    if end is not None:
+        keep &= (out['date'] < pd.Timestamp(end)).to_numpy()
+
+    out = out[keep].reset_index(drop=True)
+    report['rows_kept'] += len(out)
+    return out
+
+def to_daily(frame):
+    """
+    One row per (location, day): mean temperature and AQI, total rainfall.
+
+    Works on partial (chunk) frames too: it returns sums and counts, which
+    combine_daily() merges and turns into means.
+    """
+    day = frame['date'].dt.normalize()
+    grouped = frame.assign(date=day).groupby(['location', 'date'], sort=False)
+    totals = grouped[['temperature', 'air_quality', 'rainfall']].sum(min_count=1)
+    counts = grouped[['temperature', 'air_quality']].count().add_suffix('_n')
+    coords = grouped[['lat', 'lon']].first()
+    return pd.concat([coords, totals, counts], axis=1)
+
+def combine_daily(parts):
+    """Merge to_daily() partials (a day may span chunks) into SCHEMA rows."""
+    partial = pd.concat(parts)
+    grouped = partial.groupby(level=['location', 'date'], sort=False)
+    totals = grouped[['temperature', 'air_quality', 'rainfall', 'temperature_n', 'air_quality_n']].sum(min_count=1)
+    coords = grouped[['lat', 'lon']].first()
+    out = pd.DataFrame({
+        'lat': coords['lat'],
+        'lon': coords['lon'],
+        'temperature': totals['temperature'] / totals['temperature_n'].replace(0, np.nan),
+        'air_quality': totals['air_quality'] / totals['air_quality_n'].replace(0, np.nan),
+        'rainfall': totals['rainfall'],
+    })
+    return out.reset_index()[list(SCHEMA)]
+
+
+# ============================================================
+# Sources
+# ============================================================
+class DataSource:
+    """
+    Base class: subclasses implement _raw_chunks() (and may pre-map columns).
+
+    columns, units, stations, start/end and date_format are passed to
+    normalize(); daily=True makes load() aggregate to one row per station
+    and day. After iterating, self.report holds row counts and the reasons
+    rows were dropped.
+    """
+
+    name = 'source'
+
+    def __init__(self, columns=None, units=None, stations=None, start=None, end=None,
+                 date_format=None, dayfirst=False, daily=False, chunk_rows=DEFAULT_CHUNK_ROWS):
+        self.columns = dict(columns or {})
+        self.units = dict(units or {})
+        for metric, unit in self.units.items():
+            if metric not in UNITS:
+                raise SchemaError(f"units given for unknown metric {metric!r}")
+            unit_converter(metric, unit)
+        self._stations = stations
+        self.start = start
+        self.end = end
+        self.date_format = date_format
+        self.dayfirst = dayfirst
+        self.daily = daily
+        self.chunk_rows = chunk_rows
+        self.report = new_report()
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.describe()})"
+
+    def describe(self):
+        return self.name
+
+    def source_columns(self):
+        """Source column name for each schema column the source maps."""
+        mapped = {target: source for source, target in self.columns.items()}
+        return {col: mapped.get(col, col) for col in SCHEMA}
+
+    def _raw_chunks(self):
+        raise NotImplementedError
+
+    def iter_chunks(self):
+        """Normalized SCHEMA frames, one per raw chunk (empty chunks skipped)."""
+        self.report = new_report()
+        stations = None
+        for raw in self._raw_chunks():
+            if stations is None and not {'lat', 'lon'} <= set(raw.columns) | set(self.columns.values()):
+                stations = load_stations(self._stations)
+            chunk = normalize(raw, self.columns, self.units, stations, self.start, self.end,
+                              self.date_format, self.dayfirst, self.report)
+            if len(chunk):
+                yield chunk
+
+    def load(self):
+        """
+        Every normalized row as one frame. With daily=True each chunk is
+        aggregated to (location, day) as it is read, so sub-daily files load
+        in memory proportional to their daily size. Duplicate (location,
+        date) rows keep the last one read.
+        """
+        if self.daily:
+            parts = [to_daily(chunk) for chunk in self.iter_chunks()]
+            frame = combine_daily(parts) if parts else pd.DataFrame(columns=list(SCHEMA))
+        else:
+            chunks = list(self.iter_chunks())
+            frame = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=list(SCHEMA))
+            before = len(frame)
+            frame = frame.drop_duplicates(['location', 'date'], keep='last', ignore_index=True)
+            _count(self.report, 'duplicate', before - len(frame))
+        if frame.empty:
+            raise SchemaError(f"{self.describe()}: no usable rows ({self.report['rejected'] or 'empty'})")
+        return frame.astype(SCHEMA)
+
+
+class CsvSource(DataSource):
+    """
+    A CSV file (optionally compressed) read chunk_rows rows at a time.
+
+    Only mapped columns are parsed (usecols), metrics and coordinates are
+    read straight into float64 and the date column is parsed while reading.
+    """
+
+    name = 'csv'
+
+    def __init__(self, path, sep=',', encoding='utf-8', **options):
+        super().__init__(**options)
+        self.path = path
+        self.sep = sep
+        self.encoding = encoding
+
+    def describe(self):
+        return f"csv:{self.path}"
+
+    def _raw_chunks(self):
+        header = pd.read_csv(self.path, sep=self.sep, encoding=self.encoding, nrows=0).columns
+        wanted = {source: col for col, source in self.source_columns().items() if source in header}
+        if 'date' not in wanted.values() or 'location' not in wanted.values():
+            raise SchemaError(f"{self.path}: columns {list(header)} do not include the mapped date and location")
+        dtypes = {source: 'float64' for source, col in wanted.items() if col in METRICS or col in ('lat', 'lon')}
+        date_column = next(source for source, col in wanted.items() if col == 'date')
+        reader = pd.read_csv(
+            self.path, sep=self.sep, encoding=self.encoding, usecols=list(wanted), dtype=dtypes,
+            parse_dates=[date_column], date_format=self.date_format, dayfirst=self.dayfirst,
+            na_values=NA_VALUES, chunksize=self.chunk_rows,
+        )
+        try:
+            with reader:
+                yield from reader
+        except ValueError as e:
+            raise SchemaError(f"{self.path}: {e}") from e
+
+
+class ParquetSource(DataSource):
+    """
+    A Parquet file or directory (Hive partitions such as year=/month= are
+    fine), scanned in record batches of chunk_rows rows. Only mapped columns
+    are read, and start/end are pushed down as a filter on the date column.
+    """
+
+    name = 'parquet'
+
+    def __init__(self, path, **options):
+        super().__init__(**options)
+        self.path = path
+
+    def describe(self):
+        return f"parquet:{self.path}"
+
+    def _raw_chunks(self):
+        import pyarrow.dataset as ds
+
+        # Station names are read dictionary-encoded (categorical), so each
+        # distinct name is decoded once per batch rather than once per row
+        location_column = self.source_columns()['location']
+        fmt = ds.ParquetFileFormat(read_options=ds.ParquetReadOptions(dictionary_columns=[location_column]))
+        if os.path.isdir(self.path):
+            # Skip side files such as stations.csv or _manifest.json
+            files = sorted(
+                os.path.join(root, name)
+                for root, _, names in os.walk(self.path) for name in names if name.endswith('.parquet')
+            )
+            dataset = ds.dataset(files, format=fmt, partitioning='hive', partition_base_dir=self.path)
+        else:
+            dataset = ds.dataset(self.path, format=fmt)
+        names = set(dataset.schema.names)
+        wanted = [source for source in self.source_columns().values() if source in names]
+        date_column = self.source_columns()['date']
+        filter_ = None
+        if date_column in names and pd.api.types.is_datetime64_any_dtype(
+                dataset.schema.field(date_column).type.to_pandas_dtype()):
+            for bound, op in ((self.start, '__ge__'), (self.end, '__lt__')):
+                if bound is not None:
+                    condition = getattr(ds.field(date_column), op)(pd.Timestamp(bound).to_pydatetime())
+                    filter_ = condition if filter_ is None else filter_ & condition
+        # Minimal readahead keeps memory near one batch rather than several files
+        batches = dataset.to_batches(columns=wanted, filter=filter_, batch_size=self.chunk_rows,
+                                     batch_readahead=1, fragment_readahead=1)
+        for batch in batches:
+            if batch.num_rows:
+                yield batch.to_pandas()
+
+
+class SyntheticSource(DataSource):
+    """
+    Simulated readings (simulate_readings) for the `days` days up to end
+    (default: now), generated chunk_rows rows at a time. With the defaults
+    this is the dashboard's sample data.
+    """
+
+    name = 'synthetic'
+
+    def __init__(self, days=60, end=None, freq='D', seed=None, stations=None, **options):
+        super().__init__(stations=stations, **options)
+        self.days = days
+        self.until = end
+        self.freq = freq
+        self.seed = seed
+
+    def describe(self):
+        return f"synthetic:{self.days}d@{self.freq}"
+
+    def _raw_chunks(self):
+        rng = np.random.default_rng(self.seed)
+        end_date = pd.Timestamp(self.until) if self.until is not None else datetime.now()
+        dates = pd.date_range(start=end_date - timedelta(days=self.days), end=end_date, freq=self.freq)
+        stations = self._stations
+        if stations is None or isinstance(stations, (str, os.PathLike)):
+            stations = [{'name': name, 'lat': lat, 'lon': lon} for name, (lat, lon) in load_stations(stations).items()]
+        block = max(1, self.chunk_rows // max(len(dates), 1))
+        for first in range(0, len(stations), block):
+            yield simulate_readings(stations[first:first + block], dates, rng)
+
+
+# ============================================================
+# Selecting a source
+# ============================================================
+def open_source(uri=None, **options):
+    """
+    A source for uri: None or 'sample' for simulated data, a .csv (or
+    compressed .csv.gz / .csv.zip) path for CsvSource, and a .parquet file
+    or a directory for ParquetSource. options go to the source's constructor.
+    """
+    if uri in (None, '', 'sample'):
+        return SyntheticSource(**options)
+    path = os.fspath(uri)
+    lower = path.lower()
+    if lower.endswith(('.csv', '.csv.gz', '.csv.bz2', '.csv.zip', '.csv.xz', '.txt')):
+        return CsvSource(path, **options)
+    if lower.endswith('.parquet') or os.path.isdir(path):
+        return ParquetSource(path, **options)
+    raise SchemaError(f"cannot tell the format of {path!r} (expected .csv, .parquet or a directory)")
+
+def read_options(path):
+    """Source options from a JSON file, e.g. {"columns": {...}, "units": {...}, "stations": "..."}."""
+    with open(path, encoding='utf-8') as fh:
+        options = json.load(fh)
+    if not isinstance(options, dict):
+        raise SchemaError(f"{path}: expected a JSON object of source options")
+    base = os.path.dirname(os.path.abspath(path))
+    if isinstance(options.get('stations'), str):
+        options['stations'] = os.path.join(base, options['stations'])
+    return options
+
+def source_from_env(seed=None):
+    """
+    The source named by ENVIROTRACK_DATA_SOURCE (options from the JSON file
+    in ENVIROTRACK_DATA_OPTIONS), or the seeded sample data when unset.
+    File sources aggregate to daily rows unless the options say "daily": false.
+    """
+    uri = os.environ.get('ENVIROTRACK_DATA_SOURCE')
+    options_path = os.environ.get('ENVIROTRACK_DATA_OPTIONS')
+    options = read_options(options_path) if options_path else {}
+    if not uri or uri == 'sample':
+        return SyntheticSource(seed=seed, **options)
+    return open_source(uri, **{'daily': True, **options})
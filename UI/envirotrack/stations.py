@@ -0,0 +1,379 @@
+"""
+Station registry: metadata records, a spatial index for nearest-station and
+radius queries, and a text index for search-as-you-type.
+
+Stations are indexed in a KD-tree over 3D unit vectors, so Euclidean (chord)
+distance in the tree is monotonic in great-circle distance and there is no
+special casing at the poles or the antimeridian.
+
+The text index (StationSearch) holds every name, city, state and alias
+word in one sorted key list, so a prefix is two bisections. Trigram
+posting lists catch typos ("bengalru", "vishakapatnam").
+"""
+import heapq
+import re
+import unicodedata
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def to_unit_vectors(lat, lon):
+    lat = np.radians(np.asarray(lat, dtype=float))
+    lon = np.radians(np.asarray(lon, dtype=float))
+    cos_lat = np.cos(lat)
+    return np.stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)], axis=-1)
+
+def chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord) / 2, 0, 1))
+
+def km_to_chord(km):
+    return 2 * np.sin(np.minimum(km / EARTH_RADIUS_KM, np.pi) / 2)
+
+
+# ============================================================
+# KD-tree
+# ============================================================
+class KDTree:
+    """
+    Static KD-tree over (n, d) points, stored as flat arrays.
+
+    Each node keeps its bounding box, which gives tight lower bounds for
+    pruning in both k-nearest and radius searches. Leaves hold up to
+    leaf_size points and are scanned with vectorized NumPy.
+    """
+
+    def __init__(self, points, leaf_size=16):
+        self.points = np.ascontiguousarray(points, dtype=float)
+        self.leaf_size = leaf_size
+        self.order = np.arange(len(self.points))
+        # per node: start, stop, left child, right child (-1 for leaves)
+        self._start, self._stop, self._left, self._right = [], [], [], []
+        self._lo, self._hi = [], []
+        if len(self.points):
+            self._build(0, len(self.points))
+        self._lo = np.array(self._lo)
+        self._hi = np.array(self._hi)
+
+    def _build(self, start, stop):
+        node = len(self._start)
+        idx = self.order[start:stop]
+        pts = self.points[idx]
+        self._start.append(start)
+        self._stop.append(stop)
+        self._left.append(-1)
+        self._right.append(-1)
+        self._lo.append(pts.min(axis=0))
+        self._hi.append(pts.max(axis=0))
+
+        if stop - start > self.leaf_size:
+            axis = int(np.argmax(self._hi[node] - self._lo[node]))
+            mid = (stop - start) // 2
+            part = np.argpartition(pts[:, axis], mid)
+            self.order[start:stop] = idx[part]
+            self._left[node] = self._build(start, start + mid)
+            self._right[node] = self._build(start + mid, stop)
+        return node
+
+    def _box_dist2(self, node, q):
+        d = np.maximum(self._lo[node] - q, 0) + np.maximum(q - self._hi[node], 0)
+        return float(d @ d)
+
+    def query(self, q, k=1):
+        """k nearest points to q; returns (distances, indices) sorted ascending."""
+        q = np.asarray(q, dtype=float)
+        k = min(k, len(self.points))
+        if k <= 0:
+            return np.empty(0), np.empty(0, dtype=int)
+
+        best = []  # max-heap of (-dist2, index)
+        frontier = [(0.0, 0)]
+        while frontier:
+            box_d2, node = heapq.heappop(frontier)
+            if len(best) == k and box_d2 > -best[0][0]:
+                break
+            left = self._left[node]
+            if left < 0:
+                idx = self.order[self._start[node]:self._stop[node]]
+                diff = self.points[idx] - q
+                d2 = np.einsum('ij,ij->i', diff, diff)
+                for dist2, i in zip(d2.tolist(), idx.tolist()):
+                    if len(best) < k:
+                        heapq.heappush(best, (-dist2, i))
+                    elif dist2 < -best[0][0]:
+                        heapq.heapreplace(best, (-dist2, i))
+            else:
+                for child in (left, self._right[node]):
+                    heapq.heappush(frontier, (self._box_dist2(child, q), child))
+
+        best.sort(reverse=True)
+        return np.sqrt([-d for d, _ in best]), np.array([i for _, i in best], dtype=int)
+
+    def query_radius(self, q, r):
+        """All points within Euclidean distance r of q; returns (distances, indices) sorted."""
+        q = np.asarray(q, dtype=float)
+        r2 = r * r
+        hits_idx, hits_d2 = [], []
+        stack = [0] if len(self.points) else []
+        while stack:
+            node = stack.pop()
+            if self._box_dist2(node, q) > r2:
+                continue
+            left = self._left[node]
+            if left < 0:
+                idx = self.order[self._start[node]:self._stop[node]]
+                diff = self.points[idx] - q
+                d2 = np.einsum('ij,ij->i', diff, diff)
+                mask = d2 <= r2
+                hits_idx.append(idx[mask])
+                hits_d2.append(d2[mask])
+            else:
+                stack.append(left)
+                stack.append(self._right[node])
+
+        if not hits_idx:
+            return np.empty(0), np.empty(0, dtype=int)
+        idx = np.concatenate(hits_idx)
+        d2 = np.concatenate(hits_d2)
+        order = np.argsort(d2, kind='stable')
+        return np.sqrt(d2[order]), idx[order]
+
+
+# ============================================================
+# Station records and text search
+# ============================================================
+class Station:
+    """One station's metadata. id is its position in the registry (stable within a data version)."""
+
+    __slots__ = ('id', 'name', 'city', 'state', 'region', 'lat', 'lon', 'aliases')
+
+    def __init__(self, id, name, city=None, state='', region='', lat=np.nan, lon=np.nan, aliases=()):
+        self.id = id
+        self.name = name
+        self.city = name if city is None else city
+        self.state = state
+        self.region = region
+        self.lat = lat
+        self.lon = lon
+        self.aliases = tuple(aliases)
+
+    def __repr__(self):
+        return f"Station({self.id}, {self.name!r})"
+
+    def to_dict(self):
+        record = {slot: getattr(self, slot) for slot in self.__slots__}
+        record['aliases'] = list(self.aliases)
+        return record
+
+
+_NON_WORD = re.compile(r'[^a-z0-9]+')
+
+def normalize_text(text):
+    """Lowercase ASCII words for matching: accents dropped, '&' and punctuation become spaces."""
+    text = unicodedata.normalize('NFKD', str(text)).encode('ascii', 'ignore').decode('ascii').lower()
+    return _NON_WORD.sub(' ', text).strip()
+
+def trigrams(term, partial=False):
+    """Character trigrams of a normalized term, padded at word edges (only the start when partial)."""
+    padded = f" {term}" if partial else f" {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# Field kinds and their weights in the ranking: a city match beats an
+# alias, which beats a state match
+NAME, CITY, ALIAS, STATE = range(4)
+FIELD_WEIGHTS = np.array([1.0, 1.0, 0.95, 0.8])
+# Typo matching: queries of at least FUZZY_MIN_LENGTH characters, sharing at
+# least FUZZY_MIN_SIMILARITY of their trigrams with a station's field
+FUZZY_MIN_LENGTH = 4
+FUZZY_MIN_SIMILARITY = 0.5
+
+
+class StationSearch:
+    """
+    Prefix and trigram index over Station records' names, cities, states
+    and aliases (plus state_aliases, {state: [short names]}).
+
+    Scores, times the field weight: 4 for a whole field equal to the query,
+    3 for a field starting with it, 2.5 / 2 for a word inside a field equal
+    to / starting with it, and the trigram similarity (at most 1) for typo
+    matches, which are only looked up when prefixes find too few stations.
+    Ties go to the shorter name, then alphabetical order.
+    """
+
+    def __init__(self, records, state_aliases=None):
+        self.records = list(records)
+        state_aliases = state_aliases or {}
+        entries = set()  # (key, station id, kind, is_word)
+        postings = {False: defaultdict(set), True: defaultdict(set)}  # by "is a state field"
+        for station in self.records:
+            fields = [(station.name, NAME), (station.city, CITY), (station.state, STATE)]
+            fields += [(alias, ALIAS) for alias in station.aliases]
+            fields += [(alias, STATE) for alias in state_aliases.get(station.state, ())]
+            for text, kind in fields:
+                term = normalize_text(text or '')
+                if not term:
+                    continue
+                entries.add((term, station.id, kind, False))
+                for word in term.split()[1:]:  # the first word is a prefix of the term already
+                    entries.add((word, station.id, kind, True))
+                if kind != NAME:  # a "City (State)" name is covered by its city and state
+                    for gram in trigrams(term):
+                        postings[kind == STATE][gram].add(station.id)
+
+        entries = sorted(entries)
+        self._keys = [entry[0] for entry in entries]
+        self._ids = np.array([entry[1] for entry in entries], dtype=np.int64)
+        self._kinds = np.array([entry[2] for entry in entries], dtype=np.int8)
+        self._words = np.array([entry[3] for entry in entries], dtype=bool)
+        self._postings = {
+            is_state: {gram: np.fromiter(ids, dtype=np.int64, count=len(ids)) for gram, ids in grams.items()}
+            for is_state, grams in postings.items()
+        }
+        # Tie-break rank: shorter names first, then alphabetical
+        order = sorted(range(len(self.records)), key=lambda i: (len(self.records[i].name), self.records[i].name))
+        self._rank = np.empty(len(self.records), dtype=np.int64)
+        self._rank[order] = np.arange(len(self.records))
+
+    def _prefix_range(self, key):
+        return bisect_left(self._keys, key), bisect_left(self._keys, key + '{')  # '{' sorts after 'z'
+
+    def scores(self, query, fuzzy_below=10):
+        """Per-station score array for query (0 where it does not match)."""
+        scores = np.zeros(len(self.records))
+        q = normalize_text(query)
+        if not q or not len(self.records):
+            return scores
+        lo, hi = self._prefix_range(q)
+        if hi > lo:
+            words = self._words[lo:hi]
+            exact = np.zeros(hi - lo, dtype=bool)
+            exact[:bisect_right(self._keys, q, lo, hi) - lo] = True
+            match = np.where(words, np.where(exact, 2.5, 2.0), np.where(exact, 4.0, 3.0))
+            np.maximum.at(scores, self._ids[lo:hi], match * FIELD_WEIGHTS[self._kinds[lo:hi]])
+        if len(q) >= FUZZY_MIN_LENGTH and np.count_nonzero(scores) < fuzzy_below:
+            grams = trigrams(q, partial=True)
+            for is_state, weight in ((False, 1.0), (True, FIELD_WEIGHTS[STATE])):
+                hits = [self._postings[is_state][gram] for gram in grams if gram in self._postings[is_state]]
+                if hits:
+                    similarity = np.bincount(np.concatenate(hits), minlength=len(self.records)) / len(grams)
+                    similarity[similarity < FUZZY_MIN_SIMILARITY] = 0.0
+                    np.maximum(scores, similarity * weight, out=scores)
+        return scores
+
+    def search(self, query, limit=10):
+        """Best-matching Station records for a (partial) query, best first."""
+        scores = self.scores(query, fuzzy_below=limit)
+        found = np.flatnonzero(scores)
+        found = found[np.lexsort((self._rank[found], -scores[found]))]
+        return [self.records[i] for i in found[:limit]]
+
+    def match(self, text):
+        """
+        Stations whose name, city or alias equals text (after normalization),
+        else every station in the state text names (full or short name).
+        """
+        q = normalize_text(text)
+        lo, hi = bisect_left(self._keys, q), bisect_right(self._keys, q)
+        whole = ~self._words[lo:hi]
+        keep = whole & (self._kinds[lo:hi] != STATE)
+        if not keep.any():
+            keep = whole  # "UP", "Tamil Nadu": the state's stations
+        return [self.records[i] for i in sorted(set(self._ids[lo:hi][keep].tolist()))]
+
+
+# ============================================================
+# Registry
+# ============================================================
+class StationRegistry:
+    """
+    Station records (Station) with lookups by id or name, k-nearest and
+    radius queries in km, and text search. Optional per-station cities,
+    states, regions and aliases (lists of names) and state_aliases
+    ({state: [short names]}) feed the records and the search index.
+    """
+
+    def __init__(self, names, lat, lon, cities=None, states=None, regions=None, aliases=None,
+                 state_aliases=None):
+        self.names = list(names)
+        self.lat = np.asarray(lat, dtype=float)
+        self.lon = np.asarray(lon, dtype=float)
+        self._ids = {name: i for i, name in enumerate(self.names)}
+        self.tree = KDTree(to_unit_vectors(self.lat, self.lon))
+        self.records = [
+            Station(i, name,
+                    city=cities[i] if cities is not None else None,
+                    state=states[i] if states is not None else '',
+                    region=regions[i] if regions is not None else '',
+                    lat=float(self.lat[i]), lon=float(self.lon[i]),
+                    aliases=aliases[i] if aliases is not None else ())
+            for i, name in enumerate(self.names)
+        ]
+        self.state_aliases = state_aliases or {}
+        self._search = None
+
+    @classmethod
+    def from_frame(cls, df, **metadata):
+        first = df.drop_duplicates('location')[['location', 'lat', 'lon']]
+        return cls(first['location'].tolist(), first['lat'].to_numpy(), first['lon'].to_numpy(), **metadata)
+
+    @classmethod
+    def from_records(cls, records):
+        return cls([r['name'] for r in records], [r['lat'] for r in records], [r['lon'] for r in records])
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self._ids
+
+    def station(self, key):
+        """Station record by id (int) or name; KeyError if unknown."""
+        if isinstance(key, (int, np.integer)):
+            if not 0 <= key < len(self.records):
+                raise KeyError(key)
+            return self.records[key]
+        return self.records[self._ids[key]]
+
+    @property
+    def search_index(self):
+        """StationSearch over the records, built on first use."""
+        if self._search is None:
+            self._search = StationSearch(self.records, self.state_aliases)
+        return self._search
+
+    def search(self, query, limit=10):
+        """Stations matching a (partial) name, city, state or alias, best first."""
+        return self.search_index.search(query, limit)
+
+    def position(self, name):
+        i = self._ids[name]
+        return float(self.lat[i]), float(self.lon[i])
+
+    def distance_km(self, name, other):
+        """Great-circle distance between two stations."""
+        a, b = self.tree.points[self._ids[name]], self.tree.points[self._ids[other]]
+        return float(chord_to_km(np.linalg.norm(a - b)))
+
+    def nearest(self, lat, lon, k=1):
+        """k nearest stations to a point as [(name, distance_km)]."""
+        chord, idx = self.tree.query(to_unit_vectors(lat, lon), k=k)
+        return [(self.names[i], float(d)) for i, d in zip(idx, chord_to_km(chord))]
+
+    def within(self, lat, lon, radius_km):
+        """Stations within radius_km of a point as [(name, distance_km)], nearest first."""
+        chord, idx = self.tree.query_radius(to_unit_vectors(lat, lon), float(km_to_chord(radius_km)))
+        return [(self.names[i], float(d)) for i, d in zip(idx, chord_to_km(chord))]
+
+    def neighbours(self, name, radius_km=None, k=None):
+        """Stations near another station (excluding itself), by radius and/or count."""
+        lat, lon = self.position(name)
+        if radius_km is not None:
+            found = self.within(lat, lon, radius_km)
+        else:
+            found = self.nearest(lat, lon, k=(k or 5) + 1)
+        found = [(n, d) for n, d in found if n != name]
+        return found[:k] if k else found
@@ -0,0 +1,127 @@
+"""
+Out-of-core synthetic datasets for scale testing.
+
+Readings use the same rules as load_sample_data (simulate_readings) but are
+written as Hive-style partitions (``year=YYYY/month=MM/part-NNNNN``), each
+holding one month for one block of stations. Blocks are sized so a
+partition has about chunk_rows rows, which bounds memory per worker.
+Every partition draws from its own child of one SeedSequence, so output is
+identical for a given seed and chunk_rows whatever the number of workers.
+"""
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .data import STATIONS, simulate_readings, split_location
+from .interpolation import INDIA_BOUNDS
+
+DEFAULT_START = '2023-01-01'
+PARTITION_FORMATS = ('parquet', 'csv')
+
+
+def make_stations(n_stations, seed=None):
+    """
+    n_stations station dicts: the real stations first, then jittered copies
+    named "City #k (State)" so names still parse like real ones. seed may
+    be an int or a SeedSequence.
+    """
+    stations = [dict(s) for s in STATIONS[:n_stations]]
+    extra = n_stations - len(stations)
+    if extra > 0:
+        rng = np.random.default_rng(seed)
+        parents = rng.integers(0, len(STATIONS), size=extra)
+        jitter = rng.normal(0, 0.5, size=(extra, 2))
+        lat_min, lon_min, lat_max, lon_max = INDIA_BOUNDS
+        for k, (parent, (dlat, dlon)) in enumerate(zip(parents, jitter), start=1):
+            city, state = split_location(STATIONS[parent]['name'])
+            stations.append({
+                'name': f"{city} #{k} ({state})",
+                'lat': round(float(np.clip(STATIONS[parent]['lat'] + dlat, lat_min, lat_max)), 4),
+                'lon': round(float(np.clip(STATIONS[parent]['lon'] + dlon, lon_min, lon_max)), 4),
+            })
+    return stations
+
+def plan_partitions(n_stations, start, end, freq, chunk_rows):
+    """[(month_start, month_end, station_start, station_stop)] covering [start, end)."""
+    months = pd.date_range(pd.Timestamp(start).to_period('M').to_timestamp(), end, freq='MS')
+    steps_per_month = len(pd.date_range(months[0], months[0] + pd.offsets.MonthBegin(1), freq=freq, inclusive='left'))
+    block = max(1, chunk_rows // max(steps_per_month, 1))
+    parts = []
+    for month in months:
+        lo = max(month, pd.Timestamp(start))
+        hi = min(month + pd.offsets.MonthBegin(1), pd.Timestamp(end))
+        if hi <= lo:
+            continue
+        for first in range(0, n_stations, block):
+            parts.append((lo, hi, first, min(first + block, n_stations)))
+    return parts
+
+def _write_partition(task):
+    """Generate and write one partition (runs in a worker process)."""
+    output, fmt, freq, stations, (lo, hi, first, _), seed_seq = task
+    rng = np.random.default_rng(seed_seq)
+    dates = pd.date_range(lo, hi, freq=freq, inclusive='left')
+    frame = simulate_readings(stations, dates, rng)
+
+    directory = os.path.join(output, f"year={lo.year}", f"month={lo.month:02d}")
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"part-{first:06d}.{fmt}")
+    if fmt == 'parquet':
+        frame.to_parquet(path, index=False)
+    else:
+        frame.to_csv(path, index=False)
+    return os.path.relpath(path, output), len(frame)
+
+def generate_dataset(output, n_stations=len(STATIONS), years=1, start=DEFAULT_START, freq='D',
+                     fmt='parquet', seed=None, workers=None, chunk_rows=1_000_000):
+    """
+    Write a partitioned synthetic dataset under output and return its manifest.
+
+    The manifest (also saved as ``_manifest.json``) records the parameters,
+    the seed entropy (so unseeded runs can be reproduced), and every file
+    with its row count. Station metadata is written to ``stations.csv``.
+    """
+    if fmt not in PARTITION_FORMATS:
+        raise ValueError(f"unknown format: {fmt}")
+    started = time.perf_counter()
+    start = pd.Timestamp(start)
+    end = start + pd.DateOffset(years=years)
+    parts = plan_partitions(n_stations, start, end, freq, chunk_rows)
+
+    # One independent stream for the station layout and one per partition
+    seed_seq = np.random.SeedSequence(seed)
+    station_seq, *children = seed_seq.spawn(len(parts) + 1)
+    stations = make_stations(n_stations, seed=station_seq)
+    tasks = [
+        (output, fmt, freq, stations[p[2]:p[3]], p, child)
+        for p, child in zip(parts, children)
+    ]
+
+    os.makedirs(output, exist_ok=True)
+    pd.DataFrame(stations).to_csv(os.path.join(output, 'stations.csv'), index=False)
+    workers = min(workers or os.cpu_count() or 1, max(len(tasks), 1))
+    if workers == 1:
+        files = list(map(_write_partition, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            files = list(pool.map(_write_partition, tasks))
+
+    manifest = {
+        'stations': n_stations,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'freq': freq,
+        'format': fmt,
+        'seed_entropy': str(seed_seq.entropy),
+        'chunk_rows': chunk_rows,
+        'rows': sum(rows for _, rows in files),
+        'files': [{'path': path, 'rows': rows} for path, rows in files],
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+    with open(os.path.join(output, '_manifest.json'), 'w', encoding='utf-8') as fh:
+        json.dump(manifest, fh, indent=2)
+    return manifest
@@ -0,0 +1,103 @@
+"""
+Viewport queries for the interactive map.
+
+Stations are pre-aggregated into a pyramid of web-mercator grid cells, one
+level per zoom. A viewport query returns the individual stations in view
+when they fit in the marker budget, otherwise the clusters of the finest
+level that does, so the payload sent to the browser stays bounded however
+many stations exist.
+"""
+import numpy as np
+
+SEVERITY_RANK = {'normal': 0, 'warning': 1, 'severe': 2}
+SEVERITY_NAMES = np.array(['normal', 'warning', 'severe'])
+
+
+def mercator_pixels(lat, lon, zoom):
+    """Web-mercator pixel coordinates (256 px tiles) at a zoom level."""
+    lat = np.clip(np.asarray(lat, dtype=float), -85.0511, 85.0511)
+    x = (np.asarray(lon, dtype=float) + 180.0) / 360.0
+    phi = np.radians(lat)
+    y = (1.0 - np.log(np.tan(phi) + 1.0 / np.cos(phi)) / np.pi) / 2.0
+    scale = 256.0 * 2 ** zoom
+    return x * scale, y * scale
+
+
+class ClusterLevel:
+    """Stations grouped into cell_px x cell_px screen cells at one zoom."""
+
+    def __init__(self, lat, lon, rank, zoom, cell_px):
+        px, py = mercator_pixels(lat, lon, zoom)
+        # one int64 key per cell (x in the high bits) keeps np.unique 1-D and fast
+        cells = (px // cell_px).astype(np.int64) << 32 | (py // cell_px).astype(np.int64)
+        keys, self.station_cluster, counts = np.unique(cells, return_inverse=True, return_counts=True)
+        self.count = counts
+        self.lat = np.bincount(self.station_cluster, weights=lat) / counts
+        self.lon = np.bincount(self.station_cluster, weights=lon) / counts
+        worst = np.zeros(len(keys), dtype=np.int64)
+        np.maximum.at(worst, self.station_cluster, rank)
+        self.worst = worst
+
+
+class ClusterPyramid:
+    """Per-zoom station clusters with bounded-payload viewport queries."""
+
+    def __init__(self, lat, lon, severities, min_zoom=2, max_zoom=14, cell_px=48):
+        self.lat = np.asarray(lat, dtype=float)
+        self.lon = np.asarray(lon, dtype=float)
+        self.rank = np.array([SEVERITY_RANK.get(s, 0) for s in severities], dtype=np.int64)
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        self.levels = {
+            z: ClusterLevel(self.lat, self.lon, self.rank, z, cell_px)
+            for z in range(min_zoom, max_zoom + 1)
+        }
+
+    def query(self, bounds, zoom, max_markers=300, severities=None):
+        """
+        Markers for a viewport.
+
+        bounds is (south, west, north, east). Returns (station_indices,
+        clusters) where clusters is a dict of arrays (lat, lon, count,
+        severity) for groups of two or more stations drawn as one marker.
+        Pass severities (one per station) to colour clusters by something
+        other than the severities the pyramid was built with.
+        """
+        south, west, north, east = bounds
+        in_view = (
+            (self.lat >= south) & (self.lat <= north) &
+            (self.lon >= west) & (self.lon <= east)
+        )
+        visible = np.flatnonzero(in_view)
+        if len(visible) <= max_markers:
+            return visible, _empty_clusters()
+
+        z = int(np.clip(round(zoom), self.min_zoom, self.max_zoom))
+        while True:
+            level = self.levels[z]
+            ids, counts = np.unique(level.station_cluster[visible], return_counts=True)
+            if len(ids) <= max_markers or z == self.min_zoom:
+                break
+            z -= 1
+
+        single = ids[counts == 1]
+        multi = ids[counts > 1]
+        singles = visible[np.isin(level.station_cluster[visible], single)]
+        worst = level.worst
+        if severities is not None:
+            rank = np.array([SEVERITY_RANK.get(s, 0) for s in np.asarray(severities)[visible]], dtype=np.int64)
+            worst = np.zeros(len(level.count), dtype=np.int64)
+            np.maximum.at(worst, level.station_cluster[visible], rank)
+        return singles, {
+            'lat': level.lat[multi],
+            'lon': level.lon[multi],
+            'count': counts[counts > 1],
+            'severity': SEVERITY_NAMES[worst[multi]],
+        }
+
+
+def _empty_clusters():
+    return {
+        'lat': np.empty(0), 'lon': np.empty(0),
+        'count': np.empty(0, dtype=np.int64), 'severity': SEVERITY_NAMES[:0],
+    }
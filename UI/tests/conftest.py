@@ -0,0 +1,6 @@
+import os
+import sys
+
+UI_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, UI_DIR)
+sys.path.insert(0, os.path.join(UI_DIR, "tools"))
@@ -0,0 +1,167 @@
+"""BoundedCache budgets: LRU order, TTL expiry, byte accounting, and a shortened soak."""
+import random
+
+import numpy as np
+import pytest
+
+from envirotrack import cache as cache_module
+from envirotrack.cache import MB, BoundedCache, approx_size, cache_stats
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(cache_module, "time", fake)
+    return fake
+
+
+def stats_of(cache):
+    return next(s for s in cache_stats() if s["cache"] == cache.name)
+
+
+# ------------------------------------------------------------
+# LRU and TTL
+# ------------------------------------------------------------
+def test_lru_evicts_least_recently_used():
+    evicted = []
+    cache = BoundedCache("test lru", max_entries=2, on_evict=evicted.append)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.put("c", 3)
+
+    assert "b" not in cache
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert evicted == ["b"]
+    assert cache.stats()["evictions"] == 1
+
+def test_put_replaces_existing_key_without_growing():
+    cache = BoundedCache("test replace", max_entries=2)
+    cache.put("a", b"x" * 100)
+    cache.put("a", b"y" * 10)
+    assert len(cache) == 1
+    assert cache.bytes == approx_size(b"y" * 10)
+
+def test_ttl_expires_on_get(clock):
+    evicted = []
+    cache = BoundedCache("test ttl", ttl=60, on_evict=evicted.append)
+    cache.put("a", 1)
+    clock.now += 59
+    assert cache.get("a") == 1
+    clock.now += 2
+    assert cache.get("a", "missing") == "missing"
+
+    stats = cache.stats()
+    assert stats["expirations"] == 1 and stats["evictions"] == 0
+    assert stats["entries"] == 0 and cache.bytes == 0
+    assert evicted == ["a"]
+
+def test_hits_misses_and_discard_do_not_call_on_evict():
+    evicted = []
+    cache = BoundedCache("test stats", on_evict=evicted.append)
+    cache.put("a", 1)
+    cache.get("a")
+    cache.get("b")
+    cache.discard("a")
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+    assert stats["entries"] == 0 and cache.bytes == 0
+    assert evicted == []
+
+
+# ------------------------------------------------------------
+# Byte budget
+# ------------------------------------------------------------
+def test_approx_size_counts_arrays_and_containers():
+    array = np.zeros(1000)
+    assert approx_size(array) == array.nbytes
+    assert approx_size({"x": array}) >= array.nbytes
+    assert approx_size((b"a" * 500, [array])) >= 500 + array.nbytes
+
+def test_byte_budget_evicts_until_within_budget():
+    cache = BoundedCache("test bytes", max_bytes=3 * 8000)
+    for key in range(5):
+        cache.put(key, np.zeros(1000))  # 8000 bytes each
+        assert cache.bytes <= cache.max_bytes
+
+    assert list(cache._data) == [2, 3, 4]
+    assert cache.bytes == sum(approx_size(np.zeros(1000)) for _ in range(3))
+    assert cache.stats()["evictions"] == 2
+
+def test_entry_larger_than_budget_is_not_kept():
+    cache = BoundedCache("test oversized", max_bytes=1000)
+    cache.put("small", np.zeros(10))
+    cache.put("big", np.zeros(1000))
+    assert len(cache) == 0 and cache.bytes == 0
+
+def test_custom_sizeof():
+    cache = BoundedCache("test sizeof", max_bytes=10, sizeof=len)
+    cache.put("a", "x" * 6)
+    cache.put("b", "y" * 6)
+    assert list(cache._data) == ["b"] and cache.bytes == 6
+
+
+# ------------------------------------------------------------
+# Shortened soak: bounded under a randomized workload
+# ------------------------------------------------------------
+@pytest.mark.parametrize("seed", [0, 1, 2])
+@pytest.mark.parametrize("max_entries,max_mb,ttl", [(50, None, None), (None, 0.25, None), (200, 0.5, 30)])
+def test_randomized_put_get_stays_bounded(clock, seed, max_entries, max_mb, ttl):
+    rng = random.Random(seed)
+    cache = BoundedCache(f"test soak {seed} {max_entries} {max_mb} {ttl}", max_entries=max_entries,
+                         max_bytes=None if max_mb is None else max_mb * MB, ttl=ttl)
+    for _ in range(3000):
+        clock.now += rng.random()
+        key = rng.randrange(1000)  # open-ended enough to keep evicting
+        if rng.random() < 0.6:
+            cache.get(key)
+        else:
+            cache.put(key, np.zeros(rng.randint(1, 2000), dtype=np.uint8))
+
+        stats = stats_of(cache)
+        if max_entries is not None:
+            assert stats["entries"] <= max_entries
+        if max_mb is not None:
+            assert cache.bytes <= max_mb * MB
+        assert cache.bytes == sum(entry[1] for entry in cache._data.values())
+
+    stats = stats_of(cache)
+    assert stats["evictions"] + stats["expirations"] > 0
+    assert stats["hits"] + stats["misses"] > 0
+
+def test_api_caches_stay_bounded_under_soak_workload():
+    from soak_cache import random_request
+
+    from envirotrack.api import ApiApp
+    from envirotrack.data import DatasetHolder
+    from envirotrack.sources import SyntheticSource
+
+    holder = DatasetHolder()
+    data = SyntheticSource(days=60, seed=0).load()
+    holder.publish(data)
+    app = ApiApp(holder, response_cache_entries=40, forecast_cache_entries=4, response_cache_mb=1,
+                 forecast_cache_mb=1)
+    locations = list(holder.current().locations)
+    rng = random.Random(0)
+    for n in range(1, 401):
+        path, query = random_request(rng, locations)
+        if path == "/forecast":
+            continue  # Prophet fits are covered by the full soak tool
+        status, _, _ = app.respond(path, query)
+        assert status < 500
+        if n % 100 == 0:
+            holder.publish(data)
+        for stats in cache_stats():
+            if stats["max_entries"] is not None:
+                assert stats["entries"] <= stats["max_entries"], stats
+            if stats["max_mb"] is not None:
+                assert stats["mb"] <= stats["max_mb"], stats
+    assert app.responses.stats()["evictions"] + app.responses.stats()["expirations"] > 0
@@ -0,0 +1,124 @@
+"""Incremental refresh: DatasetHolder.append against a Dataset rebuilt from every reading."""
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+from envirotrack.data import Dataset, DatasetHolder
+from envirotrack.scheduler import RefreshScheduler
+from envirotrack.sources import SyntheticSource
+
+END = pd.Timestamp("2024-03-31")
+
+
+class StaticSource:
+    """Stands in for a DataSource whose load() returns a fixed frame."""
+
+    def __init__(self, frame):
+        self.frame = frame
+
+    def load(self):
+        return self.frame
+
+
+@pytest.fixture(scope="module")
+def readings():
+    return SyntheticSource(days=30, end=END, seed=7).load()
+
+
+def split(readings, days):
+    """Readings up to `days` days before END, and the rest."""
+    cutoff = END - pd.Timedelta(days=days)
+    old = readings["date"].dt.normalize() <= cutoff
+    return readings[old], readings[~old]
+
+
+def published(frame):
+    holder = DatasetHolder()
+    dataset = holder.publish(frame)
+    dataset.rollups, dataset.anomalies  # built, so append() extends them
+    return holder
+
+
+# ------------------------------------------------------------
+# DatasetHolder.append
+# ------------------------------------------------------------
+def test_appended_rollups_equal_rebuilt(readings):
+    old, new = split(readings, 3)
+    holder = published(old)
+    appended = holder.append(new)
+    rebuilt = Dataset(readings, appended.version)
+
+    assert appended.version == 2
+    assert "rollups" in vars(appended)  # carried over, not rebuilt lazily
+    pdt.assert_frame_equal(appended.rollups.states, rebuilt.rollups.states)
+    pdt.assert_frame_equal(appended.rollups.regions, rebuilt.rollups.regions)
+    assert appended.rollups.days == rebuilt.rollups.days
+
+
+def test_appended_rollups_equal_rebuilt_one_day_at_a_time(readings):
+    old, new = split(readings, 5)
+    holder = published(old)
+    for _, day in new.groupby(new["date"].dt.normalize()):
+        holder.append(day)
+    assert holder.current().version == 6
+    rebuilt = Dataset(readings, holder.current().version)
+    pdt.assert_frame_equal(holder.current().rollups.states, rebuilt.rollups.states)
+    pdt.assert_frame_equal(holder.current().rollups.regions, rebuilt.rollups.regions)
+
+
+def test_appended_anomaly_baselines_equal_rebuilt(readings):
+    old, new = split(readings, 3)
+    holder = published(old)
+    before = holder.current().anomalies
+    appended = holder.append(new)
+    rebuilt = Dataset(readings, appended.version).anomalies
+
+    engine = appended.anomalies
+    assert engine is not before
+    order = [engine._ids[name] for name in rebuilt.locations]
+    np.testing.assert_allclose(engine._count[order], rebuilt._count, rtol=1e-5)
+    np.testing.assert_allclose(engine._sum[order], rebuilt._sum, rtol=1e-4, atol=1e-3)
+    np.testing.assert_array_equal(engine._last_date[order], rebuilt._last_date)
+    # The published version's engine is left as it was
+    assert before._last_date.max() < engine._last_date.max()
+
+
+def test_append_leaves_unbuilt_aggregates_lazy(readings):
+    old, new = split(readings, 3)
+    holder = DatasetHolder()
+    holder.publish(old)
+    appended = holder.append(new)
+    assert "rollups" not in vars(appended) and "anomalies" not in vars(appended)
+    pdt.assert_frame_equal(appended.rollups.states,
+                           Dataset(readings, appended.version).rollups.states)
+
+
+def test_append_needs_a_published_dataset(readings):
+    with pytest.raises(RuntimeError):
+        DatasetHolder().append(readings)
+
+
+# ------------------------------------------------------------
+# Scheduler data refresh
+# ------------------------------------------------------------
+def test_refresh_appends_only_new_days(readings):
+    old, new = split(readings, 2)
+    holder = published(old)
+    scheduler = RefreshScheduler(holder, source=StaticSource(readings))
+
+    assert scheduler._append_readings() == {"appended": len(new)}
+    assert holder.current().version == 2
+    assert len(holder.current().frame) == len(readings)
+    pdt.assert_frame_equal(holder.current().rollups.states,
+                           Dataset(readings, 2).rollups.states)
+
+    # Nothing newer than the current last day: no new version
+    assert scheduler._append_readings() == {"appended": 0}
+    assert holder.current().version == 2
+
+
+def test_refresh_job_registered_only_with_a_source(readings):
+    holder = published(readings)
+    assert ("data",) not in RefreshScheduler(holder)._jobs
+    assert ("data",) in RefreshScheduler(holder, source=StaticSource(readings))._jobs
@@ -0,0 +1,127 @@
+"""
+Requests-per-second benchmark for the JSON API on one core.
+
+Starts `python -m envirotrack serve` pinned to a single CPU (Linux), warms
+every endpoint once (so forecasts are cached), then drives it with
+keep-alive client threads for a fixed duration per endpoint.
+
+Usage (from the UI directory):
+    python tools/bench_api.py --duration 5 --clients 8
+"""
+import argparse
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import quote
+
+import numpy as np
+
+UI_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOCATION = quote("New Delhi (Delhi)")
+
+CASES = [
+    ("stations", "/stations", {}),
+    ("snapshot (gzip)", "/snapshot", {"Accept-Encoding": "gzip"}),
+    ("series page", f"/series?location={LOCATION}&page=1&page_size=50", {}),
+    ("series stream", f"/series?location={LOCATION}&stream=1", {}),
+    ("alerts", f"/alerts?location={LOCATION}", {}),
+    ("forecast (cached)", f"/forecast?location={LOCATION}&parameter=temperature&days=30", {}),
+]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(port, cpu):
+    def pin():
+        if cpu is not None and hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, {cpu})
+
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "envirotrack", "serve", "--port", str(port), "--quiet", "--seed", "0"],
+        cwd=UI_DIR, preexec_fn=pin, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("API server did not start")
+
+def request(conn, path, headers):
+    conn.request("GET", path, headers=headers)
+    response = conn.getresponse()
+    body = response.read()
+    return response.status, response.getheader("ETag"), len(body)
+
+def run_case(port, path, headers, clients, duration):
+    latencies = [[] for _ in range(clients)]
+    errors = [0] * clients
+    stop_at = time.perf_counter() + duration
+
+    def worker(i):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            status, _, _ = request(conn, path, headers)
+            latencies[i].append(time.perf_counter() - start)
+            if status >= 400:
+                errors[i] += 1
+        conn.close()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+
+    ms = np.concatenate([np.asarray(l) for l in latencies]) * 1000
+    return {
+        "requests": int(ms.size),
+        "rps": ms.size / wall,
+        "p50": float(np.percentile(ms, 50)),
+        "p99": float(np.percentile(ms, 99)),
+        "errors": sum(errors),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per endpoint")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent keep-alive connections")
+    parser.add_argument("--cpu", type=int, default=0, help="CPU to pin the server to (-1: no pinning)")
+    args = parser.parse_args(argv)
+
+    port = free_port()
+    proc = start_server(port, None if args.cpu < 0 else args.cpu)
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=300)
+        for _, path, headers in CASES:
+            # Warm response and forecast caches (the forecast answers 202 until its fit lands)
+            while request(conn, path, headers)[0] == 202:
+                time.sleep(1)
+        _, etag, _ = request(conn, "/snapshot", {})
+        conn.close()
+        cases = CASES + [("snapshot (304)", "/snapshot", {"If-None-Match": etag})]
+
+        print(f"{'endpoint':<20}{'requests':>10}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+        for name, path, headers in cases:
+            r = run_case(port, path, headers, args.clients, args.duration)
+            print(f"{name:<20}{r['requests']:>10}{r['rps']:>10.0f}{r['p50']:>10.2f}{r['p99']:>10.2f}{r['errors']:>8}")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Forecast latency benchmark: one fit per series versus one fit per horizon.
+
+For a sample of stations and each interval mode (forecast.FORECAST_MODES)
+it measures:
+- fit: building the ForecastArtifact at MAX_FORECAST_DAYS (Prophet fit +
+  predict, where full sampling spends most of its time)
+- slice: serving one slider position from that artifact
+- refit: the old behaviour, a fresh create_forecast per horizon, as the
+  cost of one slider move
+- the artifact's size next to Prophet's full predict() frame
+
+Usage (from the UI directory):
+    python tools/bench_forecast.py
+    python tools/bench_forecast.py --history-days 730 --stations 8 --json forecast.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+UI_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, UI_DIR)
+
+from envirotrack.forecast import (  # noqa: E402
+    FORECAST_MODES, MAX_FORECAST_DAYS, create_forecast, forecast_artifact, quiet_prophet_logs,
+)
+from envirotrack.sources import SyntheticSource  # noqa: E402
+
+HORIZONS = list(range(7, MAX_FORECAST_DAYS + 1, 7))
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def bench_series(frame, parameter, mode):
+    artifact, fit_s = timed(forecast_artifact, frame, parameter, mode=mode)
+    slice_s = min(timed(artifact.horizon, days)[1] for days in HORIZONS)
+    full_frame, refit_s = timed(FORECAST_MODES[mode], frame, parameter, days=HORIZONS[len(HORIZONS) // 2])
+    return {
+        "fit_s": fit_s,
+        "slice_ms": slice_s * 1000,
+        "refit_s": refit_s,
+        "artifact_kb": artifact.nbytes / 1024,
+        "predict_frame_kb": full_frame.memory_usage(index=False, deep=True).sum() / 1024,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--history-days", type=int, default=365, help="days of daily history per series")
+    parser.add_argument("--stations", type=int, default=5, help="stations sampled")
+    parser.add_argument("--parameter", default="temperature")
+    parser.add_argument("--modes", nargs="+", choices=list(FORECAST_MODES), default=list(FORECAST_MODES))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+    quiet_prophet_logs()
+
+    data = SyntheticSource(days=args.history_days, seed=args.seed).load()
+    locations = list(data['location'].unique()[:args.stations])
+    frames = [data[data['location'] == location] for location in locations]
+    create_forecast(frames[0], args.parameter, days=7)  # warm up imports and the Stan model
+    print(f"{len(locations)} series x {args.history_days} days, artifacts at {MAX_FORECAST_DAYS} days\n")
+
+    results = []
+    print(f"{'mode':<8}{'fit s':>9}{'slice ms':>10}{'refit s':>9}{'artifact KB':>13}{'predict KB':>12}")
+    for mode in args.modes:
+        runs = [bench_series(frame, args.parameter, mode) for frame in frames]
+        row = {"mode": mode, **{key: statistics.median(run[key] for run in runs) for key in runs[0]}}
+        results.append(row)
+        print(f"{mode:<8}{row['fit_s']:>9.3f}{row['slice_ms']:>10.3f}{row['refit_s']:>9.3f}"
+              f"{row['artifact_kb']:>13.1f}{row['predict_frame_kb']:>12.1f}")
+    print("\nMedians per series. A slider move costs one slice with artifacts, one refit without.")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump({"history_days": args.history_days, "series": len(locations),
+                       "max_days": MAX_FORECAST_DAYS, "results": results}, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Ingest benchmark for the data sources: rows per second and peak memory.
+
+Writes a CPCB-style observation export (15-minute readings, temperature in
+Kelvin, no coordinates, station table alongside) as one CSV of about
+--size-gb and the same rows as a Parquet directory, then loads them in a
+fresh process per case so peak RSS is measured cleanly. A naive
+pd.read_csv of the whole file is included as the baseline.
+
+Usage (from the UI directory):
+    python tools/bench_ingest.py --size-gb 2
+    python tools/bench_ingest.py --size-gb 0.5 --workdir /tmp/ingest --json report.json
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+UI_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, UI_DIR)
+
+from envirotrack.data import simulate_readings  # noqa: E402
+from envirotrack.synthetic import make_stations  # noqa: E402
+
+SOURCE_OPTIONS = {
+    "columns": {"Station": "location", "From Date": "date", "AT": "temperature",
+                "PM2.5 AQI": "air_quality", "RF": "rainfall"},
+    "units": {"temperature": "K"},
+    "date_format": "%Y-%m-%d %H:%M",
+    "stations": "stations.csv",
+}
+CASES = ["pandas read_csv (baseline)", "csv stream", "csv load daily", "parquet stream", "parquet load daily"]
+
+
+# ------------------------------------------------------------
+# Fixture
+# ------------------------------------------------------------
+def write_fixture(workdir, size_gb, n_stations, freq="15min", block_stations=100):
+    """Raw export as workdir/readings.csv and workdir/readings/ (Parquet); returns rows written."""
+    os.makedirs(os.path.join(workdir, "readings"), exist_ok=True)
+    csv_path = os.path.join(workdir, "readings.csv")
+    stations = make_stations(n_stations, seed=0)
+    pd.DataFrame(stations).to_csv(os.path.join(workdir, "stations.csv"), index=False)
+    with open(os.path.join(workdir, "options.json"), "w", encoding="utf-8") as fh:
+        json.dump(SOURCE_OPTIONS, fh, indent=2)
+
+    rng = np.random.default_rng(0)
+    target = size_gb * 2**30
+    rows, part, month = 0, 0, pd.Timestamp("2023-01-01")
+    with open(csv_path, "w", encoding="utf-8", newline="") as fh:
+        while fh.tell() < target:
+            dates = pd.date_range(month, month + pd.offsets.MonthBegin(1), freq=freq, inclusive="left")
+            for first in range(0, n_stations, block_stations):
+                frame = simulate_readings(stations[first:first + block_stations], dates, rng)
+                raw = pd.DataFrame({
+                    "Station": frame["location"],
+                    "From Date": frame["date"].dt.strftime("%Y-%m-%d %H:%M"),
+                    "AT": (frame["temperature"] + 273.15).round(2),
+                    "PM2.5 AQI": frame["air_quality"],
+                    "RF": frame["rainfall"],
+                })
+                raw.to_csv(fh, index=False, header=rows == 0)
+                raw.assign(**{"From Date": frame["date"]}).to_parquet(
+                    os.path.join(workdir, "readings", f"part-{part:05d}.parquet"), index=False)
+                rows += len(raw)
+                part += 1
+                if fh.tell() >= target:
+                    break
+            month += pd.offsets.MonthBegin(1)
+    return rows
+
+
+# ------------------------------------------------------------
+# One case (runs in a child process)
+# ------------------------------------------------------------
+def peak_rss_mb():
+    """Peak RSS of this process. ru_maxrss survives exec on Linux, so prefer VmHWM."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as fh:
+            for line in fh:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+def run_case(case, workdir, chunk_rows):
+    from envirotrack.sources import CsvSource, ParquetSource, read_options
+
+    options = read_options(os.path.join(workdir, "options.json"))
+    options["chunk_rows"] = chunk_rows
+    csv_path = os.path.join(workdir, "readings.csv")
+    parquet_path = os.path.join(workdir, "readings")
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+
+    if case == "pandas read_csv (baseline)":
+        rows_in = rows_out = len(pd.read_csv(csv_path))
+    else:
+        source_cls, path = (CsvSource, csv_path) if case.startswith("csv") else (ParquetSource, parquet_path)
+        source = source_cls(path, daily=case.endswith("daily"), **options)
+        if "stream" in case:
+            rows_out = sum(len(chunk) for chunk in source.iter_chunks())
+        else:
+            rows_out = len(source.load())
+        rows_in = source.report["rows_read"]
+
+    seconds = time.perf_counter() - start
+    return {
+        "case": case,
+        "rows_in": rows_in,
+        "rows_out": rows_out,
+        "seconds": seconds,
+        "rows_per_s": rows_in / seconds,
+        "peak_mb": peak_rss_mb() - baseline,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size-gb", type=float, default=1.0, help="approximate CSV size to ingest")
+    parser.add_argument("--stations", type=int, default=500)
+    parser.add_argument("--chunk-rows", type=int, default=250_000)
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "envirotrack_ingest"),
+                        help="where the fixture is written (reused if present)")
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=CASES)
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--case", help=argparse.SUPPRESS)  # child mode
+    args = parser.parse_args(argv)
+
+    if args.case:
+        print(json.dumps(run_case(args.case, args.workdir, args.chunk_rows)))
+        return
+
+    csv_path = os.path.join(args.workdir, "readings.csv")
+    if not os.path.exists(csv_path):
+        start = time.perf_counter()
+        rows = write_fixture(args.workdir, args.size_gb, args.stations)
+        print(f"Wrote {rows:,} rows in {time.perf_counter() - start:.0f}s to {args.workdir}")
+    size_mb = os.path.getsize(csv_path) / 2**20
+    print(f"CSV {size_mb:,.0f} MB, chunk_rows={args.chunk_rows:,}\n")
+
+    results = []
+    print(f"{'case':<28}{'rows in':>13}{'rows out':>13}{'seconds':>9}{'rows/s':>12}{'peak MB':>9}")
+    for case in args.cases:
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--case", case, "--workdir", args.workdir,
+             "--chunk-rows", str(args.chunk_rows)],
+            cwd=UI_DIR, capture_output=True, text=True,
+        )
+        if out.returncode:
+            print(f"{case:<28} failed: {out.stderr.strip().splitlines()[-1]}")
+            continue
+        r = json.loads(out.stdout)
+        results.append(r)
+        print(f"{case:<28}{r['rows_in']:>13,}{r['rows_out']:>13,}{r['seconds']:>9.1f}"
+              f"{r['rows_per_s']:>12,.0f}{r['peak_mb']:>9.0f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump({"csv_mb": size_mb, "chunk_rows": args.chunk_rows, "results": results}, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Station search benchmark: registry build, index build, search and lookups.
+
+Grows the built-in station list to --stations with numbered copies
+("Mumbai 12 (Maharashtra)", jittered coordinates), builds the registry as
+Dataset does, and times queries typed a character at a time, typo'd
+queries, and lookups by id and name.
+
+Usage (from the UI directory):
+    python tools/bench_search.py
+    python tools/bench_search.py --stations 20000 --json search.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+UI_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, UI_DIR)
+
+from envirotrack.data import STATIONS, split_location, station_registry  # noqa: E402
+
+QUERIES = ["mumbai", "new delhi", "bangalore", "tamil nadu", "up", "vishakapatnam", "trivandrm", "gurgoan"]
+
+
+def station_frame(n, rng):
+    """One row per station: the built-in list, then numbered copies up to n."""
+    rows = []
+    copy = 0
+    while len(rows) < n:
+        for station in STATIONS[:n - len(rows)]:
+            city, state = split_location(station['name'])
+            name = station['name'] if copy == 0 else f"{city} {copy} ({state})"
+            rows.append({'location': name, 'lat': station['lat'] + rng.normal(0, 0.1),
+                         'lon': station['lon'] + rng.normal(0, 0.1)})
+        copy += 1
+    return pd.DataFrame(rows).sort_values('location', kind='stable')
+
+def timed_ms(fn, *args, repeat=20, **kwargs):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        times.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(times)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--stations", type=int, default=10000)
+    parser.add_argument("--limit", type=int, default=25, help="results per search")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    frame = station_frame(args.stations, np.random.default_rng(args.seed))
+    start = time.perf_counter()
+    registry = station_registry(frame)
+    registry_s = time.perf_counter() - start
+    start = time.perf_counter()
+    registry.search_index
+    index_s = time.perf_counter() - start
+    print(f"{len(registry)} stations: registry {registry_s:.2f}s, search index {index_s:.2f}s (once per data version)\n")
+
+    results = []
+    print(f"{'query':<16}{'median ms':>10}{'worst prefix ms':>17}  top match")
+    for query in QUERIES:
+        found, median = timed_ms(registry.search, query, limit=args.limit)
+        # Search-as-you-type: every prefix of the query
+        worst = max(timed_ms(registry.search, query[:n], limit=args.limit, repeat=5)[1]
+                    for n in range(1, len(query) + 1))
+        results.append({"query": query, "median_ms": median, "worst_prefix_ms": worst,
+                        "top": found[0].name if found else None})
+        print(f"{query:<16}{median:>10.3f}{worst:>17.3f}  {found[0].name if found else '-'}")
+
+    ids = np.random.default_rng(args.seed).integers(0, len(registry), 10000).tolist()
+    names = [registry.names[i] for i in ids]
+    _, by_id = timed_ms(lambda: [registry.station(i) for i in ids], repeat=5)
+    _, by_name = timed_ms(lambda: [registry.station(name) for name in names], repeat=5)
+    by_id, by_name = by_id * 1000 / len(ids), by_name * 1000 / len(ids)
+    print(f"\nLookup: {by_id:.2f} us by id, {by_name:.2f} us by name")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump({"stations": len(registry), "registry_s": registry_s, "index_s": index_s,
+                       "queries": results, "lookup_id_us": by_id, "lookup_name_us": by_name},
+                      fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+Concurrent-session load test for the dashboard.
+
+Simulates N browser sessions with Streamlit's AppTest, each picking random
+locations, parameters, date ranges, views and forecast clicks against one
+shared process, and reports per-interaction latency percentiles, throughput
+and process RSS as N scales. News is served from a local RSS fixture, so the
+run is fully offline.
+
+Usage (from the UI directory):
+    python tools/loadtest.py --sessions 1,5,10,25,50 --interactions 20
+    python tools/loadtest.py --sessions 10 --forecast-prob 0 --json report.json
+
+Note: AppTest always reruns the whole script, so fragment-only reruns are
+not exercised; the numbers are an upper bound on per-interaction cost.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import resource
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import numpy as np
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(os.path.dirname(TOOLS_DIR), "app.py")
+NEWS_FIXTURE = os.path.join(TOOLS_DIR, "fixtures", "news_rss.xml")
+
+PARAMETERS = ["temperature", "air_quality", "rainfall"]
+INTERACTIONS = ["location", "parameter", "date_range", "view", "forecast"]
+# Views switched to, by label prefix (the app's view order may change)
+VIEW_MIX = ["🌐 Overview", "🗺️ States", "📈 Trends", "📊 Raw Data", "🕒 Alert History", "📰 Weather News"]
+TRENDS_VIEW = "📈 Trends"
+
+
+# ------------------------------------------------------------
+# Process metrics
+# ------------------------------------------------------------
+def current_rss_mb():
+    """Resident set size of this process in MB."""
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is a peak, not current, but is the best we have off Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class RssSampler(threading.Thread):
+    """Samples RSS in the background to capture the peak of a run."""
+
+    def __init__(self, interval=0.2):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = current_rss_mb()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.peak = max(self.peak, current_rss_mb())
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        self.peak = max(self.peak, current_rss_mb())
+
+
+# ------------------------------------------------------------
+# Simulated session
+# ------------------------------------------------------------
+def timed_run(at, timeout):
+    start = time.perf_counter()
+    at.run(timeout=timeout)
+    elapsed = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    return elapsed
+
+
+def run_session(session_id, interactions, seed, forecast_prob, timeout):
+    """Run one simulated user; returns a list of (interaction, seconds)."""
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed + session_id)
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    samples = [("initial", timed_run(at, timeout))]
+
+    locations = at.selectbox(key="selected_location").options
+    options = at.radio(key="active_view").options
+    views = [view for view in options if view.startswith(tuple(VIEW_MIX))]
+    trends = next(view for view in options if view.startswith(TRENDS_VIEW))
+    first_day, last_day = at.session_state["date_range"]
+    span_days = (last_day - first_day).days
+
+    other = (1 - forecast_prob) / (len(INTERACTIONS) - 1)
+    weights = [forecast_prob if name == "forecast" else other for name in INTERACTIONS]
+    for _ in range(interactions):
+        kind = rng.choices(INTERACTIONS, weights=weights)[0]
+        if kind == "location":
+            at.selectbox(key="selected_location").select(rng.choice(locations))
+        elif kind == "parameter":
+            at.selectbox(key="selected_parameter").select(rng.choice(PARAMETERS))
+        elif kind == "date_range":
+            start = first_day + timedelta(days=rng.randint(0, span_days - 1))
+            end = start + timedelta(days=rng.randint(1, (last_day - start).days or 1))
+            at.date_input(key="date_range").set_value((start, min(end, last_day)))
+        elif kind == "view":
+            at.radio(key="active_view").set_value(rng.choice(views))
+        else:
+            if at.session_state["active_view"] != trends:
+                at.radio(key="active_view").set_value(trends)
+                samples.append(("view", timed_run(at, timeout)))
+            at.slider(key="forecast_days").set_value(rng.choice([7, 14, 21, 28, 35, 42, 49, 56]))
+            at.button(key="generate_forecast").click()
+        samples.append((kind, timed_run(at, timeout)))
+    return samples
+
+
+def run_level(n_sessions, interactions, seed, forecast_prob, timeout):
+    """Run n_sessions concurrently and summarize the results."""
+    sampler = RssSampler()
+    rss_before = current_rss_mb()
+    sampler.start()
+    wall_start = time.perf_counter()
+    errors = []
+    by_kind = defaultdict(list)
+
+    with ThreadPoolExecutor(max_workers=n_sessions) as pool:
+        futures = [
+            pool.submit(run_session, i, interactions, seed, forecast_prob, timeout)
+            for i in range(n_sessions)
+        ]
+        for future in futures:
+            try:
+                for kind, seconds in future.result():
+                    by_kind[kind].append(seconds)
+            except Exception as e:
+                errors.append(str(e))
+
+    wall = time.perf_counter() - wall_start
+    sampler.stop()
+
+    all_samples = [s for values in by_kind.values() for s in values]
+    return {
+        "sessions": n_sessions,
+        "interactions": len(all_samples),
+        "errors": errors,
+        "wall_seconds": round(wall, 3),
+        "throughput_per_s": round(len(all_samples) / wall, 2) if wall else 0.0,
+        "rss_before_mb": round(rss_before, 1),
+        "rss_after_mb": round(current_rss_mb(), 1),
+        "rss_peak_mb": round(sampler.peak, 1),
+        "latency_ms": {
+            kind: summarize(values)
+            for kind, values in sorted(by_kind.items()) + [("all", all_samples)]
+            if values
+        },
+    }
+
+
+def summarize(seconds):
+    ms = np.asarray(seconds) * 1000
+    return {
+        "count": int(ms.size),
+        "p50": round(float(np.percentile(ms, 50)), 1),
+        "p90": round(float(np.percentile(ms, 90)), 1),
+        "p99": round(float(np.percentile(ms, 99)), 1),
+        "max": round(float(ms.max()), 1),
+    }
+
+
+def print_level(report):
+    print(
+        f"\n== {report['sessions']} session(s): {report['interactions']} interactions in "
+        f"{report['wall_seconds']:.1f}s -> {report['throughput_per_s']:.2f}/s | "
+        f"RSS {report['rss_before_mb']:.0f} -> {report['rss_after_mb']:.0f} MB "
+        f"(peak {report['rss_peak_mb']:.0f} MB)"
+    )
+    print(f"   {'interaction':<12}{'n':>6}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for kind, s in report["latency_ms"].items():
+        print(f"   {kind:<12}{s['count']:>6}{s['p50']:>10}{s['p90']:>10}{s['p99']:>10}{s['max']:>10}")
+    for err in report["errors"]:
+        print(f"   ERROR: {err}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", default="1,5,10,25,50",
+                        help="comma-separated concurrent session counts to test")
+    parser.add_argument("--interactions", type=int, default=20,
+                        help="random interactions per session")
+    parser.add_argument("--forecast-prob", type=float, default=0.05,
+                        help="probability an interaction is a forecast click")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=300,
+                        help="per-rerun timeout in seconds")
+    parser.add_argument("--json", help="write the full report to this file")
+    args = parser.parse_args(argv)
+
+    # Offline: the app reads news from this file instead of the network
+    os.environ["ENVIROTRACK_NEWS_FEED"] = NEWS_FIXTURE
+    logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+
+    reports = []
+    for n in [int(x) for x in args.sessions.split(",") if x.strip()]:
+        report = run_level(n, args.interactions, args.seed, args.forecast_prob, args.timeout)
+        print_level(report)
+        reports.append(report)
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(reports, fh, indent=2)
+
+    return 1 if any(r["errors"] for r in reports) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
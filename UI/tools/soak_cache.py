@@ -0,0 +1,131 @@
+"""
+Cache soak test: memory under a long randomized API workload.
+
+Drives ApiApp in-process with a random mix of requests over an unbounded
+key space (random coordinates, pages, radii and lags), republishing the
+dataset every --refresh-every requests as a data refresh would. Process
+RSS and the caches' accounted bytes are sampled as it runs. With the
+default budgets (cache.BoundedCache) memory should level off. With
+--unbounded every budget is lifted, which shows the creep they prevent.
+
+Exits 1 if RSS in the second half of the run grew by more than
+--tolerance-mb over the first half.
+
+Usage (from the UI directory):
+    python tools/soak_cache.py --requests 20000
+    python tools/soak_cache.py --requests 20000 --unbounded
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+UI_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, UI_DIR)
+
+from envirotrack.api import ApiApp  # noqa: E402
+from envirotrack.cache import cache_stats, process_memory  # noqa: E402
+from envirotrack.data import DatasetHolder  # noqa: E402
+from envirotrack.sources import SyntheticSource  # noqa: E402
+
+
+def random_request(rng, locations):
+    """(path, query) drawn from a dashboard-like mix with an open-ended key space."""
+    location = rng.choice(locations)
+    kind = rng.choices(["series", "stations", "alerts", "similar", "snapshot", "forecast"],
+                       weights=[35, 25, 20, 12, 7, 1])[0]
+    if kind == "series":
+        return "/series", {"location": location, "page": str(rng.randint(1, 4)),
+                           "page_size": str(rng.choice([50, 100, 500, 2000]))}
+    if kind == "stations":
+        return "/stations", {"lat": f"{rng.uniform(8, 35):.4f}", "lon": f"{rng.uniform(68, 97):.4f}",
+                             "k": str(rng.randint(1, 20))}
+    if kind == "alerts":
+        return "/alerts", {"location": location, "radius_km": str(rng.randint(10, 300))}
+    if kind == "similar":
+        return "/similar", {"location": location, "parameter": rng.choice(["temperature", "air_quality"]),
+                            "max_lag": str(rng.randint(0, 2)), "k": str(rng.randint(3, 10))}
+    if kind == "forecast":
+        return "/forecast", {"location": location, "parameter": "temperature",
+                             "days": str(rng.randint(1, 60)), "mode": "fast"}
+    return "/snapshot", {}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--history-days", type=int, default=365)
+    parser.add_argument("--refresh-every", type=int, default=2500, help="requests between dataset republishes")
+    parser.add_argument("--sample-every", type=int, default=1000)
+    parser.add_argument("--unbounded", action="store_true", help="lift every cache budget (for comparison)")
+    parser.add_argument("--tolerance-mb", type=float, default=25.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the samples to this file")
+    args = parser.parse_args(argv)
+
+    from envirotrack.forecast import quiet_prophet_logs
+    quiet_prophet_logs()
+
+    data = SyntheticSource(days=args.history_days, seed=args.seed).load()
+    holder = DatasetHolder()
+    holder.publish(data)
+    if args.unbounded:
+        app = ApiApp(holder, response_cache_entries=None, forecast_cache_entries=None,
+                     response_cache_mb=2**20, forecast_cache_mb=2**20, response_ttl=None)
+    else:
+        app = ApiApp(holder)
+    locations = list(holder.current().locations)
+    rng = random.Random(args.seed)
+
+    samples = []
+    print(f"{'requests':>9}{'rss MB':>9}{'cache MB':>10}{'entries':>9}{'hit rate':>10}{'evictions':>11}{'req/s':>8}")
+    start = last = time.perf_counter()
+    for n in range(1, args.requests + 1):
+        path, query = random_request(rng, locations)
+        status, _, _ = app.respond(path, query)
+        if status >= 500:
+            raise RuntimeError(f"{path} {query}: HTTP {status}")
+        if n % args.refresh_every == 0:
+            holder.publish(data)
+        if n % args.sample_every == 0:
+            now = time.perf_counter()
+            caches = [s for s in cache_stats() if s['cache'].startswith('api')]
+            lookups = sum(s['hits'] + s['misses'] for s in caches)
+            sample = {
+                "requests": n,
+                "rss_mb": process_memory()["rss_mb"],
+                "cache_mb": round(sum(s['mb'] for s in caches), 2),
+                "entries": sum(s['entries'] for s in caches),
+                "hit_rate": round(sum(s['hits'] for s in caches) / lookups, 3) if lookups else None,
+                "evictions": sum(s['evictions'] + s['expirations'] for s in caches),
+                "req_per_s": args.sample_every / (now - last),
+            }
+            last = now
+            samples.append(sample)
+            print(f"{n:>9}{sample['rss_mb']:>9.1f}{sample['cache_mb']:>10.1f}{sample['entries']:>9}"
+                  f"{sample['hit_rate'] or 0:>10.3f}{sample['evictions']:>11}{sample['req_per_s']:>8.0f}")
+
+    half = len(samples) // 2
+    first = max(s["rss_mb"] for s in samples[:half]) if half else 0.0
+    second = max(s["rss_mb"] for s in samples[half:]) if samples else 0.0
+    slope = np.polyfit([s["requests"] for s in samples[half:]], [s["rss_mb"] for s in samples[half:]], 1)[0] \
+        if len(samples) - half > 1 else 0.0
+    growth = second - first
+    plateau = growth <= args.tolerance_mb
+    print(f"\n{args.requests} requests in {time.perf_counter() - start:.0f}s. Peak RSS first half {first:.1f} MB, "
+          f"second half {second:.1f} MB ({growth:+.1f} MB, {slope * 1000:+.2f} MB per 1k requests late in the run): "
+          f"{'plateaued' if plateau else 'still growing'}.")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump({"unbounded": args.unbounded, "budget_mb": None if args.unbounded else [
+                s["max_mb"] for s in cache_stats() if s['cache'].startswith('api')], "samples": samples,
+                "growth_mb": growth, "plateau": plateau}, fh, indent=2)
+    return 0 if plateau else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())